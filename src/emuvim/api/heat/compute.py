@@ -1,11 +1,19 @@
 from mininet.link import Link
 from resources import *
 from docker import DockerClient
+from image_catalog import get_image_catalog
+from indexed_dict import IndexedDict
+from stack_diff import StackDiff
+from subnet_pool import get_subnet_pool
+from multiprocessing.pool import ThreadPool
 import logging
 import threading
 import uuid
 import time
 
+# max. number of servers of a stack that are started concurrently
+MAX_PARALLEL_SERVER_STARTS = 8
+
 
 class HeatApiStackInvalidException(Exception):
     """
@@ -19,6 +27,18 @@ class HeatApiStackInvalidException(Exception):
         return repr(self.value)
 
 
+class HeatApiStackBusyException(Exception):
+    """
+    Exception thrown when an operation is requested for a stack that has an operation in progress.
+    """
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return repr(self.value)
+
+
 class OpenstackCompute(object):
     """
     This class is a datacenter specific compute object that tracks all containers that are running in a datacenter,
@@ -31,31 +51,36 @@ class OpenstackCompute(object):
     def __init__(self):
         self.dc = None
         self.stacks = dict()
-        self.computeUnits = dict()
+        # indexed by ID as well as by the names which the find_*_by_name_or_id methods accept
+        self.computeUnits = IndexedDict(("name", "template_name", "full_name"))
         self.routers = dict()
         self.flavors = dict()
-        self._images = dict()
-        self.nets = dict()
-        self.ports = dict()
+        self.nets = IndexedDict(("name",))
+        self.ports = IndexedDict(("name", "template_name"))
         self.compute_nets = dict()
         self.dcli = DockerClient(base_url='unix://var/run/docker.sock')
+        # held by the API requests that change the compute state and by the stack operations of this datacenter while
+        # they change the compute dictionaries, but not while they start or stop containers
+        self.stack_lock = threading.RLock()
+        # single worker that runs the stack operations of this datacenter in the background one after another,
+        # so the operations of different datacenters never wait for each other
+        self._stack_executor = None
+        # results of the stack operations that were started in the background
+        self._stack_operations = list()
+        # IDs of the stacks with a queued or running operation
+        self._busy_stacks = set()
+        self._stack_operations_lock = threading.Lock()
 
     @property
     def images(self):
         """
-        Updates the known images. Asks the docker daemon for a list of all known images and returns
-        the new dictionary.
+        Returns the known images. The image catalog is shared by all datacenters and only asks the docker daemon
+        for the image list again if the images might have changed.
 
-        :return: Returns the new image dictionary.
+        :return: Returns the image dictionary.
         :rtype: ``dict``
         """
-        for image in self.dcli.images.list():
-            if len(image.tags) > 0:
-                for t in image.tags:
-                    t = t.replace(":latest", "")  # only use short tag names for OSM compatibility
-                    if t not in self._images:
-                        self._images[t] = Image(t)
-        return self._images
+        return get_image_catalog().images
 
     def add_stack(self, stack):
         """
@@ -149,14 +174,170 @@ class OpenstackCompute(object):
         if self.dc is None:
             return False
 
-        stack = self.stacks[stackid]
-        self.update_compute_dicts(stack)
+        with self.stack_lock:
+            stack = self.stacks[stackid]
+            self.update_compute_dicts(stack)
 
-        # Create the networks first
-        for server in stack.servers.values():
-            self._start_compute(server)
+        self._start_servers(stack, stack.servers.values())
+        return True
+
+    def _start_servers(self, stack, servers):
+        """
+        Starts the given servers of the stack in parallel, the datacenter serializes the topology changes.
+
+        :param stack: The stack of the servers.
+        :type stack: :class:`heat.resources.stack`
+        :param servers: The servers to start.
+        :type servers: ``list``
+        """
+        for server in servers:
+            stack.server_status[server.name] = {"status": "CREATE_IN_PROGRESS"}
+        if len(servers) < 2 or MAX_PARALLEL_SERVER_STARTS < 2:
+            for server in servers:
+                self._deploy_server(stack, server)
+            return
+        pool = ThreadPool(min(len(servers), MAX_PARALLEL_SERVER_STARTS))
+        try:
+            # map re-raises the first exception of a failed start
+            pool.map(lambda server: self._deploy_server(stack, server), servers)
+        finally:
+            pool.close()
+            pool.join()
+
+    def deploy_stack_async(self, stackid):
+        """
+        Deploys the stack in the background. The stack status is CREATE_IN_PROGRESS until the stack is deployed
+        and changes to CREATE_COMPLETE or CREATE_FAILED afterwards.
+
+        :param stackid: An UUID str of the stack
+        :type stackid: ``str``
+        :return: Returns the result of the background operation.
+        :rtype: :class:`multiprocessing.pool.AsyncResult`
+        """
+        return self._run_stack_operation("CREATE", [self.stacks[stackid]], self.deploy_stack, stackid)
+
+    def update_stack_async(self, old_stack_id, new_stack):
+        """
+        Updates the stack in the background. The status of the old and the new stack is UPDATE_IN_PROGRESS until
+        the update is done and changes to UPDATE_COMPLETE or UPDATE_FAILED afterwards.
+
+        :param old_stack_id: The ID of the old stack.
+        :type old_stack_id: ``str``
+        :param new_stack: A reference of the new stack.
+        :type new_stack: :class:`heat.resources.stack`
+        :return: Returns the result of the background operation.
+        :rtype: :class:`multiprocessing.pool.AsyncResult`
+        """
+        return self._run_stack_operation("UPDATE", [self.stacks[old_stack_id], new_stack],
+                                         self.update_stack, old_stack_id, new_stack)
+
+    def delete_stack_async(self, stack_id):
+        """
+        Deletes the stack in the background. The stack status is DELETE_IN_PROGRESS until the stack is removed.
+        It changes to DELETE_FAILED if the stack could not be deleted.
+
+        :param stack_id: An UUID str of the stack
+        :type stack_id: ``str``
+        :return: Returns the result of the background operation.
+        :rtype: :class:`multiprocessing.pool.AsyncResult`
+        """
+        return self._run_stack_operation("DELETE", [self.stacks[stack_id]], self.delete_stack, stack_id)
+
+    def is_stack_busy(self, stack_id):
+        """
+        Checks if an operation of the stack is queued or running.
+
+        :param stack_id: An UUID str of the stack
+        :type stack_id: ``str``
+        :rtype: ``bool``
+        """
+        with self._stack_operations_lock:
+            return stack_id in self._busy_stacks
+
+    def _run_stack_operation(self, action, stacks, function, *args):
+        """
+        Queues a stack operation on the executor of this datacenter, the operations of one datacenter run one after
+        another. Raises a :class:`HeatApiStackBusyException` if one of the stacks already has an operation in
+        progress, thus a finishing operation never overwrites the status of a later one.
+
+        :param action: CREATE, UPDATE or DELETE, used for the stack status.
+        :type action: ``str``
+        :param stacks: The stacks whose status should reflect the operation.
+        :type stacks: ``list``
+        :param function: The stack operation, returns True if it succeeded.
+        :type function: ``function``
+        :return: Returns the result of the background operation.
+        :rtype: :class:`multiprocessing.pool.AsyncResult`
+        """
+        stack_ids = set(stack.id for stack in stacks)
+        with self._stack_operations_lock:
+            if len(stack_ids & self._busy_stacks) > 0:
+                raise HeatApiStackBusyException("Stack has an operation in progress")
+            self._busy_stacks |= stack_ids
+            if self._stack_executor is None:
+                self._stack_executor = ThreadPool(1)
+        for stack in stacks:
+            stack.status = action + "_IN_PROGRESS"
+            stack.status_reason = None
+
+        def run():
+            reason = None
+            try:
+                success = function(*args)
+                if not success:
+                    reason = "Stack %s failed." % action.lower()
+            except Exception as ex:
+                logging.exception("Stack %s failed." % action.lower())
+                success = False
+                reason = "Stack %s failed: %s" % (action.lower(), ex)
+            for stack in stacks:
+                stack.status = action + ("_COMPLETE" if success else "_FAILED")
+                stack.status_reason = reason
+            with self._stack_operations_lock:
+                self._busy_stacks -= stack_ids
+            return success
+
+        with self._stack_operations_lock:
+            result = self._stack_executor.apply_async(run)
+            self._stack_operations = [r for r in self._stack_operations if not r.ready()]
+            self._stack_operations.append(result)
+        return result
+
+    def wait_for_stack_operations(self, timeout=None):
+        """
+        Waits until all stack operations of this datacenter that run in the background are done.
+
+        :param timeout: Max seconds to wait for each operation, waits forever if None.
+        :type timeout: ``float``
+        :return: * *True*: If all operations are done.
+            * *False*: Else
+        :rtype: ``bool``
+        """
+        with self._stack_operations_lock:
+            results = list(self._stack_operations)
+        for result in results:
+            result.wait(timeout)
+            if not result.ready():
+                return False
         return True
 
+    def _deploy_server(self, stack, server):
+        """
+        Starts a server of the stack and records its status and start time in the stack.
+
+        :param stack: The stack of the server.
+        :type stack: :class:`heat.resources.stack`
+        :param server: Specifies the compute resource.
+        :type server: :class:`heat.resources.server`
+        """
+        t_start = time.time()
+        try:
+            self._start_compute(server)
+        except Exception:
+            stack.server_status[server.name] = {"status": "CREATE_FAILED", "time": time.time() - t_start}
+            raise
+        stack.server_status[server.name] = {"status": "CREATE_COMPLETE", "time": time.time() - t_start}
+
     def delete_stack(self, stack_id):
         """
         Delete a stack and all its components.
@@ -173,13 +354,15 @@ class OpenstackCompute(object):
         # Stop all servers and their links of this stack
         for server in self.stacks[stack_id].servers.values():
             self._stop_compute(server)
-            self.delete_server(server)
-        for net in self.stacks[stack_id].nets.values():
-            self.delete_network(net.id)
-        for port in self.stacks[stack_id].ports.values():
-            self.delete_port(port.id)
+            with self.stack_lock:
+                self.delete_server(server)
+        with self.stack_lock:
+            for net in self.stacks[stack_id].nets.values():
+                self.delete_network(net.id)
+            for port in self.stacks[stack_id].ports.values():
+                self.delete_port(port.id)
 
-        del self.stacks[stack_id]
+            del self.stacks[stack_id]
         return True
 
     def update_stack(self, old_stack_id, new_stack):
@@ -195,138 +378,155 @@ class OpenstackCompute(object):
             * *False*: else
         :rtype: ``bool``
         """
-        if old_stack_id not in self.stacks:
-            return False
-        old_stack = self.stacks[old_stack_id]
+        with self.stack_lock:
+            if old_stack_id not in self.stacks:
+                return False
+            old_stack = self.stacks[old_stack_id]
 
-        if not self.check_stack(new_stack):
-            return False
+            if not self.check_stack(new_stack):
+                self.release_subnet_cidrs(new_stack)
+                return False
 
-        # Update Stack IDs
-        for server in old_stack.servers.values():
-            if server.name in new_stack.servers:
-                new_stack.servers[server.name].id = server.id
-        for net in old_stack.nets.values():
-            if net.name in new_stack.nets:
-                new_stack.nets[net.name].id = net.id
-                for subnet in new_stack.nets.values():
-                    if subnet.subnet_name == net.subnet_name:
-                        subnet.subnet_id = net.subnet_id
-                        break
-            else:
+            diff = StackDiff(old_stack, new_stack)
+            for net in diff.removed_nets:
                 self.delete_network(net.id)
-        for port in old_stack.ports.values():
-            if port.name in new_stack.ports:
-                new_stack.ports[port.name].id = port.id
-        for router in old_stack.routers.values():
-            if router.name in new_stack.routers:
-                new_stack.routers[router.name].id = router.id
-
-        # Update the compute dicts to now contain the new_stack components
-        self.update_compute_dicts(new_stack)
-
-        self.update_ip_addresses(old_stack, new_stack)
-
-        # Remove all unnecessary servers
-        for server in old_stack.servers.values():
-            if server.name in new_stack.servers:
-                if not server.compare_attributes(new_stack.servers[server.name]):
-                    self._stop_compute(server)
-                else:
-                    # Delete unused and changed links
-                    for port_name in server.port_names:
-                        if port_name in old_stack.ports and port_name in new_stack.ports:
-                            if not old_stack.ports.get(port_name) == new_stack.ports.get(port_name):
-                                my_links = self.dc.net.links
-                                for link in my_links:
-                                    if str(link.intf1) == old_stack.ports[port_name].intf_name and \
-                                                    str(link.intf1.ip) == \
-                                                    old_stack.ports[port_name].ip_address.split('/')[0]:
-                                        self._remove_link(server.name, link)
-
-                                        new_stack.ports[port_name].update_intf_name(
-                                            old_stack.ports[port_name].intf_name)
-
-                                        # Add changed link
-                                        self._add_link(server.name,
-                                                       new_stack.ports[port_name].ip_address,
-                                                       new_stack.ports[port_name].intf_name,
-                                                       new_stack.ports[port_name].net_name)
-                                        break
-                        else:
-                            my_links = self.dc.net.links
-                            for link in my_links:
-                                if str(link.intf1) == old_stack.ports[port_name].intf_name and \
-                                                str(link.intf1.ip) == old_stack.ports[port_name].ip_address.split('/')[
-                                            0]:
-                                    self._remove_link(server.name, link)
-                                    break
-
-                    # Create new links
-                    for port_name in new_stack.servers[server.name].port_names:
-                        if port_name not in server.port_names:
-                            self._add_link(server.name,
-                                           new_stack.ports[port_name].ip_address,
-                                           new_stack.ports[port_name].intf_name,
-                                           new_stack.ports[port_name].net_name)
-            else:
-                self._stop_compute(server)
+            diff.transfer_ids()
+            for server in new_stack.servers.values():
+                if server.name in old_stack.server_status:
+                    new_stack.server_status[server.name] = old_stack.server_status[server.name]
+
+            # Update the compute dicts to now contain the new_stack components
+            self.update_compute_dicts(new_stack)
 
-        # Start all new servers
-        for server in new_stack.servers.values():
-            if server.name not in self.dc.containers:
-                self._start_compute(server)
+            self.update_ip_addresses(old_stack, new_stack)
+            plan = diff.plan()
 
-        del self.stacks[old_stack_id]
-        self.stacks[new_stack.id] = new_stack
+        # Only touch the servers and links that changed
+        for operation in plan:
+            self._apply_stack_operation(new_stack, operation)
+
+        with self.stack_lock:
+            del self.stacks[old_stack_id]
+            self.stacks[new_stack.id] = new_stack
         return True
 
+    def _apply_stack_operation(self, stack, operation):
+        """
+        Applies one operation of a stack update plan.
+
+        :param stack: The new version of the stack.
+        :type stack: :class:`heat.resources.stack`
+        :param operation: Operation tuple created by :func:`heat.stack_diff.StackDiff.plan`.
+        :type operation: ``tuple``
+        """
+        op = operation[0]
+        if op == StackDiff.STOP_SERVER:
+            self._stop_compute(operation[1])
+        elif op == StackDiff.REMOVE_LINK:
+            link = self._find_port_link(operation[2])
+            if link is not None:
+                self._remove_link(operation[1], link)
+        elif op == StackDiff.REPLACE_LINK:
+            server_name, old_port, new_port = operation[1:]
+            link = self._find_port_link(old_port)
+            if link is not None:
+                self._remove_link(server_name, link)
+                new_port.update_intf_name(old_port.intf_name)
+                self._add_link(server_name, new_port.ip_address, new_port.intf_name, new_port.net_name)
+        elif op == StackDiff.ADD_LINK:
+            port = operation[2]
+            self._add_link(operation[1], port.ip_address, port.intf_name, port.net_name)
+        elif op == StackDiff.START_SERVERS:
+            self._start_servers(stack, operation[1])
+
     def update_ip_addresses(self, old_stack, new_stack):
         self.update_subnet_cidr(old_stack, new_stack)
         self.update_port_addresses(old_stack, new_stack)
 
     def update_port_addresses(self, old_stack, new_stack):
+        nets = dict()
         for net in new_stack.nets.values():
             net.reset_issued_ip_addresses()
+            nets[net.name] = net
+        ports = dict((port.name, port) for port in new_stack.ports.values())
 
+        # ports keep their address if they are still connected to the same network
+        kept_ports = dict()
         for old_port in old_stack.ports.values():
-            for port in new_stack.ports.values():
-                if port.compare_attributes(old_port):
-                    for net in new_stack.nets.values():
-                        if net.name == port.net_name:
-                            if net.assign_ip_address(old_port.ip_address, port.name):
-                                port.ip_address = old_port.ip_address
-                                port.mac_address = old_port.mac_address
-                            else:
-                                port.ip_address = net.get_new_ip_address(port.name)
+            port = ports.get(old_port.name)
+            if port is not None and port.compare_attributes(old_port) and port.net_name in nets and \
+                    old_port.ip_address is not None:
+                kept_ports.setdefault(port.net_name, dict())[old_port.ip_address] = (port, old_port)
+        for net_name, net_ports in kept_ports.items():
+            net = nets[net_name]
+            failed = set(net.reserve_ip_addresses(dict((ip, port.name) for ip, (port, old_port) in net_ports.items())))
+            for ip, (port, old_port) in net_ports.items():
+                if ip in failed:
+                    port.ip_address = net.get_new_ip_address(port.name)
+                else:
+                    port.ip_address = old_port.ip_address
+                    port.mac_address = old_port.mac_address
 
         for port in new_stack.ports.values():
-            for net in new_stack.nets.values():
-                if port.net_name == net.name and not net.is_my_ip(port.ip_address, port.name):
-                    port.ip_address = net.get_new_ip_address(port.name)
+            net = nets.get(port.net_name)
+            if net is not None and not net.is_my_ip(port.ip_address, port.name):
+                port.ip_address = net.get_new_ip_address(port.name)
 
     def update_subnet_cidr(self, old_stack, new_stack):
-        subnet_counter = Net.ip_2_int('10.0.0.1')
-        issued_ip_addresses = list()
-        for subnet in new_stack.nets.values():
-            subnet.clear_cidr()
-            for old_subnet in old_stack.nets.values():
-                if subnet.subnet_name == old_subnet.subnet_name:
-                    subnet.set_cidr(old_subnet.get_cidr())
-                    issued_ip_addresses.append(old_subnet.get_cidr())
-
+        """
+        Lets the subnets of the new stack that already exist in the old stack keep their CIDR. The other subnets
+        keep the CIDR that the heat parser took from the shared subnet pool.
+        """
+        pool = get_subnet_pool()
+        old_cidrs = dict((old_subnet.subnet_name, old_subnet.get_cidr()) for old_subnet in old_stack.nets.values())
         for subnet in new_stack.nets.values():
-            if subnet.get_cidr() in issued_ip_addresses:
+            old_cidr = old_cidrs.get(subnet.subnet_name)
+            if old_cidr is None or old_cidr == subnet.get_cidr():
+                continue
+            # the network kept the ID of the old one, so it only takes over the old CIDR if that is still owned by
+            # the old network or was released meanwhile, otherwise it keeps the new CIDR
+            pool.release(old_cidr, owner=subnet.id)
+            if not pool.reserve(old_cidr, owner=subnet.id):
+                # the heat parser allocated the new CIDR for the ID the network had before, delete_network only
+                # releases it for the current one
+                pool.set_owner(subnet.get_cidr(), subnet.id)
                 continue
+            # the new CIDR was taken from the pool for this stack by the heat parser
+            pool.release(subnet.get_cidr())
+            subnet.set_cidr(old_cidr)
+
+    def set_subnet_cidr(self, net, cidr):
+        """
+        Sets the CIDR of the subnet of a network and registers it in the subnet pool that is shared by all
+        datacenters, thus the heat parser does not hand out overlapping subnets.
 
-            cird = Net.int_2_ip(subnet_counter) + '/24'
-            subnet_counter += 256
-            while cird in issued_ip_addresses:
-                cird = Net.int_2_ip(subnet_counter) + '/24'
-                subnet_counter += 256
+        :param net: The network.
+        :type net: :class:`heat.resources.net`
+        :param cidr: The new CIDR or None to remove it.
+        :type cidr: ``str``
+        :return: * *True*: When the new CIDR was set successfully.
+            * *False*: If the CIDR format was wrong.
+        :rtype: ``bool``
+        """
+        if cidr is not None and not net.check_cidr_format(cidr):
+            return False
+        pool = get_subnet_pool()
+        pool.release(net.get_cidr(), owner=net.id)
+        if cidr is not None:
+            # CIDRs outside of the pool or overlapping CIDRs are allowed, but they are not tracked
+            pool.reserve(cidr, owner=net.id)
+        return net.set_cidr(cidr)
 
-            subnet.set_cidr(cird)
-        return
+    def release_subnet_cidrs(self, stack):
+        """
+        Returns the CIDRs of the subnets of a stack that is not deployed to the shared subnet pool.
+
+        :param stack: A stack that was parsed but will not be deployed.
+        :type stack: :class:`heat.resources.stack`
+        """
+        pool = get_subnet_pool()
+        for net in stack.nets.values():
+            pool.release(net.get_cidr(), owner=net.id)
 
     def update_compute_dicts(self, stack):
         """
@@ -360,11 +560,13 @@ class OpenstackCompute(object):
         """
         logging.debug("Starting new compute resources %s" % server.name)
         network = list()
+        ports = dict()
 
         for port_name in server.port_names:
             network_dict = dict()
             port = self.find_port_by_name_or_id(port_name)
             if port is not None:
+                ports[port.intf_name] = port
                 network_dict['id'] = port.intf_name
                 network_dict['ip'] = port.ip_address
                 network_dict[network_dict['id']] = self.find_network_by_name_or_id(port.net_name).name
@@ -375,17 +577,15 @@ class OpenstackCompute(object):
                                  network=network, flavor_name=server.flavor)
         server.emulator_compute = c
 
-        for intf in c.intfs.values():
-            for port_name in server.port_names:
-                port = self.find_port_by_name_or_id(port_name)
-                if port is not None:
-                    if intf.name == port.intf_name:
-                        # wait up to one second for the intf to come up
-                        self.timeout_sleep(intf.isUp, 1)
-                        if port.mac_address is not None:
-                            intf.setMAC(port.mac_address)
-                        else:
-                            port.mac_address = intf.MAC()
+        intfs = [intf for intf in c.intfs.values() if intf.name in ports]
+        # wait up to one second for all intfs to come up
+        self.wait_for_interfaces(intfs, 1)
+        for intf in intfs:
+            port = ports[intf.name]
+            if port.mac_address is not None:
+                intf.setMAC(port.mac_address)
+            else:
+                port.mac_address = intf.MAC()
 
         # Start the real emulator command now as specified in the dockerfile
         # ENV SON_EMU_CMD
@@ -408,21 +608,20 @@ class OpenstackCompute(object):
         :type server: ``heat.resources.server``
         """
         logging.debug("Stopping container %s with full name %s" % (server.name, server.full_name))
-        link_names = list()
         for port_name in server.port_names:
-            link_names.append(self.find_port_by_name_or_id(port_name).intf_name)
-        my_links = self.dc.net.links
-        for link in my_links:
-            if str(link.intf1) in link_names:
-                # Remove all self created links that connect the server to the main switch
-                self._remove_link(server.name, link)
+            link_name = self.find_port_by_name_or_id(port_name).intf_name
+            for link in self.dc.net.getLinksByIntfName(link_name):
+                if str(link.intf1) == link_name:
+                    # Remove all self created links that connect the server to the main switch
+                    self._remove_link(server.name, link)
 
         # Stop the server and the remaining connection to the datacenter switch
         self.dc.stopCompute(server.name)
         # Only now delete all its ports and the server itself
-        for port_name in server.port_names:
-            self.delete_port(port_name)
-        self.delete_server(server)
+        with self.stack_lock:
+            for port_name in server.port_names:
+                self.delete_port(port_name)
+            self.delete_server(server)
 
     def find_server_by_name_or_id(self, name_or_id):
         """
@@ -433,13 +632,7 @@ class OpenstackCompute(object):
         :return: Returns the server reference if it was found or None
         :rtype: :class:`heat.resources.server`
         """
-        if name_or_id in self.computeUnits:
-            return self.computeUnits[name_or_id]
-
-        for server in self.computeUnits.values():
-            if server.name == name_or_id or server.template_name == name_or_id or server.full_name == name_or_id:
-                return server
-        return None
+        return self.computeUnits.find(name_or_id)
 
     def create_server(self, name, stack_operation=False):
         """
@@ -494,13 +687,7 @@ class OpenstackCompute(object):
         :return: Returns the network reference if it was found or None
         :rtype: :class:`heat.resources.net`
         """
-        if name_or_id in self.nets:
-            return self.nets[name_or_id]
-        for net in self.nets.values():
-            if net.name == name_or_id:
-                return net
-
-        return None
+        return self.nets.find(name_or_id)
 
     def create_network(self, name, stack_operation=False):
         """
@@ -537,6 +724,7 @@ class OpenstackCompute(object):
         for stack in self.stacks.values():
             stack.nets.pop(net.name, None)
 
+        get_subnet_pool().release(net.get_cidr(), owner=net.id)
         self.nets.pop(net.id, None)
 
     def create_port(self, name, stack_operation=False):
@@ -571,13 +759,7 @@ class OpenstackCompute(object):
         :return: Returns the port reference if it was found or None
         :rtype: :class:`heat.resources.port`
         """
-        if name_or_id in self.ports:
-            return self.ports[name_or_id]
-        for port in self.ports.values():
-            if port.name == name_or_id or port.template_name == name_or_id:
-                return port
-
-        return None
+        return self.ports.find(name_or_id)
 
     def delete_port(self, name_or_id):
         """
@@ -590,17 +772,29 @@ class OpenstackCompute(object):
         if port is None:
             raise Exception("Port with name or id %s does not exists." % name_or_id)
 
-        my_links = self.dc.net.links
-        for link in my_links:
-            if str(link.intf1) == port.intf_name and \
-                            str(link.intf1.ip) == port.ip_address.split('/')[0]:
-                self._remove_link(link.intf1.node.name, link)
-                break
+        link = self._find_port_link(port)
+        if link is not None:
+            self._remove_link(link.intf1.node.name, link)
 
         self.ports.pop(port.id, None)
         for stack in self.stacks.values():
             stack.ports.pop(port.name, None)
 
+    def _find_port_link(self, port):
+        """
+        Finds the link that connects the given port to the datacenter switch.
+
+        :param port: The port of the link.
+        :type port: :class:`heat.resources.port`
+        :return: Returns the link or None if the port is not connected.
+        :rtype: :class:`mininet.link`
+        """
+        for link in self.dc.net.getLinksByIntfName(port.intf_name):
+            if str(link.intf1) == port.intf_name and \
+                            str(link.intf1.ip) == port.ip_address.split('/')[0]:
+                return link
+        return None
+
     def _add_link(self, node_name, ip_address, link_name, net_name):
         """
         Adds a new link between datacenter switch and the node with the given name.
@@ -636,9 +830,8 @@ class OpenstackCompute(object):
         del self.dc.switch.intfs[self.dc.switch.ports[link.intf2]]
         del self.dc.switch.ports[link.intf2]
         del self.dc.switch.nameToIntf[link.intf2.name]
+        # also removes the link from the DCNetwork_graph
         self.dc.net.removeLink(link=link)
-        self.dc.net.DCNetwork_graph.remove_edge(server_name, self.dc.switch.name)
-        self.dc.net.DCNetwork_graph.remove_edge(self.dc.switch.name, server_name)
         for intf_key in self.dc.net[server_name].intfs.keys():
             if self.dc.net[server_name].intfs[intf_key].link == link:
                 self.dc.net[server_name].intfs[intf_key].delete()
@@ -660,3 +853,26 @@ class OpenstackCompute(object):
         while not function() and current_time < stop_time:
             current_time = time.time()
             time.sleep(0.1)
+
+    @staticmethod
+    def wait_for_interfaces(intfs, max_sleep):
+        """
+        Waits until all given interfaces are up. All interfaces are checked in each round and the time between the
+        rounds grows from 10 ms to 100 ms. Will return after `max_sleep` seconds if not all interfaces are up.
+
+        :param intfs: The interfaces to wait for.
+        :type intfs: ``list`` of :class:`mininet.link.Intf`
+        :param max_sleep: Max seconds to sleep. 1 equals 1 second.
+        :type max_sleep: ``float``
+        :return: Returns the interfaces that are not up.
+        :rtype: ``list``
+        """
+        stop_time = time.time() + max_sleep
+        sleep = 0.01
+        pending = list(intfs)
+        while True:
+            pending = [intf for intf in pending if not intf.isUp()]
+            if len(pending) == 0 or time.time() >= stop_time:
+                return pending
+            time.sleep(sleep)
+            sleep = min(sleep * 2, 0.1)
@@ -1,6 +1,24 @@
 from docker import DockerClient, APIClient
+from emuvim.dcemulator.dockerstate import get_docker_state
+from collections import deque
+import multiprocessing
+import threading
+import logging
 import time
-import re
+import os
+
+# root of the cgroup file system (cgroup v1 or v2 layout)
+CGROUP_ROOT = '/sys/fs/cgroup'
+# root of the proc file system, used to read the network counters of a container's network namespace
+PROC_ROOT = '/proc'
+# seconds between two samples of the background sampler
+SAMPLE_INTERVAL = 1.0
+# number of samples kept per container
+SAMPLE_WINDOW = 10
+
+# sampler shared by all monitoring endpoints, see get_sampler()
+_sampler = None
+_sampler_lock = threading.Lock()
 
 
 def docker_container_id(container_name):
@@ -12,6 +30,12 @@ def docker_container_id(container_name):
     :return: Returns the container ID or None if the container is not running or could not be found.
     :rtype: ``dict``
     """
+    state = get_docker_state()
+    if state.synced:
+        c = state.container(container_name)
+        if c is not None and c["status"] == "running":
+            return c["id"]
+    # the event view is updated asynchronously and might not know about a container that was just started
     c = APIClient()
     detail = c.inspect_container(container_name)
     if bool(detail["State"]["Running"]):
@@ -19,6 +43,21 @@ def docker_container_id(container_name):
     return None
 
 
+def docker_container_pid(container_id):
+    """
+    Returns the PID of the main process of a docker container.
+
+    :param container_id: The full ID (or name) of the docker container.
+    :type container_id: ``str``
+    :return: Returns the PID or None if the container is not running.
+    :rtype: ``int``
+    """
+    pid = APIClient().inspect_container(container_id)["State"]["Pid"]
+    if pid:
+        return pid
+    return None
+
+
 def docker_abs_cpu(container_id):
     """
     Returns the used CPU time since container startup and the system time in nanoseconds and returns the number
@@ -30,14 +69,7 @@ def docker_abs_cpu(container_id):
         CPU cores available.
     :rtype: ``dict``
     """
-    with open('/sys/fs/cgroup/cpuacct/docker/' + container_id + '/cpuacct.usage_percpu', 'r') as f:
-        line = f.readline()
-    sys_time = int(time.time() * 1000000000)
-    numbers = [int(x) for x in line.split()]
-    cpu_usage = 0
-    for number in numbers:
-        cpu_usage += number
-    return {'CPU_used': cpu_usage, 'CPU_used_systime': sys_time, 'CPU_cores': len(numbers)}
+    return CgroupStats(container_id).cpu()
 
 
 def docker_mem_used(container_id):
@@ -49,8 +81,7 @@ def docker_mem_used(container_id):
     :return: Returns the memory utilization in bytes.
     :rtype: ``str``
     """
-    with open('/sys/fs/cgroup/memory/docker/' + container_id + '/memory.usage_in_bytes', 'r') as f:
-        return int(f.readline())
+    return CgroupStats(container_id).mem()['MEM_used']
 
 
 def docker_max_mem(container_id):
@@ -62,21 +93,7 @@ def docker_max_mem(container_id):
     :return: Returns the bytes of memory the docker container could use.
     :rtype: ``str``
     """
-    with open('/sys/fs/cgroup/memory/docker/' + container_id + '/memory.limit_in_bytes', 'r') as f:
-        mem_limit = int(f.readline())
-    with open('/proc/meminfo', 'r') as f:
-        line = f.readline().split()
-    sys_value = int(line[1])
-    unit = line[2]
-    if unit == 'kB':
-        sys_value *= 1024
-    if unit == 'MB':
-        sys_value *= 1024 * 1024
-
-    if sys_value < mem_limit:
-        return sys_value
-    else:
-        return mem_limit
+    return CgroupStats(container_id).mem()['MEM_limit']
 
 
 def docker_mem(container_id):
@@ -89,11 +106,7 @@ def docker_mem(container_id):
         memory usage.
     :rtype: ``dict``
     """
-    out_dict = dict()
-    out_dict['MEM_used'] = docker_mem_used(container_id)
-    out_dict['MEM_limit'] = docker_max_mem(container_id)
-    out_dict['MEM_%'] = float(out_dict['MEM_used']) / float(out_dict['MEM_limit'])
-    return out_dict
+    return CgroupStats(container_id).mem()
 
 
 def docker_abs_net_io(container_id):
@@ -106,28 +119,7 @@ def docker_abs_net_io(container_id):
         system time.
     :rtype: ``dict``
     """
-    c = APIClient()
-    command = c.exec_create(container_id, 'ifconfig')
-    ifconfig = c.exec_start(command['Id'])
-    sys_time = int(time.time() * 1000000000)
-
-    in_bytes = 0
-    m = re.findall('RX bytes:(\d+)', str(ifconfig))
-    if m:
-        for number in m:
-            in_bytes += int(number)
-    else:
-        in_bytes = None
-
-    out_bytes = 0
-    m = re.findall('TX bytes:(\d+)', str(ifconfig))
-    if m:
-        for number in m:
-            out_bytes += int(number)
-    else:
-        out_bytes = None
-
-    return {'NET_in': in_bytes, 'NET_out': out_bytes, 'NET_systime': sys_time}
+    return CgroupStats(container_id, pid=docker_container_pid(container_id)).net_io()
 
 
 def docker_block_rw(container_id):
@@ -139,20 +131,7 @@ def docker_block_rw(container_id):
     :return: Returns a dictionary with the total disc I/O since container startup, in bytes.
     :rtype: ``dict``
     """
-    with open('/sys/fs/cgroup/blkio/docker/' + container_id + '/blkio.throttle.io_service_bytes', 'r') as f:
-        read = f.readline().split()
-        write = f.readline().split()
-    rw_dict = dict()
-    rw_dict['BLOCK_systime'] = int(time.time() * 1000000000)
-    if len(read) < 3:
-        rw_dict['BLOCK_read'] = 0
-    else:
-        rw_dict['BLOCK_read'] = read[2]
-    if len(write) < 3:
-        rw_dict['BLOCK_write'] = 0
-    else:
-        rw_dict['BLOCK_write'] = write[2]
-    return rw_dict
+    return CgroupStats(container_id).block_rw()
 
 
 def docker_PIDS(container_id):
@@ -164,13 +143,13 @@ def docker_PIDS(container_id):
     :return: Returns the number of PIDS within a dictionary.
     :rtype: ``dict``
     """
-    with open('/sys/fs/cgroup/cpuacct/docker/' + container_id + '/tasks', 'r') as f:
-        return {'PIDS': len(f.read().split('\n')) - 1}
+    return CgroupStats(container_id).pids()
 
 
 def monitoring_over_time(container_id):
     """
     Calculates the cpu workload and the network traffic per second.
+    Blocks for one second, use :func:`monitoring_from_samples` to get the values of the background sampler.
 
     :param container_id: The full docker container ID
     :type container_id: ``str``
@@ -178,30 +157,427 @@ def monitoring_over_time(container_id):
         the cpu workload and the number of cpu cores available.
     :rtype: ``dict``
     """
-    first_cpu_usage = docker_abs_cpu(container_id)
-    first = docker_abs_net_io(container_id)
-    first_disk_io = docker_block_rw(container_id)
+    stats = CgroupStats(container_id, pid=docker_container_pid(container_id))
+    first = stats.sample()
     time.sleep(1)
-    second_cpu_usage = docker_abs_cpu(container_id)
-    second = docker_abs_net_io(container_id)
-    second_disk_io = docker_block_rw(container_id)
+    second = stats.sample()
+    return calculate_rates(first, second)
+
+
+def monitoring_from_samples(container_name):
+    """
+    Returns the workload of a container from the samples of the background sampler without blocking.
+    Starts the sampler if it is not running yet.
+
+    :param container_name: The full name of the docker container (e.g. mn.vnf1).
+    :type container_name: ``str``
+    :return: A dictionary with the same values as :func:`monitoring_over_time`, :func:`docker_mem` and
+        :func:`docker_PIDS` or None if the container has not been sampled twice yet.
+    :rtype: ``dict``
+    """
+    sampler = get_sampler()
+    out_dict = sampler.rates(container_name)
+    if out_dict is None:
+        return None
+    latest = sampler.latest(container_name)
+    for key in ['MEM_used', 'MEM_limit', 'MEM_%', 'PIDS']:
+        out_dict[key] = latest[key]
+    return out_dict
 
+
+def calculate_rates(first, second):
+    """
+    Calculates the workload between two samples.
+
+    :param first: The older sample.
+    :type first: ``dict``
+    :param second: The newer sample.
+    :type second: ``dict``
+    :return: A dictionary with disk read and write per second, network traffic per second (in and out),
+        the cpu workload and the number of cpu cores available.
+    :rtype: ``dict``
+    """
     # Disk access
-    time_div = (int(second_disk_io['BLOCK_systime']) - int(first_disk_io['BLOCK_systime']))
-    read_div = int(second_disk_io['BLOCK_read']) - int(first_disk_io['BLOCK_read'])
-    write_div = int(second_disk_io['BLOCK_write']) - int(first_disk_io['BLOCK_write'])
+    time_div = (int(second['BLOCK_systime']) - int(first['BLOCK_systime']))
+    read_div = int(second['BLOCK_read']) - int(first['BLOCK_read'])
+    write_div = int(second['BLOCK_write']) - int(first['BLOCK_write'])
     out_dict = {'BLOCK_read/s': int(read_div * 1000000000 / float(time_div) + 0.5),
                 'BLOCK_write/s': int(write_div * 1000000000 / float(time_div) + 0.5)}
 
     # Network traffic
-    time_div = (int(second['NET_systime']) - int(first['NET_systime']))
-    in_div = int(second['NET_in']) - int(first['NET_in'])
-    out_div = int(second['NET_out']) - int(first['NET_out'])
-    out_dict.update({'NET_in/s': int(in_div * 1000000000 / float(time_div) + 0.5),
-                     'NET_out/s': int(out_div * 1000000000 / float(time_div) + 0.5)})
+    if second['NET_in'] is not None and first['NET_in'] is not None:
+        time_div = (int(second['NET_systime']) - int(first['NET_systime']))
+        in_div = int(second['NET_in']) - int(first['NET_in'])
+        out_div = int(second['NET_out']) - int(first['NET_out'])
+        out_dict.update({'NET_in/s': int(in_div * 1000000000 / float(time_div) + 0.5),
+                         'NET_out/s': int(out_div * 1000000000 / float(time_div) + 0.5)})
+    else:
+        out_dict.update({'NET_in/s': None, 'NET_out/s': None})
 
     # CPU utilization
-    time_div = (int(second_cpu_usage['CPU_used_systime']) - int(first_cpu_usage['CPU_used_systime']))
-    usage_div = int(second_cpu_usage['CPU_used']) - int(first_cpu_usage['CPU_used'])
-    out_dict.update({'CPU_%': usage_div / float(time_div), 'CPU_cores': first_cpu_usage['CPU_cores']})
+    time_div = (int(second['CPU_used_systime']) - int(first['CPU_used_systime']))
+    usage_div = int(second['CPU_used']) - int(first['CPU_used'])
+    out_dict.update({'CPU_%': usage_div / float(time_div), 'CPU_cores': first['CPU_cores']})
     return out_dict
+
+
+def get_sampler():
+    """
+    Returns the background sampler shared by all monitoring endpoints and starts it on first use.
+
+    :return: The running sampler.
+    :rtype: :class:`ContainerStatsSampler`
+    """
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = ContainerStatsSampler()
+            _sampler.start()
+        return _sampler
+
+
+def running_containers(client=None):
+    """
+    Lists all running emulator containers (names starting with 'mn.').
+
+    :param client: Docker client to use.
+    :type client: :class:`docker.APIClient`
+    :return: List of (container name, container ID, PID) tuples.
+    :rtype: ``list``
+    """
+    c = client or APIClient()
+    result = list()
+    for container in c.containers(filters={'status': 'running'}):
+        names = [n.lstrip('/') for n in container.get('Names') or list()]
+        name = names[0] if len(names) > 0 else container['Id']
+        if not name.startswith('mn.'):
+            continue
+        result.append((name, container['Id'], None))
+    return result
+
+
+def _systime():
+    return int(time.time() * 1000000000)
+
+
+def _read(path):
+    with open(path, 'r') as f:
+        return f.read()
+
+
+def _read_int(path):
+    value = _read(path).strip()
+    if value == 'max':
+        return None
+    return int(value)
+
+
+def _count_cpus(cpu_list):
+    # e.g. 0-3,6 -> 5
+    count = 0
+    for part in cpu_list.strip().split(','):
+        if part == '':
+            continue
+        if '-' in part:
+            start, end = part.split('-')
+            count += int(end) - int(start) + 1
+        else:
+            count += 1
+    return count
+
+
+class CgroupStats(object):
+    """
+    Reads the resource counters of a docker container from the cgroup file system (v1 and v2 layout) and
+    the network counters from the network namespace of the container, without any call to the docker daemon.
+    """
+
+    def __init__(self, container_id, pid=None, cgroup_root=CGROUP_ROOT, proc_root=PROC_ROOT):
+        """
+        :param container_id: The full ID of the docker container.
+        :type container_id: ``str``
+        :param pid: PID of a process in the container, needed for the network counters.
+        :type pid: ``int``
+        :param cgroup_root: Root of the cgroup file system.
+        :type cgroup_root: ``str``
+        :param proc_root: Root of the proc file system.
+        :type proc_root: ``str``
+        """
+        self.container_id = container_id
+        self.pid = pid
+        self.cgroup_root = cgroup_root
+        self.proc_root = proc_root
+        # the unified hierarchy has a cgroup.controllers file in its root
+        self.v2 = os.path.exists(os.path.join(cgroup_root, 'cgroup.controllers'))
+        self._v2_dir = None
+
+    def _v1_path(self, controller, name):
+        return os.path.join(self.cgroup_root, controller, 'docker', self.container_id, name)
+
+    def _v2_path(self, name):
+        if self._v2_dir is None:
+            # systemd cgroup driver or cgroupfs driver
+            for d in [os.path.join(self.cgroup_root, 'system.slice', 'docker-%s.scope' % self.container_id),
+                      os.path.join(self.cgroup_root, 'docker', self.container_id)]:
+                if os.path.isdir(d):
+                    self._v2_dir = d
+                    break
+            else:
+                raise IOError('No cgroup found for container %s' % self.container_id)
+        return os.path.join(self._v2_dir, name)
+
+    def cpu(self):
+        """
+        :return: Returns a dict with CPU_used in nanoseconds, the current system time in nanoseconds and the number
+            of CPU cores available.
+        :rtype: ``dict``
+        """
+        if self.v2:
+            stat = dict(line.split() for line in _read(self._v2_path('cpu.stat')).splitlines() if line)
+            cpu_usage = int(stat['usage_usec']) * 1000
+            cpus_file = self._v2_path('cpuset.cpus.effective')
+            if os.path.exists(cpus_file):
+                cores = _count_cpus(_read(cpus_file))
+            else:
+                cores = multiprocessing.cpu_count()
+        else:
+            numbers = [int(x) for x in _read(self._v1_path('cpuacct', 'cpuacct.usage_percpu')).split()]
+            cpu_usage = sum(numbers)
+            cores = len(numbers)
+        return {'CPU_used': cpu_usage, 'CPU_used_systime': _systime(), 'CPU_cores': cores}
+
+    def mem(self):
+        """
+        :return: Returns a dictionary with the total memory usage, the maximal available memory and the percentage
+            memory usage.
+        :rtype: ``dict``
+        """
+        if self.v2:
+            mem_used = _read_int(self._v2_path('memory.current'))
+            mem_limit = _read_int(self._v2_path('memory.max'))
+        else:
+            mem_used = _read_int(self._v1_path('memory', 'memory.usage_in_bytes'))
+            mem_limit = _read_int(self._v1_path('memory', 'memory.limit_in_bytes'))
+        # the limit can not be larger than the memory of the system
+        line = _read(os.path.join(self.proc_root, 'meminfo')).splitlines()[0].split()
+        sys_value = int(line[1])
+        unit = line[2]
+        if unit == 'kB':
+            sys_value *= 1024
+        if unit == 'MB':
+            sys_value *= 1024 * 1024
+        if mem_limit is None or sys_value < mem_limit:
+            mem_limit = sys_value
+        return {'MEM_used': mem_used, 'MEM_limit': mem_limit, 'MEM_%': float(mem_used) / float(mem_limit)}
+
+    def block_rw(self):
+        """
+        :return: Returns a dictionary with the total disc I/O since container startup, in bytes.
+        :rtype: ``dict``
+        """
+        read = 0
+        write = 0
+        if self.v2:
+            # 8:0 rbytes=1 wbytes=2 rios=3 wios=4 ...
+            for line in _read(self._v2_path('io.stat')).splitlines():
+                for field in line.split()[1:]:
+                    key, value = field.split('=')
+                    if key == 'rbytes':
+                        read += int(value)
+                    elif key == 'wbytes':
+                        write += int(value)
+        else:
+            # 8:0 Read 1
+            for line in _read(self._v1_path('blkio', 'blkio.throttle.io_service_bytes')).splitlines():
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                if fields[1] == 'Read':
+                    read += int(fields[2])
+                elif fields[1] == 'Write':
+                    write += int(fields[2])
+        return {'BLOCK_systime': _systime(), 'BLOCK_read': read, 'BLOCK_write': write}
+
+    def pids(self):
+        """
+        :return: Returns the number of PIDS within a dictionary.
+        :rtype: ``dict``
+        """
+        if self.v2:
+            return {'PIDS': _read_int(self._v2_path('pids.current'))}
+        pids_file = self._v1_path('pids', 'pids.current')
+        if os.path.exists(pids_file):
+            return {'PIDS': _read_int(pids_file)}
+        return {'PIDS': len(_read(self._v1_path('cpuacct', 'tasks')).split('\n')) - 1}
+
+    def net_io(self):
+        """
+        Reads the counters of all interfaces in the network namespace of the container
+        (same values as /sys/class/net/<intf>/statistics inside of the container).
+
+        :return: Returns the absolute network I/O till container startup, in bytes. The return dict also contains
+            the system time.
+        :rtype: ``dict``
+        """
+        in_bytes = None
+        out_bytes = None
+        if self.pid is not None:
+            in_bytes = 0
+            out_bytes = 0
+            # the first two lines are headers
+            for line in _read(os.path.join(self.proc_root, str(self.pid), 'net', 'dev')).splitlines()[2:]:
+                intf, counters = line.split(':', 1)
+                counters = counters.split()
+                in_bytes += int(counters[0])
+                out_bytes += int(counters[8])
+        return {'NET_in': in_bytes, 'NET_out': out_bytes, 'NET_systime': _systime()}
+
+    def sample(self):
+        """
+        Reads all counters of the container at once.
+
+        :return: Dictionary with the values of cpu, mem, block_rw, pids and net_io.
+        :rtype: ``dict``
+        """
+        sample = dict()
+        sample.update(self.cpu())
+        sample.update(self.mem())
+        sample.update(self.block_rw())
+        sample.update(self.pids())
+        sample.update(self.net_io())
+        return sample
+
+
+class ContainerStatsSampler(object):
+    """
+    Samples the counters of all running emulator containers in the background and keeps the last samples of each
+    container in a ring buffer. Monitoring requests are answered from these samples without blocking.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, window=SAMPLE_WINDOW, list_containers=None,
+                 cgroup_root=CGROUP_ROOT, proc_root=PROC_ROOT):
+        """
+        :param interval: Seconds between two samples.
+        :type interval: ``float``
+        :param window: Number of samples kept per container.
+        :type window: ``int``
+        :param list_containers: Function returning a list of (name, container ID, PID) tuples of the containers to
+            sample. If the PID is None it is looked up once via the docker daemon.
+        :type list_containers: ``function``
+        :param cgroup_root: Root of the cgroup file system.
+        :type cgroup_root: ``str``
+        :param proc_root: Root of the proc file system.
+        :type proc_root: ``str``
+        """
+        self.interval = interval
+        self.window = window
+        self.list_containers = list_containers or running_containers
+        self.cgroup_root = cgroup_root
+        self.proc_root = proc_root
+        # container name -> CgroupStats
+        self._stats = dict()
+        # container name -> deque of samples (oldest first)
+        self._samples = dict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sample_all()
+            except Exception as ex:
+                logging.warning("Could not sample container stats: %s" % ex)
+            self._stop.wait(self.interval)
+
+    def sample_all(self):
+        """
+        Takes one sample of each container returned by list_containers and forgets stopped containers.
+        """
+        seen = set()
+        for name, container_id, pid in self.list_containers():
+            seen.add(name)
+            stats = self._stats.get(name)
+            if stats is None or stats.container_id != container_id:
+                if pid is None:
+                    pid = docker_container_pid(container_id)
+                stats = CgroupStats(container_id, pid=pid, cgroup_root=self.cgroup_root, proc_root=self.proc_root)
+                with self._lock:
+                    self._stats[name] = stats
+                    self._samples[name] = deque(maxlen=self.window)
+            try:
+                sample = stats.sample()
+            except (IOError, OSError, ValueError, KeyError) as ex:
+                logging.debug("Could not sample %s: %s" % (name, ex))
+                continue
+            with self._lock:
+                self._samples[name].append(sample)
+        with self._lock:
+            for name in list(self._samples.keys()):
+                if name not in seen:
+                    del self._samples[name]
+                    del self._stats[name]
+
+    def latest(self, name):
+        """
+        :param name: The full name of the docker container.
+        :type name: ``str``
+        :return: Returns the latest sample of the container or None.
+        :rtype: ``dict``
+        """
+        with self._lock:
+            samples = self._samples.get(name)
+            if not samples:
+                return None
+            return dict(samples[-1])
+
+    def history(self, name, step=1):
+        """
+        :param name: The full name of the docker container.
+        :type name: ``str``
+        :param step: Downsampling factor, only every step-th sample (counted back from the latest) is used.
+        :type step: ``int``
+        :return: Returns the workload of the container between the (downsampled) samples in the ring buffer, oldest
+            first. Each entry also contains the system time of its newer sample as SYS_time.
+        :rtype: ``list``
+        """
+        with self._lock:
+            samples = list(self._samples.get(name) or list())
+        step = max(1, int(step))
+        samples = samples[::-1][::step][::-1]
+        result = list()
+        for first, second in zip(samples[:-1], samples[1:]):
+            entry = calculate_rates(first, second)
+            entry['SYS_time'] = second['CPU_used_systime']
+            result.append(entry)
+        return result
+
+    def rates(self, name, window=1):
+        """
+        :param name: The full name of the docker container.
+        :type name: ``str``
+        :param window: Number of sample intervals the rates are calculated over.
+        :type window: ``int``
+        :return: Returns the workload of the container over the latest window (see :func:`calculate_rates`) or None
+            if there are not enough samples.
+        :rtype: ``dict``
+        """
+        with self._lock:
+            samples = self._samples.get(name)
+            if not samples or len(samples) < 2:
+                return None
+            first = samples[max(0, len(samples) - 1 - window)]
+            second = samples[-1]
+        return calculate_rates(first, second)
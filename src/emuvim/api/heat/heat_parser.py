@@ -1,5 +1,7 @@
 from __future__ import print_function  # TODO remove when print is no longer needed for debugging
 from resources import *
+from subnet_pool import get_subnet_pool
+from collections import OrderedDict, deque
 from datetime import datetime
 import re
 import sys
@@ -20,7 +22,6 @@ class HeatParser:
         self.outputs = None
         self.compute = compute
         self.bufferResource = list()
-        self.subnet_counter = Net.ip_2_int('10.0.0.1')
 
     def parse_input(self, input_dict, stack, dc_label):
         """
@@ -48,17 +49,14 @@ class HeatParser:
         # clear bufferResources
         self.bufferResource = list()
 
-        for resource in self.resources.values():
-            self.handle_resource(resource, stack, dc_label)
+        order, error = self.resolve_order(self.resources)
+        if error is not None:
+            print('Could not create stack: ' + error, file=sys.stderr)
+            return False
 
-        # This loop tries to create all classes which had unresolved dependencies.
-        unresolved_resources_last_round = len(self.bufferResource) + 1
-        while len(self.bufferResource) > 0 and unresolved_resources_last_round > len(self.bufferResource):
-            unresolved_resources_last_round = len(self.bufferResource)
-            number_of_items = len(self.bufferResource)
-            while number_of_items > 0:
-                self.handle_resource(self.bufferResource.pop(0), stack, dc_label)
-                number_of_items -= 1
+        # all references of a resource are created before the resource itself, so every resource is handled once
+        for name in order:
+            self.handle_resource(self.resources[name], stack, dc_label)
 
         if len(self.bufferResource) > 0:
             print(str(len(self.bufferResource)) +
@@ -66,6 +64,111 @@ class HeatParser:
             return False
         return True
 
+    @staticmethod
+    def resolve_order(resources):
+        """
+        Determines the order in which the resources have to be created, so that every resource is created after
+        all resources it refers to.
+
+        :param resources: Dict resource name -> resource of the heat template.
+        :type resources: ``dict``
+        :return: Tuple of the list of resource names in creation order and an error message if the references
+            contain a cycle (the list is None then).
+        :rtype: ``tuple``
+        """
+        return HeatParser._topological_order(HeatParser.find_dependencies(resources))
+
+    @staticmethod
+    def find_dependencies(resources):
+        """
+        Extracts the references (get_resource and depends_on) between the resources. A port additionally depends
+        on the subnets of its network, as it gets its IP address from them.
+
+        :param resources: Dict resource name -> resource of the heat template.
+        :type resources: ``dict``
+        :return: Ordered dict resource name -> set of the names of the resources it depends on.
+        :rtype: ``OrderedDict``
+        """
+        subnets = dict()
+        for name, resource in resources.items():
+            if 'OS::Neutron::Subnet' in resource.get('type', ''):
+                network = HeatParser._get_reference(resource, 'network')
+                if network is not None:
+                    subnets.setdefault(network, set()).add(name)
+
+        dependencies = OrderedDict()
+        for name, resource in resources.items():
+            references = set()
+            HeatParser._collect_references(resource.get('properties', dict()), references)
+            depends_on = resource.get('depends_on', list())
+            if not isinstance(depends_on, list):
+                depends_on = [depends_on]
+            references.update(depends_on)
+            if 'OS::Neutron::Port' in resource.get('type', ''):
+                references.update(subnets.get(HeatParser._get_reference(resource, 'network'), set()))
+            # references to unknown resources are reported by the resource handlers
+            references.discard(name)
+            dependencies[name] = set(r for r in references if r in resources)
+        return dependencies
+
+    @staticmethod
+    def _get_reference(resource, property_name):
+        value = resource.get('properties', dict()).get(property_name)
+        if isinstance(value, dict):
+            return value.get('get_resource')
+        return None
+
+    @staticmethod
+    def _collect_references(value, references):
+        if isinstance(value, dict):
+            for k, v in value.items():
+                if k == 'get_resource' and isinstance(v, basestring):
+                    references.add(v)
+                else:
+                    HeatParser._collect_references(v, references)
+        elif isinstance(value, list):
+            for v in value:
+                HeatParser._collect_references(v, references)
+
+    @staticmethod
+    def _topological_order(dependencies):
+        """
+        Sorts the resources topologically. Resources without mutual dependencies keep the template order.
+
+        :param dependencies: Ordered dict resource name -> set of the names of the resources it depends on.
+        :type dependencies: ``OrderedDict``
+        :return: Tuple of the list of resource names and None, or None and a message that describes a cycle.
+        :rtype: ``tuple``
+        """
+        dependents = dict((name, list()) for name in dependencies)
+        missing = dict()
+        for name, deps in dependencies.items():
+            missing[name] = len(deps)
+            for dep in deps:
+                dependents[dep].append(name)
+
+        ready = deque(name for name in dependencies if missing[name] == 0)
+        order = list()
+        while ready:
+            name = ready.popleft()
+            order.append(name)
+            for dependent in dependents[name]:
+                missing[dependent] -= 1
+                if missing[dependent] == 0:
+                    ready.append(dependent)
+
+        if len(order) == len(dependencies):
+            return order, None
+
+        # follow unresolved dependencies from a remaining resource until a resource repeats
+        path = list()
+        name = next(n for n in dependencies if missing[n] > 0)
+        while name not in path:
+            path.append(name)
+            name = next(d for d in sorted(dependencies[name]) if missing[d] > 0)
+        cycle = path[path.index(name):] + [name]
+        return None, 'Dependency cycle between resources: ' + ' -> '.join(cycle)
+
     def handle_resource(self, resource, stack, dc_label):
         """
         This function will take a resource (from a heat template) and determines which type it is and creates
@@ -107,8 +210,11 @@ class HeatParser:
                 net.subnet_id = resource['properties'].get('id', str(uuid.uuid4()))
                 net.subnet_creation_time = str(datetime.now())
                 # net.set_cidr(resource['properties']['cidr'])
-                net.set_cidr(Net.int_2_ip(self.subnet_counter) + '/24')
-                self.subnet_counter += 256
+                cidr = get_subnet_pool().allocate(owner=net.id)
+                if cidr is None:
+                    logging.warning('Could not allocate a CIDR for subnet %s, the subnet pool is exhausted.'
+                                    % net.subnet_name)
+                net.set_cidr(cidr)
             except Exception as e:
                 logging.warning('Could not create Subnet: ' + e.message)
             return
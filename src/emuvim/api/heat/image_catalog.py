@@ -0,0 +1,102 @@
+from docker import DockerClient
+from emuvim.dcemulator.dockerstate import get_docker_state
+from resources import Image
+import threading
+import time
+
+# seconds after which the image list is read again if the Docker event stream is not available
+IMAGE_CATALOG_TTL = 10
+
+# catalog shared by all OpenStack API endpoints, see get_image_catalog()
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+class ImageCatalog(object):
+    """
+    Catalog of the Docker images that are offered as OpenStack images.
+    The image list is only read from the Docker daemon again if the Docker event stream reported image changes
+    (or after a TTL if the event stream is not available). Known images keep their ID.
+    """
+
+    def __init__(self, dcli=None, ttl=IMAGE_CATALOG_TTL, state=None):
+        """
+        :param dcli: Docker client, created on first use if None
+        :type dcli: :class:`docker.DockerClient`
+        :param ttl: Max. age of the image list in seconds if the Docker event stream is not available
+        :type ttl: ``float``
+        :param state: Docker state view, the shared one if None
+        :type state: :class:`emuvim.dcemulator.dockerstate.DockerState`
+        """
+        self._dcli = dcli
+        self._state = state
+        self.ttl = ttl
+        self._images = dict()
+        self._version = None
+        self._updated = 0
+        self._lock = threading.Lock()
+
+    @property
+    def dcli(self):
+        if self._dcli is None:
+            self._dcli = DockerClient(base_url='unix://var/run/docker.sock')
+        return self._dcli
+
+    @property
+    def images(self):
+        """
+        Known images, updated if necessary.
+
+        :return: Dictionary image name -> :class:`heat.resources.image`
+        :rtype: ``dict``
+        """
+        with self._lock:
+            tags = self._changed_tags()
+            if tags is not None:
+                for t in tags:
+                    t = t.replace(":latest", "")  # only use short tag names for OSM compatibility
+                    if t not in self._images:
+                        self._images[t] = Image(t)
+            return self._images
+
+    def _changed_tags(self):
+        """
+        Returns the current image tags or None if the known images are still up to date.
+        """
+        state = self._state or get_docker_state()
+        if state.synced:
+            version = state.image_version
+            if version == self._version:
+                return None
+            tags = state.images().keys()
+            self._version = version
+            return tags
+        if self._version is None and time.time() - self._updated < self.ttl:
+            return None
+        tags = list()
+        for image in self.dcli.images.list():
+            tags += image.tags
+        self._version = None
+        self._updated = time.time()
+        return tags
+
+    def invalidate(self):
+        """
+        Read the image list from the Docker daemon on the next access.
+        """
+        with self._lock:
+            self._version = None
+            self._updated = 0
+
+
+def get_image_catalog():
+    """
+    Returns the image catalog shared by all OpenStack API endpoints.
+
+    :rtype: :class:`ImageCatalog`
+    """
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ImageCatalog()
+        return _catalog
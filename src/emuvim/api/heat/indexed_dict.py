@@ -0,0 +1,126 @@
+import threading
+
+
+class IndexedDict(dict):
+    """
+    Dictionary ID -> resource with secondary indexes over name attributes of the resources
+    (e.g. name, template_name and full_name). It is used by :class:`heat.compute.OpenstackCompute` to find servers,
+    networks and ports by name without scanning all of them.
+
+    The indexes are updated whenever resources are added or removed. If a name attribute of a stored resource is
+    changed, :func:`reindex` has to be called for this resource.
+    """
+
+    def __init__(self, attributes):
+        """
+        :param attributes: Names of the resource attributes that should be indexed.
+        :type attributes: ``tuple``
+        """
+        super(IndexedDict, self).__init__()
+        self.attributes = attributes
+        # attribute value -> list of dictionary keys
+        self._index = dict()
+        # dictionary key -> indexed attribute values
+        self._values = dict()
+        # id(resource) -> dictionary key
+        self._keys = dict()
+        self._lock = threading.RLock()
+
+    def __setitem__(self, key, resource):
+        with self._lock:
+            if key in self:
+                self._unindex(key)
+            super(IndexedDict, self).__setitem__(key, resource)
+            self._add_to_index(key)
+
+    def __delitem__(self, key):
+        with self._lock:
+            if key in self:
+                self._unindex(key)
+            super(IndexedDict, self).__delitem__(key)
+
+    def pop(self, key, *default):
+        with self._lock:
+            if key in self:
+                self._unindex(key)
+            return super(IndexedDict, self).pop(key, *default)
+
+    def popitem(self):
+        with self._lock:
+            if len(self) == 0:
+                raise KeyError("popitem(): dictionary is empty")
+            key = next(iter(self))
+            return key, self.pop(key)
+
+    def clear(self):
+        with self._lock:
+            super(IndexedDict, self).clear()
+            self._index.clear()
+            self._values.clear()
+            self._keys.clear()
+
+    def update(self, *args, **kwargs):
+        for key, resource in dict(*args, **kwargs).items():
+            self[key] = resource
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def find(self, name_or_id):
+        """
+        Finds a resource by its dictionary key or by one of the indexed attributes.
+
+        :param name_or_id: Dictionary key or value of an indexed attribute.
+        :type name_or_id: ``str``
+        :return: The resource or None if it was not found.
+        """
+        resource = self.get(name_or_id)
+        if resource is not None:
+            return resource
+        with self._lock:
+            for key in self._index.get(name_or_id, ()):
+                resource = self[key]
+                for attribute in self.attributes:
+                    if getattr(resource, attribute, None) == name_or_id:
+                        return resource
+        return None
+
+    def reindex(self, resource):
+        """
+        Updates the indexes after a name attribute of the resource has changed.
+
+        :param resource: A resource that is stored in this dictionary.
+        """
+        with self._lock:
+            key = self._keys.get(id(resource))
+            if key is None or self.get(key) is not resource:
+                return
+            self._unindex(key)
+            self._add_to_index(key)
+
+    def _add_to_index(self, key):
+        resource = self[key]
+        values = set()
+        for attribute in self.attributes:
+            value = getattr(resource, attribute, None)
+            if value is not None:
+                values.add(value)
+        for value in values:
+            self._index.setdefault(value, list()).append(key)
+        self._values[key] = values
+        self._keys[id(resource)] = key
+
+    def _unindex(self, key):
+        for value in self._values.pop(key, ()):
+            keys = self._index.get(value)
+            if keys is None:
+                continue
+            if key in keys:
+                keys.remove(key)
+            if len(keys) == 0:
+                del self._index[value]
+        resource = dict.get(self, key)
+        if resource is not None and self._keys.get(id(resource)) == key:
+            del self._keys[id(resource)]
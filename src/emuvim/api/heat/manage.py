@@ -10,10 +10,11 @@ import logging
 import threading
 import uuid
 import re
-import networkx as nx
 import chain_api
 import json
 from emuvim.api.heat.resources import Net, Port
+from emuvim.dcemulator.cookieallocator import CookieAllocator, COOKIE_NAMESPACE_CHAIN, COOKIE_NAMESPACE_LB, \
+    COOKIE_NAMESPACE_FLOATING_LB, COOKIE_NAMESPACE_ARP_REPLY
 from mininet.node import OVSSwitch, RemoteController, Node
 from openstack_dummies import MonitorDummyApi
 
@@ -40,8 +41,9 @@ class OpenstackManage(object):
             self.init = True
 
         self.endpoints = dict()
-        self.cookies = set()
-        self.cookies.add(0)
+        # replaced by the allocator of the DCNetwork as soon as it is set, so that chains of the gatekeeper and the
+        # openstack api never share a cookie
+        self.cookies = CookieAllocator()
         self.ip = ip
         self.port = port
         self._net = None
@@ -56,6 +58,7 @@ class OpenstackManage(object):
         # flow groups could be handled for each switch separately, but this global group counter should be easier to
         # debug and to maintain
         self.flow_groups = dict()
+        self.flow_group_ids = CookieAllocator()
 
         # we want one global chain api. this should not be datacenter dependent!
         self.chain = chain_api.ChainApi(ip, port, self)
@@ -87,6 +90,7 @@ class OpenstackManage(object):
     def net(self, value):
         if self._net is None:
             self._net = value
+            self.cookies = value.cookie_allocator
             self.init_floating_network()
         self._net = value
 
@@ -136,16 +140,16 @@ class OpenstackManage(object):
         key = "%s:%s" % (ep.ip, ep.port)
         self.endpoints[key] = ep
 
-    def get_cookie(self):
+    def get_cookie(self, namespace=COOKIE_NAMESPACE_CHAIN):
         """
-        Get an unused cookie.
+        Get an unused cookie. Cookies of deleted flows are reused.
 
+        :param namespace: The kind of flow the cookie is used for, e.g. COOKIE_NAMESPACE_LB
+        :type namespace: ``str``
         :return: Cookie
         :rtype: ``int``
         """
-        cookie = int(max(self.cookies) + 1)
-        self.cookies.add(cookie)
-        return cookie
+        return self.cookies.allocate(namespace)
 
     def get_flow_group(self, src_vnf_name, src_vnf_interface):
         """
@@ -159,7 +163,7 @@ class OpenstackManage(object):
         :rtype: ``int``
         """
         if (src_vnf_name, src_vnf_interface) not in self.flow_groups:
-            grp = int(len(self.flow_groups) + 1)
+            grp = self.flow_group_ids.allocate()
             self.flow_groups[(src_vnf_name, src_vnf_interface)] = grp
         else:
             grp = self.flow_groups[(src_vnf_name, src_vnf_interface)]
@@ -224,8 +228,11 @@ class OpenstackManage(object):
                 else:
                     match = "dl_dst=%s" % dst_intf.MAC()
 
-            cookie = kwargs.get('cookie', self.get_cookie())
-            self.cookies.add(cookie)
+            if kwargs.get('cookie') is not None:
+                cookie = kwargs.get('cookie')
+                self.cookies.reserve(cookie, COOKIE_NAMESPACE_CHAIN)
+            else:
+                cookie = self.get_cookie()
             c = self.net.setChain(
                 vnf_src_name, vnf_dst_name,
                 vnf_src_interface=vnf_src_interface,
@@ -353,20 +360,10 @@ class OpenstackManage(object):
         :return: List containing the switch, and the inport number
         :rtype: [``str``, ``int``]
         """
-        src_sw = None
-        src_sw_inport_nr = None
-        for connected_sw in self.net.DCNetwork_graph.neighbors(vnf_name):
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            for link in link_dict:
-                if (link_dict[link]['src_port_id'] == vnf_interface or
-                            link_dict[link][
-                                'src_port_name'] == vnf_interface):
-                    # found the right link and connected switch
-                    src_sw = connected_sw
-                    src_sw_inport_nr = link_dict[link]['dst_port_nr']
-                    break
-
-        return src_sw, src_sw_inport_nr
+        connected = self.net.getConnectedSwitchPort(vnf_name, vnf_interface)
+        if connected is None:
+            return None, None
+        return connected[0], connected[1]
 
     def _get_path(self, src_vnf, dst_vnf, src_vnf_intf, dst_vnf_intf):
         """
@@ -390,32 +387,20 @@ class OpenstackManage(object):
         logging.debug("Find shortest path from vnf %s to %s",
                       src_vnf, dst_vnf)
 
-        for connected_sw in self.net.DCNetwork_graph.neighbors(src_vnf):
-            link_dict = self.net.DCNetwork_graph[src_vnf][connected_sw]
-            for link in link_dict:
-                if (link_dict[link]['src_port_id'] == src_vnf_intf or
-                            link_dict[link][
-                                'src_port_name'] == src_vnf_intf):
-                    # found the right link and connected switch
-                    src_sw = connected_sw
-                    break
-
-        for connected_sw in self.net.DCNetwork_graph.neighbors(dst_vnf):
-            link_dict = self.net.DCNetwork_graph[connected_sw][dst_vnf]
-            for link in link_dict:
-                if link_dict[link]['dst_port_id'] == dst_vnf_intf or \
-                                link_dict[link][
-                                    'dst_port_name'] == dst_vnf_intf:
-                    # found the right link and connected
-                    dst_sw = connected_sw
-                    break
+        connected = self.net.getConnectedSwitchPort(src_vnf, src_vnf_intf)
+        if connected is not None:
+            src_sw = connected[0]
+
+        connected = self.net.getConnectedSwitchPort(dst_vnf, dst_vnf_intf)
+        if connected is not None:
+            dst_sw = connected[0]
         logging.debug("From switch %s to %s " % (src_sw, dst_sw))
 
         # get shortest path
         try:
             # returns the first found shortest path
-            # if all shortest paths are wanted, use: all_shortest_paths
-            path = nx.shortest_path(self.net.DCNetwork_graph, src_sw, dst_sw)
+            # (cached, only switches are considered as hops)
+            path = self.net.path_index.shortest_path(src_sw, dst_sw)
         except:
             logging.exception("No path could be found between {0} and {1} using src_sw={2} and dst_sw={3}".format(
                 src_vnf, dst_vnf, src_sw, dst_sw))
@@ -458,13 +443,9 @@ class OpenstackManage(object):
             raise Exception(u"Source VNF %s or intfs %s does not exist" % (src_vnf_name, src_vnf_interface))
 
         # find the switch belonging to the source interface, as well as the inport nr
-        for connected_sw in net.DCNetwork_graph.neighbors(src_vnf_name):
-            link_dict = net.DCNetwork_graph[src_vnf_name][connected_sw]
-            for link in link_dict:
-                if link_dict[link]['src_port_name'] == src_vnf_interface:
-                    src_sw = connected_sw
-                    src_sw_inport_nr = link_dict[link]['dst_port_nr']
-                    break
+        connected = net.getConnectedSwitchPort(src_vnf_name, src_vnf_interface)
+        if connected is not None:
+            src_sw, src_sw_inport_nr = connected[0], connected[1]
 
         if src_sw is None or src_sw_inport_nr == 0:
             raise Exception(u"Source VNF or interface can not be found.")
@@ -473,11 +454,9 @@ class OpenstackManage(object):
         for vnf_name in dest_intfs_mapping:
             if vnf_name not in net.DCNetwork_graph:
                 raise Exception(u"Target VNF %s is not known." % vnf_name)
-            for connected_sw in net.DCNetwork_graph.neighbors(vnf_name):
-                link_dict = net.DCNetwork_graph[vnf_name][connected_sw]
-                for link in link_dict:
-                    if link_dict[link]['src_port_name'] == dest_intfs_mapping[vnf_name]:
-                        dest_vnf_outport_nrs.append(int(link_dict[link]['dst_port_nr']))
+            connected = net.getConnectedSwitchPort(vnf_name, dest_intfs_mapping[vnf_name])
+            if connected is not None:
+                dest_vnf_outport_nrs.append(int(connected[1]))
         # get first switch
         if (src_vnf_name, src_vnf_interface) not in self.lb_flow_cookies:
             self.lb_flow_cookies[(src_vnf_name, src_vnf_interface)] = list()
@@ -493,7 +472,7 @@ class OpenstackManage(object):
 
         # set up paths for each destination vnf individually
         index = 0
-        cookie = self.get_cookie()
+        cookie = self.get_cookie(COOKIE_NAMESPACE_LB)
         main_cmd = "add-flow -OOpenFlow13"
         self.lb_flow_cookies[(src_vnf_name, src_vnf_interface)].append(cookie)
 
@@ -706,11 +685,9 @@ class OpenstackManage(object):
         for vnf_name in dest_intfs_mapping:
             if vnf_name not in net.DCNetwork_graph:
                 raise Exception(u"Target VNF %s is not known." % vnf_name)
-            for connected_sw in net.DCNetwork_graph.neighbors(vnf_name):
-                link_dict = net.DCNetwork_graph[vnf_name][connected_sw]
-                for link in link_dict:
-                    if link_dict[link]['src_port_name'] == dest_intfs_mapping[vnf_name]:
-                        dest_vnf_outport_nrs.append(int(link_dict[link]['dst_port_nr']))
+            connected = net.getConnectedSwitchPort(vnf_name, dest_intfs_mapping[vnf_name])
+            if connected is not None:
+                dest_vnf_outport_nrs.append(int(connected[1]))
 
         if len(dest_vnf_outport_nrs) == 0:
             raise Exception("There are no paths specified for the loadbalancer")
@@ -719,7 +696,7 @@ class OpenstackManage(object):
 
         # set up paths for each destination vnf individually
         index = 0
-        cookie = self.get_cookie()
+        cookie = self.get_cookie(COOKIE_NAMESPACE_FLOATING_LB)
         main_cmd = "add-flow -OOpenFlow13"
         floating_ip = self.floating_network.get_new_ip_address("floating-ip").split("/")[0]
 
@@ -880,7 +857,7 @@ class OpenstackManage(object):
         :rtype: ``int``
         """
         if cookie is None:
-            cookie = self.get_cookie()
+            cookie = self.get_cookie(COOKIE_NAMESPACE_ARP_REPLY)
         main_cmd = "add-flow -OOpenFlow13"
 
         # first set up ARP requests for the source node, so it will always 'find' a partner
@@ -937,7 +914,7 @@ class OpenstackManage(object):
             if self.net.controller == RemoteController:
                 self.net.ryu_REST('stats/flowentry/delete', data=flow)
 
-        self.cookies.remove(cookie)
+        self.cookies.release(cookie)
         return True
 
     def delete_chain_by_intf(self, src_vnf_name, src_vnf_intf, dst_vnf_name, dst_vnf_intf):
@@ -1007,10 +984,13 @@ class OpenstackManage(object):
             if self.net.controller == RemoteController:
                 self.net.ryu_REST("stats/groupentry/delete", data=switch_del_group)
 
-        # unmap groupid from the interface
+        # unmap groupid from the interface, the group id and the cookies can be used by the next load balancer
         target_pair = (vnf_src_name, vnf_src_interface)
         if target_pair in self.flow_groups:
             del self.flow_groups[target_pair]
+            self.flow_group_ids.release(group_id)
+        for cookie in self.lb_flow_cookies.pop(target_pair, list()):
+            self.cookies.release(cookie)
         if target_pair in self.full_lb_data:
             del self.full_lb_data[target_pair]
 
@@ -1026,7 +1006,7 @@ class OpenstackManage(object):
             raise Exception("Can not delete floating loadbalancer as the flowcookie is not known")
 
         self.delete_flow_by_cookie(cookie)
-        floating_ip = self.floating_cookies[cookie]
+        floating_ip = self.floating_cookies.pop(cookie)
         self.floating_network.withdraw_ip_address(floating_ip)
 
     def set_arp_entry(self, vnf_name, vnf_interface, ip, mac):
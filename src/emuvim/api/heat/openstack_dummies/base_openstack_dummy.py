@@ -1,8 +1,25 @@
 from flask import Flask
 from flask_restful import Api, Resource
+import functools
 import logging
 
 
+def with_stack_lock(method):
+    """
+    Decorator for request handlers that change the compute state of a datacenter (stacks, servers, networks and
+    ports). The handler runs while it holds the stack lock of the datacenter, thus it does not interfere with a stack
+    operation that runs in the background. The stack operations only hold the lock while they change the compute
+    dictionaries, so the handler does not wait until a running deployment is done.
+    """
+
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.api.compute.stack_lock:
+            return method(self, *args, **kwargs)
+
+    return locked
+
+
 class BaseOpenstackDummy(Resource):
     """
     This class is the base class for all openstack entrypoints of son-emu.
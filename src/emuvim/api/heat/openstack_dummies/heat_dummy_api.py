@@ -1,7 +1,8 @@
 from flask import request, Response
 from flask_restful import Resource
 from emuvim.api.heat.resources import Stack
-from emuvim.api.heat.openstack_dummies.base_openstack_dummy import BaseOpenstackDummy
+from emuvim.api.heat.openstack_dummies.base_openstack_dummy import BaseOpenstackDummy, with_stack_lock
+from emuvim.api.heat.compute import HeatApiStackBusyException
 from datetime import datetime
 from emuvim.api.heat.heat_parser import HeatParser
 import logging
@@ -40,6 +41,24 @@ class HeatDummyApi(BaseOpenstackDummy):
             self.app.run(self.ip, self.port, debug=True, use_reloader=False)
 
 
+def status_reason(stack):
+    """
+    Describes the current status of the stack, e.g. the deployment progress or why a stack operation failed.
+
+    :param stack: The requested stack.
+    :type stack: :class:`heat.resources.stack`
+    :return: Returns the status reason string.
+    :rtype: ``str``
+    """
+    if stack.status_reason is not None:
+        return stack.status_reason
+    if len(stack.server_status) == 0:
+        return "Stack %s" % str(stack.status).replace("_", " ").lower()
+    states = [s["status"] for s in stack.server_status.values()]
+    return "%d of %d servers created, %d failed" % (states.count("CREATE_COMPLETE"), len(states),
+                                                  states.count("CREATE_FAILED"))
+
+
 class Shutdown(Resource):
     """
     A get request to /shutdown will shut down this endpoint.
@@ -80,15 +99,17 @@ class HeatCreateStack(Resource):
     def __init__(self, api):
         self.api = api
 
+    @with_stack_lock
     def post(self, tenant_id):
         """
-        Create and deploy a new stack.
+        Create a new stack and deploy it in the background. The stack status is CREATE_IN_PROGRESS until the
+        deployment is done.
 
         :param tenant_id:
         :return: 409, if the stack name was already used.
             400, if the heat template could not be parsed properly.
             500, if any exception occurred while creation.
-            200, if everything worked out.
+            200, if the stack was created and its deployment started.
         """
         logging.debug("API CALL: %s POST" % str(self.__class__.__name__))
 
@@ -104,10 +125,10 @@ class HeatCreateStack(Resource):
             if isinstance(stack_dict['template'], str) or isinstance(stack_dict['template'], unicode):
                 stack_dict['template'] = json.loads(stack_dict['template'])
             if not reader.parse_input(stack_dict['template'], stack, self.api.compute.dc.label):
+                self.api.compute.release_subnet_cidrs(stack)
                 return 'Could not create stack.', 400
 
             stack.creation_time = str(datetime.now())
-            stack.status = "CREATE_COMPLETE"
 
             return_dict = {"stack": {"id": stack.id,
                                      "links": [
@@ -118,7 +139,7 @@ class HeatCreateStack(Resource):
                                          }]}}
 
             self.api.compute.add_stack(stack)
-            self.api.compute.deploy_stack(stack.id)
+            self.api.compute.deploy_stack_async(stack.id)
             return Response(json.dumps(return_dict), status=200, mimetype="application/json")
 
         except Exception as ex:
@@ -146,7 +167,7 @@ class HeatCreateStack(Resource):
                      "links": [],
                      "stack_name": stack.stack_name,
                      "stack_status": stack.status,
-                     "stack_status_reason": "Stack CREATE completed successfully",
+                     "stack_status_reason": status_reason(stack),
                      "updated_time": stack.update_time,
                      "tags": ""
                      })
@@ -208,7 +229,9 @@ class HeatShowStack(Resource):
                     "stack_name": stack.stack_name,
                     "stack_owner": "The owner of the stack.",  # add stack owner
                     "stack_status": stack.status,
-                    "stack_status_reason": "The reason for the current status of the stack.",  # add status reason
+                    "stack_status_reason": status_reason(stack),
+                    # progress and start time of the single servers
+                    "servers": stack.server_status,
                     "template_description": "The description of the stack template.",
                     "stack_user_project_id": "The project UUID of the stack user.",
                     "timeout_mins": "",
@@ -229,6 +252,7 @@ class HeatUpdateStack(Resource):
     def __init__(self, api):
         self.api = api
 
+    @with_stack_lock
     def put(self, tenant_id, stack_name_or_id, stack_id=None):
         """
         Updates an existing stack with a new heat template.
@@ -237,6 +261,7 @@ class HeatUpdateStack(Resource):
         :param stack_name_or_id: Specifies the stack, which should be updated.
         :param stack_id:
         :return: 404, if the requested stack could not be found.
+            409, if the stack has an operation in progress.
             400, if the stack creation (because of errors in the heat template) or the stack update failed.
             500, if any exception occurred while updating.
             202, if everything worked out.
@@ -252,6 +277,8 @@ class HeatUpdateStack(Resource):
                         old_stack = tmp_stack
             if old_stack is None:
                 return 'Could not resolve Stack - ID', 404
+            if self.api.compute.is_stack_busy(old_stack.id):
+                return 'Stack has an operation in progress.', 409
 
             stack_dict = json.loads(request.data)
 
@@ -260,17 +287,24 @@ class HeatUpdateStack(Resource):
             stack.id = old_stack.id
             stack.creation_time = old_stack.creation_time
             stack.update_time = str(datetime.now())
-            stack.status = "UPDATE_COMPLETE"
 
             reader = HeatParser(self.api.compute)
             if isinstance(stack_dict['template'], str) or isinstance(stack_dict['template'], unicode):
                 stack_dict['template'] = json.loads(stack_dict['template'])
             if not reader.parse_input(stack_dict['template'], stack, self.api.compute.dc.label):
+                self.api.compute.release_subnet_cidrs(stack)
                 return 'Could not create stack.', 400
 
-            if not self.api.compute.update_stack(old_stack.id, stack):
+            if not self.api.compute.check_stack(stack):
+                self.api.compute.release_subnet_cidrs(stack)
                 return 'Could not update stack.', 400
 
+            # the stack status is UPDATE_IN_PROGRESS until the update is done
+            try:
+                self.api.compute.update_stack_async(old_stack.id, stack)
+            except HeatApiStackBusyException:
+                self.api.compute.release_subnet_cidrs(stack)
+                return 'Stack has an operation in progress.', 409
             return Response(status=202, mimetype="application/json")
 
         except Exception as ex:
@@ -282,6 +316,7 @@ class HeatDeleteStack(Resource):
     def __init__(self, api):
         self.api = api
 
+    @with_stack_lock
     def delete(self, tenant_id, stack_name_or_id, stack_id=None):
         """
         Deletes an existing stack.
@@ -289,20 +324,23 @@ class HeatDeleteStack(Resource):
         :param tenant_id:
         :param stack_name_or_id: Specifies the stack, which should be deleted.
         :param stack_id:
-        :return: 500, if any exception occurred while deletion.
-            204, if everything worked out.
+        :return: 409, if the stack has an operation in progress.
+            500, if any exception occurred while deletion.
+            204, if the deletion was started. The stack status is DELETE_IN_PROGRESS until it is removed.
         """
         logging.debug("API CALL: %s DELETE" % str(self.__class__.__name__))
         try:
             if stack_name_or_id in self.api.compute.stacks:
-                self.api.compute.delete_stack(stack_name_or_id)
+                self.api.compute.delete_stack_async(stack_name_or_id)
                 return Response('Deleted Stack: ' + stack_name_or_id, 204)
 
             for stack in self.api.compute.stacks.values():
                 if stack.stack_name == stack_name_or_id:
-                    self.api.compute.delete_stack(stack.id)
+                    self.api.compute.delete_stack_async(stack.id)
                     return Response('Deleted Stack: ' + stack_name_or_id, 204)
 
+        except HeatApiStackBusyException:
+            return 'Stack has an operation in progress.', 409
         except Exception as ex:
             logging.exception("Heat: Delete Stack exception")
             return ex.message, 500
@@ -19,6 +19,9 @@ class MonitorDummyApi(BaseOpenstackDummy):
                               resource_class_kwargs={'api': self})
         self.api.add_resource(MonitorVnfDcStack, "/v1/monitor/<dc>/<stack>/<vnf_name>",
                               resource_class_kwargs={'api': self})
+        self.api.add_resource(MonitorVnfBulk, "/v1/monitor/bulk", "/v1/monitor/bulk/<dc>",
+                              "/v1/monitor/bulk/<dc>/<stack>",
+                              resource_class_kwargs={'api': self})
         self.api.add_resource(Shutdown, "/shutdown")
 
     def _start_flask(self):
@@ -83,8 +86,8 @@ class MonitorVnf(Resource):
 
     def get(self, vnf_name):
         """
-        Calculates the workload for the specified docker container. Requires at least one second, to calculate
-        the network traffic and cpu usage over time.
+        Returns the workload of the specified docker container over the last second, as measured by the background
+        sampler. Only blocks (for one second) if the container was not sampled yet.
 
         :param vnf_name: Specifies the docker container via name.
         :type vnf_name: ``str``
@@ -108,11 +111,14 @@ class MonitorVnf(Resource):
                             status=500,
                             mimetype="application/json")
         try:
-            docker_id = DockerUtil.docker_container_id(vnf_name)
-            out_dict = dict()
-            out_dict.update(DockerUtil.monitoring_over_time(docker_id))
-            out_dict.update(DockerUtil.docker_mem(docker_id))
-            out_dict.update(DockerUtil.docker_PIDS(docker_id))
+            # answered from the background sampler, only measured if the vnf was not sampled yet
+            out_dict = DockerUtil.monitoring_from_samples(vnf_name)
+            if out_dict is None:
+                docker_id = DockerUtil.docker_container_id(vnf_name)
+                out_dict = dict()
+                out_dict.update(DockerUtil.monitoring_over_time(docker_id))
+                out_dict.update(DockerUtil.docker_mem(docker_id))
+                out_dict.update(DockerUtil.docker_PIDS(docker_id))
             out_dict['SYS_time'] = int(time.time() * 1000000000)
 
             response = Response(json.dumps(out_dict) + '\n', status=200, mimetype="application/json")
@@ -200,11 +206,14 @@ class MonitorVnfDcStack(Resource):
             return vnf_name
 
         try:
-            docker_id = DockerUtil.docker_container_id(vnf_name)
-            out_dict = dict()
-            out_dict.update(DockerUtil.monitoring_over_time(docker_id))
-            out_dict.update(DockerUtil.docker_mem(docker_id))
-            out_dict.update(DockerUtil.docker_PIDS(docker_id))
+            # answered from the background sampler, only measured if the vnf was not sampled yet
+            out_dict = DockerUtil.monitoring_from_samples(vnf_name)
+            if out_dict is None:
+                docker_id = DockerUtil.docker_container_id(vnf_name)
+                out_dict = dict()
+                out_dict.update(DockerUtil.monitoring_over_time(docker_id))
+                out_dict.update(DockerUtil.docker_mem(docker_id))
+                out_dict.update(DockerUtil.docker_PIDS(docker_id))
             out_dict['SYS_time'] = int(time.time() * 1000000000)
 
             response = Response(json.dumps(out_dict) + '\n', status=200, mimetype="application/json")
@@ -251,3 +260,78 @@ class MonitorVnfDcStack(Resource):
             return Response(u"VNF %s does not exist\n" % (vnf), status=500, mimetype="application/json")
         container_real = 'mn.' + server_real.name
         return container_real
+
+
+class MonitorVnfBulk(Resource):
+    def __init__(self, api):
+        self.api = api
+
+    def get(self, dc=None, stack=None):
+        """
+        Returns the workload of all VNFs (or of all VNFs of a datacenter or stack) in one response.
+        The values are taken from the background sampler, so this call never blocks on the containers.
+
+        Query parameters:
+         * format: 'json' (default) or 'ndjson' to stream one json object per VNF and line
+         * history: if 'true', also return the workload between the samples kept by the sampler
+         * step: downsampling factor for the history, only every step-th sample is used
+
+        :param dc: Only return the VNFs of this datacenter.
+        :type dc: ``str``
+        :param stack: Only return the VNFs of this stack (by stack name).
+        :type stack: ``str``
+        :return: Returns a json response with one entry per VNF, containing the datacenter, the stack and the
+            monitoring values (null if the VNF was not sampled yet).
+        :rtype: :class:`flask.response`
+        """
+        logging.debug("API CALL: %s GET" % str(self.__class__.__name__))
+        try:
+            output = request.args.get("format", "json")
+            with_history = request.args.get("history", "false").lower() == "true"
+            step = int(request.args.get("step", 1))
+            sampler = DockerUtil.get_sampler()
+            vnfs = self._find_vnfs(dc, stack)
+
+            def entries():
+                for dc_label, stack_name, vnf_name in vnfs:
+                    entry = {'name': vnf_name, 'dc': dc_label, 'stack': stack_name,
+                             'stats': DockerUtil.monitoring_from_samples('mn.' + vnf_name)}
+                    if with_history:
+                        entry['history'] = sampler.history('mn.' + vnf_name, step=step)
+                    entry['SYS_time'] = int(time.time() * 1000000000)
+                    yield entry
+
+            if output == "ndjson":
+                response = Response((json.dumps(e) + '\n' for e in entries()), status=200,
+                                    mimetype="application/x-ndjson")
+            else:
+                response = Response(json.dumps({'vnfs': list(entries())}) + '\n', status=200,
+                                    mimetype="application/json")
+            response.headers['Access-Control-Allow-Origin'] = '*'
+            return response
+        except Exception as e:
+            logging.exception(u"%s: Error getting monitoring information.\n %s" % (__name__, e))
+            return Response(u"Error getting monitoring information.\n", status=500, mimetype="application/json")
+
+    def _find_vnfs(self, dc, stack):
+        """
+        :return: List of (datacenter label, stack name, vnf name) tuples.
+        :rtype: ``list``
+        """
+        from emuvim.api.heat.openstack_api_endpoint import OpenstackApiEndpoint
+        vnfs = list()
+        for api in OpenstackApiEndpoint.dc_apis:
+            compute = api.compute
+            if compute.dc is None or (dc is not None and compute.dc.label != dc):
+                continue
+            # stack of each server started by heat
+            server_stacks = dict()
+            for stack_obj in compute.stacks.values():
+                for server in stack_obj.servers.values():
+                    server_stacks[server.name] = stack_obj.stack_name
+            for vnf_name in sorted(compute.dc.containers.keys()):
+                stack_name = server_stacks.get(vnf_name)
+                if stack is not None and stack_name != stack:
+                    continue
+                vnfs.append((compute.dc.label, stack_name, vnf_name))
+        return vnfs
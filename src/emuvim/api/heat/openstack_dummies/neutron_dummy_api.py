@@ -1,6 +1,6 @@
 from flask_restful import Resource
 from flask import request, Response
-from emuvim.api.heat.openstack_dummies.base_openstack_dummy import BaseOpenstackDummy
+from emuvim.api.heat.openstack_dummies.base_openstack_dummy import BaseOpenstackDummy, with_stack_lock
 from datetime import datetime
 import logging
 import json
@@ -235,6 +235,7 @@ class NeutronCreateNetwork(Resource):
     def __init__(self, api):
         self.api = api
 
+    @with_stack_lock
     def post(self):
         """
         Creates a network with the name, specified within the request under ['network']['name'].
@@ -263,6 +264,7 @@ class NeutronUpdateNetwork(Resource):
     def __init__(self, api):
         self.api = api
 
+    @with_stack_lock
     def put(self, network_id):  # TODO currently only the name will be changed
         """
         Updates the existing network with the given parameters.
@@ -287,6 +289,7 @@ class NeutronUpdateNetwork(Resource):
                     pass  # tmp_network_dict["subnets"] = None
                 if "name" in network_dict["network"] and net.name != network_dict["network"]["name"]:
                     net.name = network_dict["network"]["name"]
+                    self.api.compute.nets.reindex(net)
                 if "admin_state_up" in network_dict["network"]:
                     pass  # tmp_network_dict["admin_state_up"] = True
                 if "tenant_id" in network_dict["network"]:
@@ -307,6 +310,7 @@ class NeutronDeleteNetwork(Resource):
     def __init__(self, api):
         self.api = api
 
+    @with_stack_lock
     def delete(self, network_id):
         """
         Deletes the specified network and all its subnets.
@@ -433,6 +437,7 @@ class NeutronCreateSubnet(Resource):
     def __init__(self, api):
         self.api = api
 
+    @with_stack_lock
     def post(self):
         """
         Creates a subnet with the name, specified within the request under ['subnet']['name'].
@@ -457,7 +462,7 @@ class NeutronCreateSubnet(Resource):
                 return Response('Only one subnet per network is supported\n', status=409, mimetype='application/json')
 
             if "cidr" in subnet_dict["subnet"]:
-                if not net.set_cidr(subnet_dict["subnet"]["cidr"]):
+                if not self.api.compute.set_subnet_cidr(net, subnet_dict["subnet"]["cidr"]):
                     return Response('Wrong CIDR format.\n', status=400, mimetype='application/json')
             else:
                 return Response('No CIDR found.\n', status=400, mimetype='application/json')
@@ -487,6 +492,7 @@ class NeutronUpdateSubnet(Resource):
     def __init__(self, api):
         self.api = api
 
+    @with_stack_lock
     def put(self, subnet_id):
         """
         Updates the existing subnet with the given parameters.
@@ -517,7 +523,7 @@ class NeutronUpdateSubnet(Resource):
                     if "ip_version" in subnet_dict["subnet"]:
                         pass
                     if "cidr" in subnet_dict["subnet"]:
-                        net.set_cidr(subnet_dict["subnet"]["cidr"])
+                        self.api.compute.set_subnet_cidr(net, subnet_dict["subnet"]["cidr"])
                     if "id" in subnet_dict["subnet"]:
                         net.subnet_id = subnet_dict["subnet"]["id"]
                     if "enable_dhcp" in subnet_dict["subnet"]:
@@ -538,6 +544,7 @@ class NeutronDeleteSubnet(Resource):
     def __init__(self, api):
         self.api = api
 
+    @with_stack_lock
     def delete(self, subnet_id):
         """
         Deletes the specified subnet.
@@ -566,7 +573,7 @@ class NeutronDeleteSubnet(Resource):
 
                             net.subnet_id = None
                             net.subnet_name = None
-                            net.set_cidr(None)
+                            self.api.compute.set_subnet_cidr(net, None)
                             net.start_end_dict = None
                             net.reset_issued_ip_addresses()
 
@@ -670,6 +677,7 @@ class NeutronCreatePort(Resource):
     def __init__(self, api):
         self.api = api
 
+    @with_stack_lock
     def post(self):
         """
         Creates a port with the name, specified within the request under ['port']['name'].
@@ -736,6 +744,7 @@ class NeutronUpdatePort(Resource):
     def __init__(self, api):
         self.api = api
 
+    @with_stack_lock
     def put(self, port_id):
         """
         Updates the existing port with the given parameters.
@@ -774,6 +783,7 @@ class NeutronUpdatePort(Resource):
                 port.mac_address = port_dict["port"]["mac_address"]
             if "name" in port_dict["port"] and port_dict["port"]["name"] != port.name:
                 port.set_name(port_dict["port"]["name"])
+                self.api.compute.ports.reindex(port)
                 if stack is not None:
                     if port.net_name in stack.nets:
                         stack.nets[port.net_name].update_port_name_for_ip_address(port.ip_address, port.name)
@@ -797,6 +807,7 @@ class NeutronDeletePort(Resource):
     def __init__(self, api):
         self.api = api
 
+    @with_stack_lock
     def delete(self, port_id):
         """
         Deletes the specified network and all its subnets.
@@ -870,6 +881,7 @@ class NeutronAddFloatingIp(Resource):
         return Response(json.dumps(resp), status=200, mimetype='application/json')
 
 
+    @with_stack_lock
     def post(self):
         """
         Adds a floating IP to neutron.
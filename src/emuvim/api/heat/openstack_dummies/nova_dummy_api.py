@@ -1,6 +1,6 @@
 from flask_restful import Resource
 from flask import Response, request
-from emuvim.api.heat.openstack_dummies.base_openstack_dummy import BaseOpenstackDummy
+from emuvim.api.heat.openstack_dummies.base_openstack_dummy import BaseOpenstackDummy, with_stack_lock
 import logging
 import json
 import uuid
@@ -195,6 +195,7 @@ class NovaListServersApi(Resource):
             logging.exception(u"%s: Could not retrieve the list of servers." % __name__)
             return ex.message, 500
 
+    @with_stack_lock
     def post(self, id):
         """
         Creates a server instance.
@@ -217,6 +218,7 @@ class NovaListServersApi(Resource):
 
             server = self.api.compute.create_server(name)
             server.full_name = str(self.api.compute.dc.label) + "_man_" + server_dict["name"]
+            self.api.compute.computeUnits.reindex(server)
 
             for flavor in self.api.compute.flavors.values():
                 if flavor.id == server_dict.get('flavorRef', ''):
@@ -262,6 +264,7 @@ class NovaListServersDetailed(Resource):
 
         try:
             resp = {"servers": list()}
+            images = self.api.compute.images
             for server in self.api.compute.computeUnits.values():
                 s = server.create_server_dict(self.api.compute)
                 s['links'] = [{'href': "http://%s:%d/v2.1/%s/servers/%s" % (self.api.ip,
@@ -281,7 +284,7 @@ class NovaListServersDetailed(Resource):
                         }
                     ]
                 }
-                image = self.api.compute.images[server.image]
+                image = images[server.image]
                 s['image'] = {
                     "id": image.id,
                     "links": [
@@ -341,6 +344,7 @@ class NovaListFlavors(Resource):
             logging.exception(u"%s: Could not retrieve the list of servers." % __name__)
             return ex.message, 500
 
+    @with_stack_lock
     def post(self, id):
         logging.debug("API CALL: %s POST" % str(self.__class__.__name__))
         data = json.loads(request.data).get("flavor")
@@ -405,6 +409,7 @@ class NovaListFlavorsDetails(Resource):
             logging.exception(u"%s: Could not retrieve the list of servers." % __name__)
             return ex.message, 500
 
+    @with_stack_lock
     def post(self, id):
         logging.debug("API CALL: %s POST" % str(self.__class__.__name__))
         data = json.loads(request.data).get("flavor")
@@ -645,6 +650,7 @@ class NovaInterfaceToServer(Resource):
     def __init__(self, api):
         self.api = api
 
+    @with_stack_lock
     def post(self, id, serverid):
         """
         Add an interface to the specified server.
@@ -723,6 +729,7 @@ class NovaShowAndDeleteInterfaceAtServer(Resource):
     def __init__(self, api):
         self.api = api
 
+    @with_stack_lock
     def delete(self, id, serverid, port_id):
         """
         Deletes an existing interface.
@@ -746,11 +753,9 @@ class NovaShowAndDeleteInterfaceAtServer(Resource):
             if port is None:
                 return Response("Port with id or name %s does not exists." % port_id, status=404)
 
-            for link in self.api.compute.dc.net.links:
-                if str(link.intf1) == port.intf_name and \
-                                str(link.intf1.ip) == port.ip_address.split('/')[0]:
-                    self.api.compute.dc._remove_link(link.intf1.node.name, link)
-                    break
+            link = self.api.compute._find_port_link(port)
+            if link is not None:
+                self.api.compute._remove_link(link.intf1.node.name, link)
 
             if self.api.manage.get_flow_group(server.name, port.intf_name) is not None:
                 self.api.manage.delete_loadbalancer(server.name, port.intf_name)
@@ -0,0 +1,145 @@
+WORD_SIZE = 64
+FULL_WORD = (1 << WORD_SIZE) - 1
+
+
+class IPAllocator(object):
+    """
+    Allocator for the integer IP addresses of a subnet.
+
+    Allocated addresses are tracked in a sparse bitmap: a dictionary of 64 bit words that only holds words with at
+    least one allocated address. The memory usage grows with the number of allocated addresses and not with the size
+    of the subnet, so /16 or larger subnets need no preallocated structures.
+    New addresses are handed out next-fit: the search continues behind the last allocated address and skips full words,
+    thus filling a subnet takes linear time. Reserving and releasing a specific address is O(1).
+    """
+
+    def __init__(self, first, last, dynamic_first=None):
+        """
+        :param first: Lowest address that can be reserved.
+        :type first: ``int``
+        :param last: Highest address that can be reserved or allocated.
+        :type last: ``int``
+        :param dynamic_first: Lowest address that is handed out by :func:`allocate`, defaults to `first`.
+        :type dynamic_first: ``int``
+        """
+        self.first = first
+        self.last = last
+        self.dynamic_first = first if dynamic_first is None else dynamic_first
+        self.reset()
+
+    def reset(self):
+        """
+        Releases all addresses and moves the next-fit cursor back to the start of the range.
+        """
+        # word index -> bitmap of the allocated addresses, only words that are not empty
+        self._words = dict()
+        # address -> owner
+        self._owners = dict()
+        self._cursor = self.dynamic_first
+
+    def __len__(self):
+        return len(self._owners)
+
+    def __contains__(self, address):
+        return address in self._owners
+
+    def owner(self, address):
+        """
+        :return: The owner of the address or None if it is not allocated.
+        """
+        return self._owners.get(address)
+
+    def set_owner(self, address, owner):
+        """
+        Sets the owner of an address, the address is marked as allocated if it was not before.
+        """
+        self._mark(address)
+        self._owners[address] = owner
+
+    def allocate(self, owner):
+        """
+        Allocates the next free address behind the cursor, wrapping around once at the end of the range.
+
+        :param owner: Owner of the new address, e.g. the port name.
+        :return: The allocated address or None if the range is exhausted.
+        :rtype: ``int``
+        """
+        address = self._find_free(self._cursor, self.last)
+        if address is None:
+            address = self._find_free(self.dynamic_first, min(self._cursor - 1, self.last))
+        if address is None:
+            return None
+        self.set_owner(address, owner)
+        self._cursor = address + 1 if address < self.last else self.dynamic_first
+        return address
+
+    def reserve(self, address, owner):
+        """
+        Allocates a specific address.
+
+        :return: True if the address was free and lies within the range, otherwise False.
+        :rtype: ``bool``
+        """
+        if address is None or address < self.first or address > self.last or address in self._owners:
+            return False
+        self.set_owner(address, owner)
+        return True
+
+    def release(self, address):
+        """
+        Releases an allocated address.
+
+        :return: The former owner or None if the address was not allocated.
+        """
+        if address not in self._owners:
+            return None
+        index, bit = divmod(address, WORD_SIZE)
+        word = self._words[index] & ~(1 << bit)
+        if word == 0:
+            del self._words[index]
+        else:
+            self._words[index] = word
+        return self._owners.pop(address)
+
+    def reserve_many(self, addresses):
+        """
+        Reserves several addresses at once.
+
+        :param addresses: Iterable of (address, owner) tuples.
+        :return: List of the addresses that could not be reserved.
+        :rtype: ``list``
+        """
+        return [address for address, owner in addresses if not self.reserve(address, owner)]
+
+    def release_many(self, addresses):
+        """
+        Releases several addresses at once, addresses that are not allocated are ignored.
+
+        :param addresses: Iterable of addresses.
+        """
+        for address in addresses:
+            self.release(address)
+
+    def _mark(self, address):
+        index, bit = divmod(address, WORD_SIZE)
+        self._words[index] = self._words.get(index, 0) | (1 << bit)
+
+    def _find_free(self, start, end):
+        """
+        Finds the lowest free address in [start, end], full words are skipped as a whole.
+        """
+        address = start
+        while address <= end:
+            index, bit = divmod(address, WORD_SIZE)
+            word = self._words.get(index, 0)
+            if word == FULL_WORD:
+                address = (index + 1) * WORD_SIZE
+                continue
+            # lowest zero bit at or above the current position
+            free = ~word & (FULL_WORD ^ ((1 << bit) - 1))
+            if free == 0:
+                address = (index + 1) * WORD_SIZE
+                continue
+            address = index * WORD_SIZE + (free & -free).bit_length() - 1
+            return address if address <= end else None
+        return None
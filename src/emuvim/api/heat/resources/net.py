@@ -1,3 +1,4 @@
+from ip_allocator import IPAllocator
 import re
 
 
@@ -13,7 +14,8 @@ class Net:
         self.segmentation_id = None  # not set
         self._cidr = None
         self.start_end_dict = None
-        self._issued_ip_addresses = dict()
+        # issued IP addresses, created together with the start_end_dict
+        self._ip_allocator = None
 
     def get_short_id(self):
         """
@@ -33,20 +35,13 @@ class Net:
         :return: Returns a unused IP Address or none if all are in use.
         :rtype: ``str``
         """
-        if self.start_end_dict is None:
+        if self.start_end_dict is None or self._ip_allocator is None:
             return None
 
-        int_start_ip = Net.ip_2_int(self.start_end_dict['start']) + 2  # First address as network address not usable
-        # Second one is for gateways only
-        int_end_ip = Net.ip_2_int(self.start_end_dict['end']) - 1  # Last address for broadcasts
-        while self._issued_ip_addresses.has_key(int_start_ip) and int_start_ip <= int_end_ip:
-            int_start_ip += 1
-
-        if int_start_ip > int_end_ip:
+        int_ip = self._ip_allocator.allocate(port_name)
+        if int_ip is None:
             return None
-
-        self._issued_ip_addresses[int_start_ip] = port_name
-        return Net.int_2_ip(int_start_ip) + '/' + self._cidr.rsplit('/', 1)[1]
+        return Net.int_2_ip(int_ip) + '/' + self._cidr.rsplit('/', 1)[1]
 
     def assign_ip_address(self, cidr, port_name):
         """
@@ -56,17 +51,9 @@ class Net:
         :type ip: ``str``
         :return:
         """
-        int_ip = Net.cidr_2_int(cidr)
-        if self._issued_ip_addresses.has_key(int_ip):
-            return False
-
-        int_start_ip = Net.ip_2_int(self.start_end_dict['start']) + 1  # First address as network address not usable
-        int_end_ip = Net.ip_2_int(self.start_end_dict['end']) - 1  # Last address for broadcasts
-        if int_ip < int_start_ip or int_ip > int_end_ip:
+        if self._ip_allocator is None:
             return False
-
-        self._issued_ip_addresses[int_ip] = port_name
-        return True
+        return self._ip_allocator.reserve(Net.cidr_2_int(cidr), port_name)
 
     def ip_used(self, cidr):
         """
@@ -76,11 +63,9 @@ class Net:
         :type ``str``
         :return: Returns True if the IP is already issued, otherwise returns False.
         """
-        int_ip = Net.cidr_2_int(cidr)
-
-        if self._issued_ip_addresses.has_key(int_ip):
-            return True
-        return False
+        if self._ip_allocator is None:
+            return False
+        return Net.cidr_2_int(cidr) in self._ip_allocator
 
     def is_my_ip(self, cidr, port_name):
         """
@@ -90,14 +75,13 @@ class Net:
         :param port_name:
         :return:
         """
-        int_ip = Net.cidr_2_int(cidr)
-
-        if not self._issued_ip_addresses.has_key(int_ip):
+        if self._ip_allocator is None:
             return False
 
-        if self._issued_ip_addresses[int_ip] == port_name:
-            return True
-        return False
+        int_ip = Net.cidr_2_int(cidr)
+        if int_ip not in self._ip_allocator:
+            return False
+        return self._ip_allocator.owner(int_ip) == port_name
 
     def withdraw_ip_address(self, ip_address):
         """
@@ -106,22 +90,44 @@ class Net:
         :param ip_address: The issued IP address.
         :type ip_address: ``str``
         """
-        if ip_address is None:
+        if ip_address is None or self._ip_allocator is None:
             return
 
-        if "/" in ip_address:
-            address, suffix = ip_address.rsplit('/', 1)
-        else:
-            address = ip_address
-        int_ip_address = Net.ip_2_int(address)
-        if int_ip_address in self._issued_ip_addresses.keys():
-            del self._issued_ip_addresses[int_ip_address]
+        self._ip_allocator.release(Net.cidr_2_int(ip_address))
+
+    def reserve_ip_addresses(self, cidrs):
+        """
+        Assigns several IP addresses at once.
+
+        :param cidrs: Dict IP address (e.g. 10.0.0.1/24) -> port name.
+        :type cidrs: ``dict``
+        :return: List of the IP addresses that were already in use or do not belong to the subnet.
+        :rtype: ``list``
+        """
+        if self._ip_allocator is None:
+            return list(cidrs.keys())
+        int_ips = dict((Net.cidr_2_int(cidr), cidr) for cidr in cidrs)
+        failed = self._ip_allocator.reserve_many((Net.cidr_2_int(cidr), port_name)
+                                                 for cidr, port_name in cidrs.items())
+        return [int_ips[int_ip] for int_ip in failed]
+
+    def withdraw_ip_addresses(self, ip_addresses):
+        """
+        Removes several IP addresses from the list of issued addresses.
+
+        :param ip_addresses: List of issued IP addresses.
+        :type ip_addresses: ``list``
+        """
+        if self._ip_allocator is None:
+            return
+        self._ip_allocator.release_many(Net.cidr_2_int(ip) for ip in ip_addresses if ip is not None)
 
     def reset_issued_ip_addresses(self):
         """
         Resets all issued IP addresses.
         """
-        self._issued_ip_addresses = dict()
+        if self._ip_allocator is not None:
+            self._ip_allocator.reset()
 
     def update_port_name_for_ip_address(self, ip_address, port_name):
         """
@@ -132,9 +138,9 @@ class Net:
         :param port_name: The new port name
         :type port_name: ``str``
         """
-        address, suffix = ip_address.rsplit('/', 1)
-        int_ip_address = Net.ip_2_int(address)
-        self._issued_ip_addresses[int_ip_address] = port_name
+        if self._ip_allocator is None:
+            return
+        self._ip_allocator.set_owner(Net.cidr_2_int(ip_address), port_name)
 
     def set_cidr(self, cidr):
         """
@@ -152,9 +158,8 @@ class Net:
         if not self.check_cidr_format(cidr):
             return False
 
-        if len(self._issued_ip_addresses) > 0:
-            self.reset_issued_ip_addresses()
         self.start_end_dict = self.calculate_start_and_end_dict(cidr)
+        self._ip_allocator = Net.create_ip_allocator(self.start_end_dict)
         self._cidr = cidr
         return True
 
@@ -170,7 +175,7 @@ class Net:
     def clear_cidr(self):
         self._cidr = None
         self.start_end_dict = dict()
-        self.reset_issued_ip_addresses()
+        self._ip_allocator = None
 
     def calculate_start_and_end_dict(self, cidr):
         """
@@ -194,6 +199,21 @@ class Net:
 
         return {'start': Net.int_2_ip(start), 'end': Net.int_2_ip(end)}
 
+    @staticmethod
+    def create_ip_allocator(start_end_dict):
+        """
+        Creates the allocator for the addresses of the subnet. The first address is the network address and the last
+        one is used for broadcasts, both are never issued. The second address is reserved for gateways, it is only
+        issued if it is assigned explicitly.
+
+        :param start_end_dict: Dict with start and end ip address.
+        :type start_end_dict: ``dict``
+        :rtype: :class:`heat.resources.ip_allocator.IPAllocator`
+        """
+        int_start_ip = Net.ip_2_int(start_end_dict['start'])
+        int_end_ip = Net.ip_2_int(start_end_dict['end'])
+        return IPAllocator(int_start_ip + 1, int_end_ip - 1, dynamic_first=int_start_ip + 2)
+
     @staticmethod
     def cidr_2_int(cidr):
         if cidr is None:
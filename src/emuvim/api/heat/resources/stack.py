@@ -11,6 +11,9 @@ class Stack:
         self.creation_time = None
         self.update_time = None
         self.status = None
+        self.status_reason = None
+        # server name -> {"status": ..., "time": seconds it took to start the server}
+        self.server_status = dict()
         if id is None:
             self.id = str(uuid.uuid4())
         else:
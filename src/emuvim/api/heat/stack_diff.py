@@ -0,0 +1,108 @@
+class StackDiff(object):
+    """
+    Change set between the deployed version of a stack and its new version.
+
+    Servers, networks and routers are matched by name. The attributes of matched servers and the ports of a
+    server that keeps running are compared when the plan is created (see :func:`plan`), after the new stack
+    was added to the compute dictionaries and got its IP addresses, so that only changed servers are restarted
+    and only links of changed ports are replaced. All comparisons use dictionaries, the diff is linear in the size of both stacks.
+    """
+
+    # operations of the plan
+    STOP_SERVER = "stop_server"
+    REMOVE_LINK = "remove_link"
+    REPLACE_LINK = "replace_link"
+    ADD_LINK = "add_link"
+    START_SERVERS = "start_servers"
+
+    def __init__(self, old_stack, new_stack):
+        """
+        :param old_stack: The currently deployed stack.
+        :type old_stack: :class:`heat.resources.stack`
+        :param new_stack: The new version of the stack.
+        :type new_stack: :class:`heat.resources.stack`
+        """
+        self.old_stack = old_stack
+        self.new_stack = new_stack
+
+        old_servers = self._by_name(old_stack.servers)
+        new_servers = self._by_name(new_stack.servers)
+        self.added_servers = [s for name, s in new_servers.items() if name not in old_servers]
+        self.removed_servers = [s for name, s in old_servers.items() if name not in new_servers]
+        # (old, new) pairs of servers that exist in both stacks
+        self.matched_servers = [(s, new_servers[name]) for name, s in old_servers.items() if name in new_servers]
+
+        old_nets = self._by_name(old_stack.nets)
+        new_nets = self._by_name(new_stack.nets)
+        self.removed_nets = [n for name, n in old_nets.items() if name not in new_nets]
+        # (old, new) pairs of networks that exist in both stacks
+        self.kept_nets = [(n, new_nets[name]) for name, n in old_nets.items() if name in new_nets]
+
+    @staticmethod
+    def _by_name(resources):
+        return dict((r.name, r) for r in resources.values())
+
+    def transfer_ids(self):
+        """
+        Lets the components of the new stack that also exist in the old stack keep their IDs.
+        """
+        for old, new in self.matched_servers:
+            new.id = old.id
+        new_subnets = dict((n.subnet_name, n) for n in self.new_stack.nets.values())
+        for old, new in self.kept_nets:
+            new.id = old.id
+            subnet = new_subnets.get(old.subnet_name)
+            if subnet is not None and old.subnet_name is not None:
+                subnet.subnet_id = old.subnet_id
+        new_ports = self._by_name(self.new_stack.ports)
+        for port in self.old_stack.ports.values():
+            if port.name in new_ports:
+                new_ports[port.name].id = port.id
+        new_routers = self._by_name(self.new_stack.routers)
+        for router in self.old_stack.routers.values():
+            if router.name in new_routers:
+                new_routers[router.name].id = router.id
+
+    def plan(self):
+        """
+        Creates the sequence of operations that transforms the old into the new stack. The IP addresses of the new
+        stack have to be assigned before.
+
+        :return: List of operation tuples, the first element is the operation (e.g. StackDiff.STOP_SERVER).
+        :rtype: ``list``
+        """
+        # servers whose attributes differ have to be restarted, the others keep running
+        changed_servers = [(old, new) for old, new in self.matched_servers if not old.compare_attributes(new)]
+        kept_servers = [(old, new) for old, new in self.matched_servers if old.compare_attributes(new)]
+
+        operations = list()
+        for server in self.removed_servers:
+            operations.append((self.STOP_SERVER, server))
+        for old, new in changed_servers:
+            operations.append((self.STOP_SERVER, old))
+
+        old_ports = self.old_stack.ports
+        new_ports = self.new_stack.ports
+        for old, new in kept_servers:
+            new_port_names = set(new.port_names)
+            for port_name in old.port_names:
+                old_port = old_ports.get(port_name)
+                if old_port is None:
+                    continue
+                new_port = new_ports.get(port_name)
+                if new_port is None or port_name not in new_port_names:
+                    operations.append((self.REMOVE_LINK, old.name, old_port))
+                elif old_port == new_port:
+                    # the link stays, the port of the new stack has to use its interface
+                    new_port.update_intf_name(old_port.intf_name)
+                else:
+                    operations.append((self.REPLACE_LINK, old.name, old_port, new_port))
+            old_port_names = set(old.port_names)
+            for port_name in new.port_names:
+                if port_name not in old_port_names and port_name in new_ports:
+                    operations.append((self.ADD_LINK, old.name, new_ports[port_name]))
+
+        start = self.added_servers + [new for old, new in changed_servers]
+        if len(start) > 0:
+            operations.append((self.START_SERVERS, start))
+        return operations
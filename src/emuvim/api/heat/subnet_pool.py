@@ -0,0 +1,194 @@
+from resources import Net
+import heapq
+import threading
+
+# address range from which the subnets of all OpenStack API endpoints are taken
+SUBNET_POOL_CIDR = "10.0.0.0/8"
+# prefix length of subnets that are created without a CIDR, e.g. by the heat parser
+DEFAULT_SUBNET_PREFIX_LENGTH = 24
+
+# pool shared by all OpenStack API endpoints, see get_subnet_pool()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class SubnetPool(object):
+    """
+    Hands out non-overlapping subnets of arbitrary prefix length from one address range (buddy allocation).
+
+    Free blocks are kept per prefix length in a set (membership) and a heap (lowest address first). A request for a
+    prefix length takes the lowest free block of that length or splits the smallest larger free block; released blocks
+    are merged with their free buddy. Allocation, reservation and release therefore take O(log n) steps per prefix
+    length, independent of the number of subnets that are in use.
+    """
+
+    def __init__(self, cidr=SUBNET_POOL_CIDR):
+        """
+        :param cidr: Address range of the pool, e.g. 10.0.0.0/8
+        :type cidr: ``str``
+        """
+        self.network, self.prefix_length = self._parse(cidr)
+        # prefix length -> set of free block addresses
+        self._free = dict()
+        # prefix length -> heap of free block addresses, may contain addresses that are no longer free
+        self._heaps = dict()
+        # block address -> (prefix length, owner)
+        self._allocated = dict()
+        self._lock = threading.Lock()
+        self._add_free(self.network, self.prefix_length)
+
+    def __len__(self):
+        return len(self._allocated)
+
+    @staticmethod
+    def _parse(cidr):
+        address, suffix = cidr.rsplit('/', 1)
+        prefix_length = int(suffix)
+        mask = (2 ** 32 - 1) ^ ((1 << (32 - prefix_length)) - 1)
+        return Net.ip_2_int(address) & mask, prefix_length
+
+    @staticmethod
+    def _size(prefix_length):
+        return 1 << (32 - prefix_length)
+
+    def allocate(self, prefix_length=DEFAULT_SUBNET_PREFIX_LENGTH, owner=None):
+        """
+        Allocates a subnet with the given prefix length. The smallest free block that fits is used, the lowest one
+        if there are several.
+
+        :param prefix_length: Prefix length of the subnet, e.g. 24
+        :type prefix_length: ``int``
+        :param owner: Optional owner of the subnet, e.g. the network ID.
+        :return: The CIDR of the subnet, e.g. 10.0.1.0/24, or None if the pool is exhausted.
+        :rtype: ``str``
+        """
+        if prefix_length < self.prefix_length or prefix_length > 32:
+            return None
+        with self._lock:
+            length = prefix_length
+            while length >= self.prefix_length and len(self._free.get(length, ())) == 0:
+                length -= 1
+            if length < self.prefix_length:
+                return None
+            block = self._pop_free(length)
+            # split the block, the upper halves stay free
+            while length < prefix_length:
+                length += 1
+                self._add_free(block + self._size(length), length)
+            self._allocated[block] = (prefix_length, owner)
+            return "%s/%d" % (Net.int_2_ip(block), prefix_length)
+
+    def reserve(self, cidr, owner=None):
+        """
+        Reserves a specific subnet, e.g. one that was requested by a user.
+
+        :param cidr: The subnet, e.g. 10.0.1.0/24
+        :type cidr: ``str``
+        :param owner: Optional owner of the subnet, e.g. the network ID.
+        :return: True if the subnet was reserved, False if it overlaps with an allocated subnet or is not part of
+            the pool.
+        :rtype: ``bool``
+        """
+        block, prefix_length = self._parse(cidr)
+        if prefix_length < self.prefix_length or \
+                block & ~(self._size(self.prefix_length) - 1) != self.network:
+            return False
+        with self._lock:
+            # find the free block that contains the subnet
+            length = prefix_length
+            while length >= self.prefix_length:
+                candidate = block & ~(self._size(length) - 1)
+                if candidate in self._free.get(length, ()):
+                    break
+                length -= 1
+            if length < self.prefix_length:
+                return False
+            self._free[length].discard(candidate)
+            # split it until only the subnet is left
+            while length < prefix_length:
+                length += 1
+                half = self._size(length)
+                if block & half:
+                    self._add_free(candidate, length)
+                    candidate += half
+                else:
+                    self._add_free(candidate + half, length)
+            self._allocated[block] = (prefix_length, owner)
+            return True
+
+    def release(self, cidr, owner=None):
+        """
+        Releases an allocated or reserved subnet.
+
+        :param cidr: The subnet, e.g. 10.0.1.0/24
+        :type cidr: ``str``
+        :param owner: If set, the subnet is only released if it belongs to this owner.
+        :return: True if the subnet was released.
+        :rtype: ``bool``
+        """
+        if cidr is None:
+            return False
+        block, prefix_length = self._parse(cidr)
+        with self._lock:
+            entry = self._allocated.get(block)
+            if entry is None or entry[0] != prefix_length or (owner is not None and entry[1] != owner):
+                return False
+            del self._allocated[block]
+            # merge the block with its buddy as long as the buddy is free
+            length = prefix_length
+            while length > self.prefix_length:
+                buddy = block ^ self._size(length)
+                free = self._free.get(length, ())
+                if buddy not in free:
+                    break
+                free.discard(buddy)
+                block = min(block, buddy)
+                length -= 1
+            self._add_free(block, length)
+            return True
+
+    def set_owner(self, cidr, owner):
+        """
+        Changes the owner of an allocated or reserved subnet, e.g. when a network takes over the ID of another one.
+
+        :param cidr: The subnet, e.g. 10.0.1.0/24
+        :type cidr: ``str``
+        :param owner: The new owner of the subnet.
+        :return: True if the subnet is allocated and belongs to the new owner now.
+        :rtype: ``bool``
+        """
+        if cidr is None:
+            return False
+        block, prefix_length = self._parse(cidr)
+        with self._lock:
+            entry = self._allocated.get(block)
+            if entry is None or entry[0] != prefix_length:
+                return False
+            self._allocated[block] = (prefix_length, owner)
+            return True
+
+    def _add_free(self, block, prefix_length):
+        self._free.setdefault(prefix_length, set()).add(block)
+        heapq.heappush(self._heaps.setdefault(prefix_length, list()), block)
+
+    def _pop_free(self, prefix_length):
+        free = self._free[prefix_length]
+        heap = self._heaps[prefix_length]
+        while True:
+            block = heapq.heappop(heap)
+            if block in free:
+                free.discard(block)
+                return block
+
+
+def get_subnet_pool():
+    """
+    Returns the subnet pool shared by all OpenStack API endpoints.
+
+    :rtype: :class:`SubnetPool`
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SubnetPool()
+        return _pool
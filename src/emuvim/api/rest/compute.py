@@ -29,6 +29,7 @@ import logging
 from flask_restful import Resource
 from flask import request
 import json
+from emuvim.dcemulator.node import list_compute_status
 
 logging.basicConfig(level=logging.INFO)
 
@@ -142,11 +143,10 @@ class ComputeList(Resource):
                 all_containers = []
                 for dc in dcs.itervalues():
                     all_containers += dc.listCompute()
-                return [(c.name, c.getStatus()) for c in all_containers], 200, CORS_HEADER
+                return list_compute_status(all_containers), 200, CORS_HEADER
             else:
                 # return list of compute nodes for specified DC
-                return [(c.name, c.getStatus())
-                        for c in dcs.get(dc_label).listCompute()], 200, CORS_HEADER
+                return list_compute_status(dcs.get(dc_label).listCompute()), 200, CORS_HEADER
         except Exception as ex:
             logging.exception("API error.")
             return ex.message, 500, CORS_HEADER
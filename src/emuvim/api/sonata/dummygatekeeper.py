@@ -39,12 +39,15 @@ import hashlib
 import zipfile
 import yaml
 import threading
-from docker import DockerClient, APIClient
+import time
+from multiprocessing.pool import ThreadPool
+from docker import APIClient
 from flask import Flask, request
 import flask_restful as fr
 from collections import defaultdict
 import pkg_resources
-from subprocess import Popen
+from emuvim.api.sonata.imagecache import ImageCache
+from emuvim.dcemulator.cookieallocator import COOKIE_NAMESPACE_GATEKEEPER
 
 logging.basicConfig()
 LOG = logging.getLogger("sonata-dummy-gatekeeper")
@@ -71,6 +74,9 @@ DEPLOY_SAP = False
 # flag to indicate if we use bidirectional forwarding rules in the automatic chaining process
 BIDIRECTIONAL_CHAIN = False
 
+# max. number of VNFs of a service that are started in parallel
+MAX_PARALLEL_VNF_STARTS = 8
+
 class Gatekeeper(object):
 
     def __init__(self):
@@ -78,6 +84,8 @@ class Gatekeeper(object):
         self.dcs = dict()
         self.net = None
         self.vnf_counter = 0  # used to generate short names for VNFs (Mininet limitation)
+        # images resolved for all services of this gatekeeper
+        self.image_cache = ImageCache()
         LOG.info("Create SONATA dummy gatekeeper.")
 
     def register_service_package(self, service_uuid, service):
@@ -153,12 +161,16 @@ class Service(object):
         :return:
         """
         LOG.info("Starting service %r" % self.uuid)
+        t_start = time.time()
+        # duration of the single instantiation steps
+        timing = dict()
 
         # 1. each service instance gets a new uuid to identify it
         instance_uuid = str(uuid.uuid4())
         # build a instances dict (a bit like a NSR :))
         self.instances[instance_uuid] = dict()
         self.instances[instance_uuid]["vnf_instances"] = list()
+        self.instances[instance_uuid]["timing"] = timing
 
         # 2. Configure the chaining of the network functions (currently only E-Line and E-LAN links supported)
         vnf_id2vnf_name = defaultdict(lambda: "NotExistingNode",
@@ -167,15 +179,16 @@ class Service(object):
                                                  self.nsd["network_functions"])))
 
         # 3. compute placement of this service instance (adds DC names to VNFDs)
+        t = time.time()
         if not GK_STANDALONE_MODE:
             #self._calculate_placement(FirstDcPlacement)
             self._calculate_placement(RoundRobinDcPlacement)
-        # iterate over all vnfds that we have to start
-        for vnfd in self.vnfds.itervalues():
-            vnfi = None
-            if not GK_STANDALONE_MODE:
-                vnfi = self._start_vnfd(vnfd)
-            self.instances[instance_uuid]["vnf_instances"].append(vnfi)
+        timing["placement"] = time.time() - t
+        # start all vnfds that we have to start
+        t = time.time()
+        self.instances[instance_uuid]["vnf_instances"].extend(
+            self._start_vnfds(list(self.vnfds.itervalues())))
+        timing["vnf_start"] = time.time() - t
 
         if "virtual_links" in self.nsd:
             vlinks = self.nsd["virtual_links"]
@@ -189,48 +202,19 @@ class Service(object):
             # 4a. deploy E-Line links
             # cookie is used as identifier for the flowrules installed by the dummygatekeeper
             # eg. different services get a unique cookie for their flowrules
-            cookie = 1
-            for link in eline_fwd_links:
-                src_id, src_if_name = link["connection_points_reference"][0].split(":")
-                dst_id, dst_if_name = link["connection_points_reference"][1].split(":")
-
-                # check if there is a SAP in the link
-                if src_id in self.sap_identifiers:
-                    src_docker_name = "{0}_{1}".format(src_id, src_if_name)
-                    src_id = src_docker_name
-                else:
-                    src_docker_name = src_id
-
-                if dst_id in self.sap_identifiers:
-                    dst_docker_name = "{0}_{1}".format(dst_id, dst_if_name)
-                    dst_id = dst_docker_name
-                else:
-                    dst_docker_name = dst_id
-
-                src_name = vnf_id2vnf_name[src_id]
-                dst_name = vnf_id2vnf_name[dst_id]
-
-                LOG.debug(
-                    "Setting up E-Line link. %s(%s:%s) -> %s(%s:%s)" % (
-                        src_name, src_id, src_if_name, dst_name, dst_id, dst_if_name))
-
-                if (src_name in self.vnfds) and (dst_name in self.vnfds):
-                    network = self.vnfds[src_name].get("dc").net  # there should be a cleaner way to find the DCNetwork
-                    LOG.debug(src_docker_name)
-                    ret = network.setChain(
-                        src_docker_name, dst_docker_name,
-                        vnf_src_interface=src_if_name, vnf_dst_interface=dst_if_name,
-                        bidirectional=BIDIRECTIONAL_CHAIN, cmd="add-flow", cookie=cookie, priority=10)
-
-                    # re-configure the VNFs IP assignment and ensure that a new subnet is used for each E-Link
-                    src_vnfi = self._get_vnf_instance(instance_uuid, src_name)
-                    if src_vnfi is not None:
-                        self._vnf_reconfigure_network(src_vnfi, src_if_name, self.eline_subnets_src.pop(0))
-                    dst_vnfi = self._get_vnf_instance(instance_uuid, dst_name)
-                    if dst_vnfi is not None:
-                        self._vnf_reconfigure_network(dst_vnfi, dst_if_name, self.eline_subnets_dst.pop(0))
+            cookie = GK.net.cookie_allocator.allocate(COOKIE_NAMESPACE_GATEKEEPER)
+            self.instances[instance_uuid]["cookie"] = cookie
+            t = time.time()
+            # install the flowrules of all E-Lines of this service in one batch per switch
+            GK.net.beginFlowBatch()
+            try:
+                self._deploy_elines(instance_uuid, eline_fwd_links, vnf_id2vnf_name, cookie)
+            finally:
+                GK.net.commitFlowBatch()
+            timing["eline_setup"] = time.time() - t
 
             # 4b. deploy E-LAN links
+            t = time.time()
             base = 10
             for link in elan_fwd_links:
 
@@ -270,13 +254,83 @@ class Service(object):
                 network.setLAN(elan_vnf_list)
                 # increase the base ip address for the next E-LAN
                 base += 1
+            timing["elan_setup"] = time.time() - t
 
         # 5. run the emulator specific entrypoint scripts in the VNFIs of this service instance
         self._trigger_emulator_start_scripts_in_vnfis(self.instances[instance_uuid]["vnf_instances"])
 
-        LOG.info("Service started. Instance id: %r" % instance_uuid)
+        timing["total"] = time.time() - t_start
+        LOG.info("Service started. Instance id: %r (took %.3fs)" % (instance_uuid, timing["total"]))
         return instance_uuid
 
+    def _start_vnfds(self, vnfds):
+        """
+        Start the given VNFDs in parallel using a bounded pool of worker threads.
+        Image checks and container creation run concurrently,
+        the data centers serialize the topology changes (links, resource allocation).
+        :param vnfds: list of vnfd descriptor dicts
+        :return: list of vnf instances (same order as vnfds)
+        """
+        if GK_STANDALONE_MODE:
+            return [None for vnfd in vnfds]
+        if len(vnfds) < 2 or MAX_PARALLEL_VNF_STARTS < 2:
+            return [self._start_vnfd(vnfd) for vnfd in vnfds]
+        pool = ThreadPool(min(len(vnfds), MAX_PARALLEL_VNF_STARTS))
+        try:
+            # map re-raises the first exception of a failed start
+            return pool.map(self._start_vnfd, vnfds)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _deploy_elines(self, instance_uuid, eline_fwd_links, vnf_id2vnf_name, cookie):
+        """
+        Setup the E-Line links of a service instance.
+        :param instance_uuid: uuid of the service instance
+        :param eline_fwd_links: E-Line virtual links from the NSD
+        :param vnf_id2vnf_name: mapping of NSD vnf ids to VNF names
+        :param cookie: cookie for the installed flowrules
+        """
+        for link in eline_fwd_links:
+            src_id, src_if_name = link["connection_points_reference"][0].split(":")
+            dst_id, dst_if_name = link["connection_points_reference"][1].split(":")
+
+            # check if there is a SAP in the link
+            if src_id in self.sap_identifiers:
+                src_docker_name = "{0}_{1}".format(src_id, src_if_name)
+                src_id = src_docker_name
+            else:
+                src_docker_name = src_id
+
+            if dst_id in self.sap_identifiers:
+                dst_docker_name = "{0}_{1}".format(dst_id, dst_if_name)
+                dst_id = dst_docker_name
+            else:
+                dst_docker_name = dst_id
+
+            src_name = vnf_id2vnf_name[src_id]
+            dst_name = vnf_id2vnf_name[dst_id]
+
+            LOG.debug(
+                "Setting up E-Line link. %s(%s:%s) -> %s(%s:%s)" % (
+                    src_name, src_id, src_if_name, dst_name, dst_id, dst_if_name))
+
+            if (src_name in self.vnfds) and (dst_name in self.vnfds):
+                network = self.vnfds[src_name].get("dc").net  # there should be a cleaner way to find the DCNetwork
+                LOG.debug(src_docker_name)
+                ret = network.setChain(
+                    src_docker_name, dst_docker_name,
+                    vnf_src_interface=src_if_name, vnf_dst_interface=dst_if_name,
+                    bidirectional=BIDIRECTIONAL_CHAIN, cmd="add-flow", cookie=cookie, priority=10)
+
+                # re-configure the VNFs IP assignment and ensure that a new subnet is used for each E-Link
+                src_vnfi = self._get_vnf_instance(instance_uuid, src_name)
+                if src_vnfi is not None:
+                    self._vnf_reconfigure_network(src_vnfi, src_if_name, self.eline_subnets_src.pop(0))
+                dst_vnfi = self._get_vnf_instance(instance_uuid, dst_name)
+                if dst_vnfi is not None:
+                    self._vnf_reconfigure_network(dst_vnfi, dst_if_name, self.eline_subnets_dst.pop(0))
+
     def stop_service(self, instance_uuid):
         """
         This method stops a running service instance.
@@ -298,6 +352,12 @@ class Service(object):
             # self._remove_placement(RoundRobinPlacement)
             None
 
+        # remove the E-Line flowrules, afterwards their cookie can be used by other services
+        cookie = self.instances[instance_uuid].get("cookie")
+        if cookie is not None:
+            GK.net.deleteFlowsByCookie(cookie)
+            GK.net.cookie_allocator.release(cookie)
+
         # last step: remove the instance from the list of all instances
         del self.instances[instance_uuid]
 
@@ -529,44 +589,25 @@ class Service(object):
         """
         if GK_STANDALONE_MODE:
             return  # do not build anything in standalone mode
-        dc = DockerClient()
-        LOG.info("Building %d Docker images (this may take several minutes) ..." % len(self.local_docker_files))
-        for k, v in self.local_docker_files.iteritems():
-            for line in dc.build(path=v.replace("Dockerfile", ""), tag=k, rm=False, nocache=False):
-                LOG.debug("DOCKER BUILD: %s" % line)
-            LOG.info("Docker image created: %s" % k)
+        GK.image_cache.build_all(self.local_docker_files)
 
     def _pull_predefined_dockerimages(self):
         """
         If the package contains URLs to pre-build Docker images, we download them with this method.
         """
-        dc = DockerClient()
-        for url in self.remote_docker_image_urls.itervalues():
-            if not FORCE_PULL:  # only pull if not present (speedup for development)
-                if len(dc.images.list(name=url)) > 0:
-                    LOG.debug("Image %r present. Skipping pull." % url)
-                    continue
-            LOG.info("Pulling image: %r" % url)
-            # this seems to fail with latest docker api version 2.0.2
-            # dc.images.pull(url,
-            #        insecure_registry=True)
-            #using docker cli instead
-            cmd = ["docker",
-                   "pull",
-                   url,
-                   ]
-            Popen(cmd).wait()
-
-
-
+        # only pull if not present (speedup for development)
+        for url, image_id in GK.image_cache.pull_all(
+                self.remote_docker_image_urls.values(), force=FORCE_PULL).iteritems():
+            if image_id is None:
+                LOG.warning("Image %r could not be pulled." % url)
 
     def _check_docker_image_exists(self, image_name):
         """
-        Query the docker service and check if the given image exists
+        Query the docker service (or the image cache) and check if the given image exists
         :param image_name: name of the docker image
         :return:
         """
-        return len(DockerClient().images.list(name=image_name)) > 0
+        return GK.image_cache.exists(image_name)
 
     def _calculate_placement(self, algorithm):
         """
@@ -712,8 +753,10 @@ class Instantiations(fr.Resource):
             service_uuid = list(GK.services.iterkeys())[0]
         if service_uuid in GK.services:
             # ok, we have a service uuid, lets start the service
-            service_instance_uuid = GK.services.get(service_uuid).start_service()
-            return {"service_instance_uuid": service_instance_uuid}, 201
+            service = GK.services.get(service_uuid)
+            service_instance_uuid = service.start_service()
+            return {"service_instance_uuid": service_instance_uuid,
+                    "timing": service.instances[service_instance_uuid].get("timing")}, 201
         return "Service not found", 404
 
     def get(self):
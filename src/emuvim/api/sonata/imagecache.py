@@ -0,0 +1,198 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Image provisioning for the dummy gatekeeper.
+
+Resolves, pulls and builds the Docker images of a service package with a
+bounded number of parallel workers and remembers the resolved image IDs,
+so that images known from previously on-boarded packages do not need any
+round trip to the Docker daemon.
+"""
+
+import logging
+import os
+import hashlib
+import threading
+from multiprocessing.pool import ThreadPool
+from subprocess import Popen
+from docker import DockerClient
+from docker.errors import NotFound
+from emuvim.dcemulator.dockerstate import get_docker_state
+
+LOG = logging.getLogger("sonata-dummy-gatekeeper.images")
+LOG.setLevel(logging.DEBUG)
+
+
+class ImageCache(object):
+    """
+    Cache of the Docker images known to the gatekeeper.
+    Maps image references (e.g. 'ubuntu:trusty') to the ID of the image
+    and built images to the digest of their build context.
+    The cache is shared by all services of a gatekeeper.
+    """
+
+    def __init__(self, client=None, max_workers=4, use_docker_state=None):
+        """
+        :param client: docker.DockerClient to use (created on first use if None)
+        :param max_workers: max. number of images that are pulled or built in parallel
+        :param use_docker_state: look up images in the shared Docker state view
+        (default: only if no client is given)
+        """
+        self._client = client
+        self.use_docker_state = client is None if use_docker_state is None else use_docker_state
+        self.max_workers = max_workers
+        # image reference -> image id
+        self._ids = dict()
+        # (tag, digest of the build context) -> image id
+        self._build_ids = dict()
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = DockerClient()
+        return self._client
+
+    def exists(self, name):
+        """
+        Check if an image exists (cached or locally available at the Docker daemon).
+        :param name: image reference
+        :return: bool
+        """
+        return self.resolve(name) is not None
+
+    def resolve(self, name):
+        """
+        Get the ID of an image.
+        :param name: image reference
+        :return: image id or None if the image is not available
+        """
+        with self._lock:
+            if name in self._ids:
+                return self._ids[name]
+        if self.use_docker_state:
+            state = get_docker_state()
+            if state.synced and "@" not in name:
+                # image list is kept up to date by the Docker event stream
+                return state.image_id(name)
+        try:
+            image_id = self.client.images.get(name).id
+        except NotFound:
+            return None
+        with self._lock:
+            self._ids[name] = image_id
+        return image_id
+
+    def invalidate(self, name=None):
+        """
+        Forget a cached image (or all images if name is None).
+        """
+        with self._lock:
+            if name is None:
+                self._ids.clear()
+                self._build_ids.clear()
+            else:
+                self._ids.pop(name, None)
+
+    def pull_all(self, names, force=False):
+        """
+        Make all given images available. Missing images are pulled in parallel.
+        :param names: list of image references
+        :param force: pull the images even if they are available
+        :return: dict image reference -> image id (None if the pull failed)
+        """
+        names = list(set(names))
+        if force:
+            self.invalidate()
+            missing = names
+        else:
+            missing = [n for n, i in zip(names, self._map(self.resolve, names)) if i is None]
+        if len(missing) > 0:
+            LOG.info("Pulling %d Docker images ..." % len(missing))
+            self._map(self._pull, missing)
+            for n in missing:
+                self.invalidate(n)
+        return dict(zip(names, self._map(self.resolve, names)))
+
+    def build_all(self, dockerfiles):
+        """
+        Build images from Dockerfiles in parallel.
+        Images whose build context did not change since the last build are not rebuilt.
+        :param dockerfiles: dict tag -> path to Dockerfile
+        :return: dict tag -> image id
+        """
+        items = list(dockerfiles.iteritems())
+        LOG.info("Building %d Docker images (this may take several minutes) ..." % len(items))
+        return dict(zip([tag for tag, path in items], self._map(self._build, items)))
+
+    def _build(self, item):
+        tag, dockerfile = item
+        path = os.path.dirname(dockerfile)
+        key = (tag, self.context_digest(path))
+        with self._lock:
+            if key in self._build_ids:
+                LOG.debug("Image %r is up to date. Skipping build." % tag)
+                return self._build_ids[key]
+        image = self.client.images.build(path=path, tag=tag, rm=False, nocache=False)
+        LOG.info("Docker image created: %s" % tag)
+        with self._lock:
+            self._build_ids[key] = image.id
+            self._ids[tag] = image.id
+        return image.id
+
+    def _pull(self, name):
+        LOG.info("Pulling image: %r" % name)
+        # pulling with the docker api version 2.0.2 seems to fail,
+        # so we use the docker cli instead
+        return Popen(["docker", "pull", name]).wait()
+
+    def _map(self, func, items):
+        if len(items) < 2 or self.max_workers < 2:
+            return map(func, items)
+        pool = ThreadPool(min(len(items), self.max_workers))
+        try:
+            return pool.map(func, items)
+        finally:
+            pool.close()
+            pool.join()
+
+    @staticmethod
+    def context_digest(path):
+        """
+        Digest over all files of a Docker build context.
+        """
+        h = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for f in sorted(files):
+                p = os.path.join(root, f)
+                h.update(os.path.relpath(p, path))
+                with open(p, "rb") as fh:
+                    for chunk in iter(lambda: fh.read(65536), b""):
+                        h.update(chunk)
+        return h.hexdigest()
@@ -33,6 +33,7 @@ Distributed Cloud Emulator (dcemulator)
 import logging
 import threading
 import zerorpc
+from emuvim.dcemulator.node import list_compute_status
 
 logging.basicConfig(level=logging.INFO)
 
@@ -121,12 +122,10 @@ class MultiDatacenterApi(object):
                 all_containers = []
                 for dc in self.dcs.itervalues():
                     all_containers += dc.listCompute()
-                return [(c.name, c.getStatus())
-                        for c in all_containers]
+                return list_compute_status(all_containers)
             else:
                 # return list of compute nodes for specified DC
-                return [(c.name, c.getStatus())
-                        for c in self.dcs.get(dc_label).listCompute()]
+                return list_compute_status(self.dcs.get(dc_label).listCompute())
         except Exception as ex:
             logging.exception("RPC error.")
             return ex.message
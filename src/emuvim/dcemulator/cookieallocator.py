@@ -0,0 +1,152 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Cookie allocator for the DCNetwork.
+
+OpenFlow cookies identify the flow entries of a chain or load balancer so
+that they can be deleted together. Cookies are handed out by a counter and
+released cookies are reused from a free list, thus allocation takes constant
+time and the values stay as small as the number of concurrently installed
+chains. This matters because load balancers also use their cookie as
+OpenFlow table id.
+"""
+
+import logging
+import threading
+
+LOG = logging.getLogger("dcemulator.cookieallocator")
+LOG.setLevel(logging.DEBUG)
+
+# cookies are 64 bit values in OpenFlow
+MAX_COOKIE = 2 ** 64 - 1
+
+# namespaces of the allocated cookies
+COOKIE_NAMESPACE_CHAIN = "chain"
+COOKIE_NAMESPACE_LB = "lb"
+COOKIE_NAMESPACE_FLOATING_LB = "floating_lb"
+COOKIE_NAMESPACE_ARP_REPLY = "arp_reply"
+COOKIE_NAMESPACE_GATEKEEPER = "gatekeeper"
+
+
+class CookieAllocator(object):
+    """
+    Hands out unique integer IDs (flow cookies or flow group IDs).
+
+    All namespaces share one range of values, so cookies of different
+    namespaces never collide on a switch. The namespace of a cookie is
+    only recorded to list or release all cookies of one kind.
+    """
+
+    def __init__(self, first=1, last=MAX_COOKIE):
+        self.first = first
+        self.last = last
+        # next value that was never handed out
+        self._next = first
+        # released values, reused before the counter is increased
+        self._free = list()
+        # value -> namespace for all values in use
+        self._used = dict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._used)
+
+    def __contains__(self, cookie):
+        return cookie in self._used
+
+    def allocate(self, namespace=None):
+        """
+        Get an unused cookie.
+        :param namespace: namespace the cookie belongs to, e.g. COOKIE_NAMESPACE_CHAIN
+        :return: the cookie
+        """
+        with self.lock:
+            while len(self._free) > 0:
+                cookie = self._free.pop()
+                # skip values that were reserved explicitly in the meantime
+                if cookie not in self._used:
+                    self._used[cookie] = namespace
+                    return cookie
+            while self._next in self._used:
+                self._next += 1
+            if self._next > self.last:
+                raise Exception("No free cookies left (%d in use)." % len(self._used))
+            cookie = self._next
+            self._next += 1
+            self._used[cookie] = namespace
+            return cookie
+
+    def reserve(self, cookie, namespace=None):
+        """
+        Mark a cookie that was chosen by the user as used.
+        :param cookie: the cookie
+        :param namespace: namespace the cookie belongs to
+        :return: True if the cookie was not in use before
+        """
+        with self.lock:
+            if cookie in self._used or cookie < self.first or cookie > self.last:
+                return False
+            self._used[cookie] = namespace
+            return True
+
+    def release(self, cookie):
+        """
+        Release a cookie, so that it can be handed out again.
+        :param cookie: the cookie
+        :return: True if the cookie was in use
+        """
+        with self.lock:
+            if cookie not in self._used:
+                return False
+            del self._used[cookie]
+            if cookie < self._next:
+                self._free.append(cookie)
+            return True
+
+    def namespace(self, cookie):
+        """
+        :return: the namespace of a cookie that is in use or None
+        """
+        return self._used.get(cookie)
+
+    def cookies(self, namespace):
+        """
+        :return: list of all cookies of a namespace that are in use
+        """
+        with self.lock:
+            return [c for c, ns in self._used.items() if ns == namespace]
+
+    def release_namespace(self, namespace):
+        """
+        Release all cookies of a namespace.
+        :return: list of the released cookies
+        """
+        cookies = self.cookies(namespace)
+        for c in cookies:
+            self.release(c)
+        return cookies
@@ -0,0 +1,304 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+In-memory view of the Docker daemon's containers and images.
+
+A single listener thread subscribes to the Docker event stream and keeps
+the state of all containers (by ID and name) and the known image tags up
+to date. Code that would otherwise poll or inspect Docker reads from this
+view instead. Callers have to check `synced` and fall back to asking the
+daemon directly if the view is not available (e.g. the event stream broke).
+"""
+import logging
+import threading
+import time
+from docker import APIClient
+
+LOG = logging.getLogger("dcemulator.dockerstate")
+LOG.setLevel(logging.DEBUG)
+
+# seconds to wait before reconnecting to the event stream
+RESYNC_INTERVAL = 2
+
+# container event -> resulting container status
+CONTAINER_EVENT_STATUS = {
+    "create": "created",
+    "start": "running",
+    "restart": "running",
+    "unpause": "running",
+    "pause": "paused",
+    "die": "exited",
+    "stop": "exited",
+    "oom": None,
+    "kill": None,
+}
+
+_state = None
+_state_lock = threading.Lock()
+
+
+def normalize_image_name(name):
+    """
+    'ubuntu' -> 'ubuntu:latest', 'registry:5000/ubuntu' -> 'registry:5000/ubuntu:latest'
+    """
+    if "@" in name:
+        return name
+    if ":" not in name.rsplit("/", 1)[-1]:
+        return name + ":latest"
+    return name
+
+
+class DockerState(object):
+    """
+    Keeps container states, container IDs by name and image tags
+    in sync with the Docker daemon using its event stream.
+    """
+
+    def __init__(self, client=None):
+        """
+        :param client: docker.APIClient (or a compatible fake), created on start if None
+        """
+        self._client = client
+        # container id -> {"id": .., "name": .., "status": .., "image": ..}
+        self._containers = dict()
+        # container name -> container id
+        self._ids = dict()
+        # image tag -> image id
+        self._images = dict()
+        self._images_valid = False
+        # incremented whenever the set of images might have changed
+        self.image_version = 0
+        self._cond = threading.Condition(threading.RLock())
+        self._thread = None
+        self.synced = False
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = APIClient()
+        return self._client
+
+    def start(self):
+        """
+        Synchronize with the daemon and start the listener thread.
+        """
+        with self._cond:
+            if self._thread is not None:
+                return
+            since = self._sync()
+            self._thread = threading.Thread(target=self._run, args=(since,), name="DockerStateListener")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def sync(self):
+        """
+        Read the complete state from the daemon.
+        :return: timestamp from which on events have to be applied
+        """
+        return self._sync()
+
+    def _sync(self):
+        since = int(time.time())
+        try:
+            containers = self.client.containers(all=True)
+        except Exception as ex:
+            LOG.debug("Could not read Docker state: %s" % ex)
+            with self._cond:
+                self.synced = False
+            return None
+        with self._cond:
+            self._containers = dict()
+            self._ids = dict()
+            for c in containers:
+                names = c.get("Names") or [""]
+                self._set_container(c["Id"], names[0].lstrip("/"),
+                                    c.get("State") or _status_from_text(c.get("Status")), c.get("Image"))
+            self._images_valid = False
+            self.image_version += 1
+            self.synced = True
+            self._cond.notify_all()
+        return since
+
+    def _run(self, since):
+        while True:
+            if since is None:
+                since = self._sync()
+            if since is not None:
+                try:
+                    for event in self.client.events(decode=True, since=since):
+                        self.handle_event(event)
+                except Exception as ex:
+                    LOG.warning("Docker event stream broke: %s" % ex)
+                with self._cond:
+                    self.synced = False
+                since = None
+            time.sleep(RESYNC_INTERVAL)
+
+    def handle_event(self, event):
+        """
+        Apply a single Docker event to the view.
+        :param event: decoded event dict as delivered by the Docker events API
+        """
+        etype = event.get("Type", "container")
+        action = event.get("Action") or event.get("status") or ""
+        actor = event.get("Actor") or {}
+        attributes = actor.get("Attributes") or {}
+        eid = actor.get("ID") or event.get("id")
+        if etype == "image":
+            with self._cond:
+                self._images_valid = False
+                self.image_version += 1
+            return
+        if etype != "container" or eid is None:
+            return
+        with self._cond:
+            c = self._containers.get(eid)
+            name = attributes.get("name", c["name"] if c is not None else None)
+            image = attributes.get("image", event.get("from"))
+            if action == "destroy":
+                self._remove_container(eid)
+            elif action == "rename":
+                self._remove_container(eid)
+                self._set_container(eid, name, c["status"] if c is not None else "created", image)
+            elif action.split(":")[0] in CONTAINER_EVENT_STATUS:
+                status = CONTAINER_EVENT_STATUS[action.split(":")[0]]
+                if status is None:
+                    # no state change (e.g. kill is followed by die)
+                    status = c["status"] if c is not None else "created"
+                self._set_container(eid, name, status, image)
+            else:
+                return
+            self._cond.notify_all()
+
+    def _set_container(self, cid, name, status, image):
+        old = self._containers.get(cid)
+        if old is not None and old["name"] != name:
+            self._ids.pop(old["name"], None)
+        self._containers[cid] = {"id": cid, "name": name, "status": status, "image": image}
+        if name:
+            self._ids[name] = cid
+
+    def _remove_container(self, cid):
+        c = self._containers.pop(cid, None)
+        if c is not None and self._ids.get(c["name"]) == cid:
+            del self._ids[c["name"]]
+
+    def container(self, name_or_id):
+        """
+        Get the state of a container.
+        :param name_or_id: container name (without leading /) or full ID
+        :return: dict with id, name, status and image or None if unknown
+        """
+        with self._cond:
+            c = self._containers.get(self._ids.get(name_or_id, name_or_id))
+            return dict(c) if c is not None else None
+
+    def container_id(self, name):
+        """
+        :return: ID of the container with the given name or None
+        """
+        with self._cond:
+            return self._ids.get(name)
+
+    def is_running(self, name_or_id):
+        c = self.container(name_or_id)
+        return c is not None and c["status"] == "running"
+
+    def wait_for_container(self, name, status="running", timeout=5):
+        """
+        Block until the container has the given status.
+        :return: True if the status was reached within the timeout
+        """
+        end = time.time() + timeout
+        with self._cond:
+            while True:
+                c = self._containers.get(self._ids.get(name))
+                if c is not None and c["status"] == status:
+                    return True
+                remaining = end - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+
+    def images(self):
+        """
+        Get all image tags known to the daemon. The image list is only
+        read again after an image event.
+        :return: dict tag -> image id
+        """
+        with self._cond:
+            if self._images_valid:
+                return dict(self._images)
+        images = dict()
+        for i in self.client.images():
+            for t in i.get("RepoTags") or list():
+                if t != "<none>:<none>":
+                    images[t] = i.get("Id")
+        with self._cond:
+            self._images = images
+            self._images_valid = self.synced
+            return dict(images)
+
+    def image_id(self, name):
+        """
+        :param name: image reference, e.g. 'ubuntu:trusty' or 'ubuntu'
+        :return: image id or None if the image is not available
+        """
+        return self.images().get(normalize_image_name(name))
+
+
+def _status_from_text(text):
+    """
+    Derive the container status from the human readable status of
+    old Docker versions, e.g. 'Up 2 minutes' or 'Exited (0) 3 hours ago'.
+    """
+    if text is None:
+        return None
+    if text.startswith("Up"):
+        return "paused" if "Paused" in text else "running"
+    if text.startswith("Exited"):
+        return "exited"
+    if text.startswith("Created"):
+        return "created"
+    return text.lower()
+
+
+def get_docker_state():
+    """
+    Return the shared Docker state view, started on first use.
+    Check its `synced` attribute before relying on it.
+    """
+    global _state
+    with _state_lock:
+        if _state is None:
+            _state = DockerState()
+            try:
+                _state.start()
+            except Exception:
+                LOG.exception("Could not start the Docker state listener.")
+        return _state
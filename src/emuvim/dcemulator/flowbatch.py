@@ -0,0 +1,150 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Batched installation of OpenFlow rules.
+
+Chains are installed hop by hop. Instead of calling ovs-ofctl or the
+Ryu REST API once per hop, the flow entries are collected per switch
+and committed together when the batch is closed.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+import requests
+
+LOG = logging.getLogger("dcemulator.flowbatch")
+LOG.setLevel(logging.DEBUG)
+
+# ovs-ofctl options of the batched installation; the switches of the
+# DCNetwork speak OpenFlow 1.3, which covers all entries (including
+# the VLAN push on the first hop of a chain), so every switch gets
+# exactly one 'add-flows' call
+DPCTL_OPTIONS = "-O OpenFlow13"
+
+
+class FlowBatch(object):
+    """
+    Collects flow entries for a set of switches and installs them
+    with one transaction per switch.
+
+    dpctl entries are written to a flow file and installed with a
+    single 'ovs-ofctl add-flows' call. Ryu entries are grouped by
+    switch and posted back-to-back, one worker with its own REST
+    session per switch, so that the order on each switch is kept.
+    """
+
+    def __init__(self, net):
+        self.net = net
+        # switch name -> [node, [flow, ...]]
+        self._dpctl_flows = OrderedDict()
+        # switch dpid -> [(prefix, flow), ...]
+        self._ryu_flows = OrderedDict()
+
+    def __len__(self):
+        n = sum([len(flows) for _, flows in self._dpctl_flows.itervalues()])
+        n += sum([len(flows) for flows in self._ryu_flows.itervalues()])
+        return n
+
+    def add_dpctl_flow(self, node, flow):
+        """
+        Queue a flow entry that would normally be installed with
+        'ovs-ofctl add-flow'.
+        :param node: switch object
+        :param flow: flow description, e.g., "in_port=1,action=2"
+        """
+        if node.name not in self._dpctl_flows:
+            self._dpctl_flows[node.name] = [node, list()]
+        self._dpctl_flows[node.name][1].append(flow)
+
+    def add_ryu_flow(self, dpid, prefix, flow):
+        """
+        Queue a flow entry for the Ryu ofctl REST API.
+        :param dpid: dpid of the switch (int)
+        :param prefix: REST prefix, e.g., 'stats/flowentry/add'
+        :param flow: flow dict as expected by ofctl_rest
+        """
+        self._ryu_flows.setdefault(dpid, list()).append((prefix, flow))
+
+    def commit(self):
+        """
+        Install all queued flow entries and empty the batch.
+        :return: number of installed flow entries
+        """
+        n = len(self)
+        for node, flows in self._dpctl_flows.itervalues():
+            self._commit_dpctl(node, flows)
+        self._commit_ryu()
+        self._dpctl_flows = OrderedDict()
+        self._ryu_flows = OrderedDict()
+        if n > 0:
+            LOG.debug("Committed flow batch with %d entries" % n)
+        return n
+
+    def _commit_dpctl(self, node, flows):
+        fd, path = tempfile.mkstemp(prefix="son-emu-flows-", suffix=".txt")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write("\n".join(flows))
+                f.write("\n")
+            node.dpctl("add-flows", DPCTL_OPTIONS, path)
+            LOG.info("add-flows in switch: {0} entries: {1}".format(node.name, len(flows)))
+        finally:
+            os.remove(path)
+
+    def _commit_ryu(self):
+        if len(self._ryu_flows) < 1:
+            return
+        # dpid -> exception of the worker that failed
+        errors = dict()
+
+        def worker(dpid, entries):
+            # requests sessions are not thread-safe
+            session = requests.Session()
+            try:
+                for prefix, flow in entries:
+                    self.net.ryu_REST(prefix, data=flow, session=session)
+            except Exception as ex:
+                errors[dpid] = ex
+            finally:
+                session.close()
+
+        threads = list()
+        for dpid, entries in self._ryu_flows.iteritems():
+            t = threading.Thread(target=worker, args=(dpid, entries))
+            t.daemon = True
+            t.start()
+            threads.append(t)
+        for t in threads:
+            t.join()
+        for dpid, ex in errors.iteritems():
+            LOG.error("Could not install flow entries in switch {0}: {1}".format(dpid, ex))
+        if len(errors) > 0:
+            raise errors.values()[0]
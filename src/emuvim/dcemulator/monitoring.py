@@ -32,12 +32,16 @@ from mininet.node import  OVSSwitch
 import ast
 import time
 from prometheus_client import start_http_server, Summary, Histogram, Gauge, Counter, REGISTRY, CollectorRegistry, \
-    pushadd_to_gateway, push_to_gateway, delete_from_gateway
+    pushadd_to_gateway, push_to_gateway, delete_from_gateway, generate_latest, CONTENT_TYPE_LATEST
 import threading
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
 from subprocess import Popen
 import os
+import socket
 import docker
 import json
+from emuvim.dcemulator.dockerstate import get_docker_state
 
 logging.basicConfig(level=logging.INFO)
 
@@ -46,17 +50,65 @@ class to read openflow stats from the Ryu controller of the DCNetwork
 """
 
 PUSHGATEWAY_PORT = 9091
+# port of the in-process Prometheus scrape endpoint
+EXPORTER_PORT = 9092
 # we cannot use port 8080 because ryu-ofrest api  is already using that one
 CADVISOR_PORT = 8081
 
 COOKIE_MASK = 0xffffffff
 
+# default interval (seconds) in which a metric is collected
+MONITOR_INTERVAL = 1
+
+class MetricsExporter(object):
+    """
+    HTTP server that exposes the metrics of a CollectorRegistry
+    to be scraped by Prometheus.
+    """
+
+    def __init__(self, registry, port=EXPORTER_PORT, addr=''):
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                output = generate_latest(registry)
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE_LATEST)
+                self.end_headers()
+                self.wfile.write(output)
+
+            def log_message(self, format, *args):
+                return
+
+        class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        self.server = ThreadingHTTPServer((addr, port), MetricsHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+        logging.info('Serving metrics on port {0}'.format(self.server.server_address[1]))
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
 class DCNetworkMonitor():
-    def __init__(self, net):
+    def __init__(self, net, use_pushgateway=False, exporter_port=EXPORTER_PORT):
+        """
+        :param net: the DCNetwork to monitor
+        :param use_pushgateway: push the metrics to a Pushgateway container (e.g. for remote setups)
+            instead of only serving them to be scraped by Prometheus
+        :param exporter_port: port of the scrape endpoint (None to disable it),
+            if the port is in use the metrics are not served
+        """
         self.net = net
         self.dockercli = docker.from_env()
 
         # pushgateway address
+        self.use_pushgateway = use_pushgateway
         self.pushgateway = 'localhost:{0}'.format(PUSHGATEWAY_PORT)
 
         # supported Prometheus metrics
@@ -92,44 +144,50 @@ class DCNetworkMonitor():
         self.flow_metrics = []
         self.skewmon_metrics = {}
 
-        # start monitoring thread
+        # start monitoring thread (one collector for all network and flow metrics)
         self.start_monitoring = True
-        self.monitor_thread = threading.Thread(target=self.get_network_metrics)
+        # set to wake up the collector, e.g., when a new metric is added
+        self.monitor_wakeup = threading.Event()
+        self.monitor_thread = threading.Thread(target=self.collect_metrics)
+        self.monitor_thread.daemon = True
         self.monitor_thread.start()
 
-        self.monitor_flow_thread = threading.Thread(target=self.get_flow_metrics)
-        self.monitor_flow_thread.start()
+        # the metrics of the registry are served by the emulator itself
+        self.exporter = None
+        if exporter_port is not None:
+            try:
+                self.exporter = MetricsExporter(self.registry, port=exporter_port)
+                self.exporter.start()
+            except socket.error as e:
+                logging.error("Could not serve metrics on port {0}: {1}".format(exporter_port, e))
 
         # helper tools
         # cAdvisor, Prometheus pushgateway are started as external container, to gather monitoring metric in son-emu
-        self.pushgateway_process = self.start_PushGateway()
+        self.pushgateway_process = None
+        if self.use_pushgateway:
+            self.pushgateway_process = self.start_PushGateway()
         self.cadvisor_process = self.start_cAdvisor()
 
 
     # first set some parameters, before measurement can start
-    def setup_flow(self, vnf_name, vnf_interface=None, metric='tx_packets', cookie=0):
+    def setup_flow(self, vnf_name, vnf_interface=None, metric='tx_packets', cookie=0, interval=None):
 
         flow_metric = {}
 
         # check if port is specified (vnf:port)
         if vnf_interface is None:
             # take first interface by default
-            connected_sw = self.net.DCNetwork_graph.neighbors(vnf_name)[0]
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            vnf_interface = link_dict[0]['src_port_id']
+            vnf_interface = self.net.getDefaultInterface(vnf_name)
 
         flow_metric['vnf_name'] = vnf_name
         flow_metric['vnf_interface'] = vnf_interface
 
         vnf_switch = None
-        for connected_sw in self.net.DCNetwork_graph.neighbors(vnf_name):
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            for link in link_dict:
-                if link_dict[link]['src_port_id'] == vnf_interface:
-                    # found the right link and connected switch
-                    vnf_switch = connected_sw
-                    flow_metric['mon_port'] = link_dict[link]['dst_port_nr']
-                    break
+        connected = self.net.getConnectedSwitchPort(vnf_name, vnf_interface)
+        if connected is not None:
+            # found the right link and connected switch
+            vnf_switch = connected[0]
+            flow_metric['mon_port'] = connected[1]
 
         if not vnf_switch:
             logging.exception("vnf switch of {0}:{1} not found!".format(vnf_name, vnf_interface))
@@ -152,10 +210,12 @@ class DCNetworkMonitor():
             flow_metric['switch_dpid'] = int(str(next_node.dpid), 16)
             flow_metric['metric_key'] = metric
             flow_metric['cookie'] = cookie
+            flow_metric['interval'] = float(interval or MONITOR_INTERVAL)
 
             self.monitor_flow_lock.acquire()
             self.flow_metrics.append(flow_metric)
             self.monitor_flow_lock.release()
+            self.monitor_wakeup.set()
 
             logging.info('Started monitoring flow:{3} {2} on {0}:{1}'.format(vnf_name, vnf_interface, metric, cookie))
             return 'Started monitoring flow:{3} {2} on {0}:{1}'.format(vnf_name, vnf_interface, metric, cookie)
@@ -169,9 +229,7 @@ class DCNetworkMonitor():
         # check if port is specified (vnf:port)
         if vnf_interface is None and metric is not None:
             # take first interface by default
-            connected_sw = self.net.DCNetwork_graph.neighbors(vnf_name)[0]
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            vnf_interface = link_dict[0]['src_port_id']
+            vnf_interface = self.net.getDefaultInterface(vnf_name)
 
         for flow_dict in self.flow_metrics:
             if flow_dict['vnf_name'] == vnf_name and flow_dict['vnf_interface'] == vnf_interface \
@@ -181,15 +239,12 @@ class DCNetworkMonitor():
 
                 self.flow_metrics.remove(flow_dict)
 
-                # set metric to NaN
-                self.prom_metrics[flow_dict['metric_key']]. \
-                    labels(vnf_name=vnf_name, vnf_interface=vnf_interface, flow_id=cookie). \
-                    set(float('nan'))
-
-                delete_from_gateway(self.pushgateway, job='sonemu-SDNcontroller')
+                self._remove_metric(flow_dict['metric_key'], vnf_name, vnf_interface, cookie)
 
                 self.monitor_flow_lock.release()
 
+                self._delete_from_gateway()
+
                 logging.info('Stopped monitoring flow {3}: {2} on {0}:{1}'.format(vnf_name, vnf_interface, metric, cookie))
                 return 'Stopped monitoring flow {3}: {2} on {0}:{1}'.format(vnf_name, vnf_interface, metric, cookie)
 
@@ -197,27 +252,24 @@ class DCNetworkMonitor():
 
 
     # first set some parameters, before measurement can start
-    def setup_metric(self, vnf_name, vnf_interface=None, metric='tx_packets'):
+    def setup_metric(self, vnf_name, vnf_interface=None, metric='tx_packets', interval=None):
 
         network_metric = {}
 
         # check if port is specified (vnf:port)
         if vnf_interface is None:
             # take first interface by default
-            connected_sw = self.net.DCNetwork_graph.neighbors(vnf_name)[0]
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            vnf_interface = link_dict[0]['src_port_id']
+            vnf_interface = self.net.getDefaultInterface(vnf_name)
 
         network_metric['vnf_name'] = vnf_name
         network_metric['vnf_interface'] = vnf_interface
 
-        for connected_sw in self.net.DCNetwork_graph.neighbors(vnf_name):
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            for link in link_dict:
-                if link_dict[link]['src_port_id'] == vnf_interface:
-                    # found the right link and connected switch
-                    network_metric['mon_port'] = link_dict[link]['dst_port_nr']
-                    break
+        vnf_switch = None
+        connected = self.net.getConnectedSwitchPort(vnf_name, vnf_interface)
+        if connected is not None:
+            # found the right link and connected switch
+            vnf_switch = connected[0]
+            network_metric['mon_port'] = connected[1]
 
         if 'mon_port' not in network_metric:
             logging.exception("vnf interface {0}:{1} not found!".format(vnf_name,vnf_interface))
@@ -228,16 +280,6 @@ class DCNetworkMonitor():
             if metric is None:
                 metric = 'tx_packets'
 
-            vnf_switch = self.net.DCNetwork_graph.neighbors(str(vnf_name))
-
-            if len(vnf_switch) > 1:
-                logging.info("vnf: {0} has multiple ports".format(vnf_name))
-                return
-            elif len(vnf_switch) == 0:
-                logging.info("vnf: {0} is not connected".format(vnf_name))
-                return
-            else:
-                vnf_switch = vnf_switch[0]
             next_node = self.net.getNodeByName(vnf_switch)
 
             if not isinstance(next_node, OVSSwitch):
@@ -250,10 +292,12 @@ class DCNetworkMonitor():
 
             network_metric['switch_dpid'] = int(str(next_node.dpid), 16)
             network_metric['metric_key'] = metric
+            network_metric['interval'] = float(interval or MONITOR_INTERVAL)
 
             self.monitor_lock.acquire()
             self.network_metrics.append(network_metric)
             self.monitor_lock.release()
+            self.monitor_wakeup.set()
 
 
             logging.info('Started monitoring: {2} on {0}:{1}'.format(vnf_name, vnf_interface, metric))
@@ -268,9 +312,7 @@ class DCNetworkMonitor():
         # check if port is specified (vnf:port)
         if vnf_interface is None and metric is not None:
             # take first interface by default
-            connected_sw = self.net.DCNetwork_graph.neighbors(vnf_name)[0]
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            vnf_interface = link_dict[0]['src_port_id']
+            vnf_interface = self.net.getDefaultInterface(vnf_name)
 
         for metric_dict in self.network_metrics:
             if metric_dict['vnf_name'] == vnf_name and metric_dict['vnf_interface'] == vnf_interface \
@@ -280,21 +322,12 @@ class DCNetworkMonitor():
 
                 self.network_metrics.remove(metric_dict)
 
-                # set values to NaN, prometheus api currently does not support removal of metrics
-                #self.prom_metrics[metric_dict['metric_key']].labels(vnf_name, vnf_interface).set(float('nan'))
-                self.prom_metrics[metric_dict['metric_key']]. \
-                    labels(vnf_name=vnf_name, vnf_interface=vnf_interface, flow_id=None). \
-                    set(float('nan'))
-
-                # this removes the complete metric, all labels...
-                # 1 single monitor job for all metrics of the SDN controller
-                # we can only  remove from the pushgateway grouping keys(labels) which we have defined for the add_to_pushgateway
-                # we can not specify labels from the metrics to be removed
-                # if we need to remove the metrics seperatelty, we need to give them a separate grouping key, and probably a diffferent registry also
-                delete_from_gateway(self.pushgateway, job='sonemu-SDNcontroller')
+                self._remove_metric(metric_dict['metric_key'], vnf_name, vnf_interface, None)
 
                 self.monitor_lock.release()
 
+                self._delete_from_gateway()
+
                 logging.info('Stopped monitoring: {2} on {0}:{1}'.format(vnf_name, vnf_interface, metric))
                 return 'Stopped monitoring: {2} on {0}:{1}'.format(vnf_name, vnf_interface, metric)
 
@@ -310,89 +343,103 @@ class DCNetworkMonitor():
                                                                            collector._metrics))
                             collector.remove(name, interface, 'None')
 
-                delete_from_gateway(self.pushgateway, job='sonemu-SDNcontroller')
                 self.monitor_lock.release()
+                self._delete_from_gateway()
                 logging.info('Stopped monitoring vnf: {0}'.format(vnf_name))
                 return 'Stopped monitoring: {0}'.format(vnf_name)
 
         return 'Error stopping monitoring metric: {0} on {1}:{2}'.format(metric, vnf_name, vnf_interface)
 
 
-# get all metrics defined in the list and export it to Prometheus
-    def get_flow_metrics(self):
+    # get all metrics defined in the lists and export them to Prometheus
+    def collect_metrics(self):
+        """
+        Collector loop for all network and flow metrics.
+        Per switch and round, only one port stats and one flow stats request is sent to Ryu,
+        the replies are distributed to all due metrics of this switch.
+        The metric lists are only locked to take a snapshot, never during the requests,
+        so setup/stop of metrics is not blocked by a slow controller.
+        """
         while self.start_monitoring:
-
+            now = time.time()
+            self.monitor_lock.acquire()
+            network_metrics = [m for m in self.network_metrics if m.get('next_poll', 0) <= now]
+            self.monitor_lock.release()
             self.monitor_flow_lock.acquire()
-
-            for flow_dict in self.flow_metrics:
-                data = {}
-
-                data['cookie'] = flow_dict['cookie']
-                data['cookie_mask'] = COOKIE_MASK
-
-                if 'tx' in flow_dict['metric_key']:
-                    data['match'] = {'in_port':flow_dict['mon_port']}
-                elif 'rx' in flow_dict['metric_key']:
-                    data['out_port'] = flow_dict['mon_port']
-
-
-                # query Ryu
-                ret = self.net.ryu_REST('stats/flow', dpid=flow_dict['switch_dpid'], data=data)
-                if isinstance(ret, dict):
-                    flow_stat_dict = ret
-                elif isinstance(ret, basestring):
-                    flow_stat_dict = ast.literal_eval(ret.rstrip())
-                else:
-                    flow_stat_dict = None
-
-                logging.debug('received flow stat:{0} '.format(flow_stat_dict))
-
-                self.set_flow_metric(flow_dict, flow_stat_dict)
-
-
-            try:
-                if len(self.flow_metrics) > 0:
-                    pushadd_to_gateway(self.pushgateway, job='sonemu-SDNcontroller', registry=self.registry)
-            except Exception, e:
-                logging.warning("Pushgateway not reachable: {0} {1}".format(Exception, e))
-
+            flow_metrics = [m for m in self.flow_metrics if m.get('next_poll', 0) <= now]
             self.monitor_flow_lock.release()
-            time.sleep(1)
-
-    def get_network_metrics(self):
-        while self.start_monitoring:
-
-            self.monitor_lock.acquire()
 
             # group metrics by dpid to optimize the rest api calls
-            dpid_list = [metric_dict['switch_dpid'] for metric_dict in self.network_metrics]
-            dpid_set = set(dpid_list)
-
+            dpid_set = set([int(m['switch_dpid']) for m in network_metrics + flow_metrics])
             for dpid in dpid_set:
-
-                # query Ryu
-                ret = self.net.ryu_REST('stats/port', dpid=dpid)
-                if isinstance(ret, dict):
-                    port_stat_dict = ret
-                elif isinstance(ret, basestring):
-                    port_stat_dict = ast.literal_eval(ret.rstrip())
-                else:
-                    port_stat_dict = None
-
-                metric_list = [metric_dict for metric_dict in self.network_metrics
-                               if int(metric_dict['switch_dpid'])==int(dpid)]
-
-                for metric_dict in metric_list:
-                    self.set_network_metric(metric_dict, port_stat_dict)
+                try:
+                    metric_list = [m for m in network_metrics if int(m['switch_dpid']) == dpid]
+                    if len(metric_list) > 0:
+                        port_stat_dict = self._query_stats('stats/port', dpid)
+                        for metric_dict in metric_list:
+                            self.set_network_metric(metric_dict, port_stat_dict)
+
+                    metric_list = [m for m in flow_metrics if int(m['switch_dpid']) == dpid]
+                    if len(metric_list) > 0:
+                        # all flows of the switch, filtered per metric
+                        flow_stat_dict = self._query_stats('stats/flow', dpid)
+                        logging.debug('received flow stat:{0} '.format(flow_stat_dict))
+                        for metric_dict in metric_list:
+                            self.set_flow_metric(metric_dict, flow_stat_dict)
+                except Exception as ex:
+                    logging.warning("Could not collect metrics of switch {0}: {1}".format(dpid, ex))
+
+            for metric_dict in network_metrics + flow_metrics:
+                metric_dict['next_poll'] = now + metric_dict.get('interval', MONITOR_INTERVAL)
 
             try:
-                if len(self.network_metrics) > 0:
+                if self.use_pushgateway and len(network_metrics) + len(flow_metrics) > 0:
                     pushadd_to_gateway(self.pushgateway, job='sonemu-SDNcontroller', registry=self.registry)
             except Exception, e:
                 logging.warning("Pushgateway not reachable: {0} {1}".format(Exception, e))
 
-            self.monitor_lock.release()
-            time.sleep(1)
+            # sleep until the next metric is due (or a new metric is added)
+            self.monitor_wakeup.wait(self._next_poll_delay())
+            self.monitor_wakeup.clear()
+
+    def _next_poll_delay(self):
+        self.monitor_lock.acquire()
+        self.monitor_flow_lock.acquire()
+        next_polls = [m.get('next_poll', 0) for m in self.network_metrics + self.flow_metrics]
+        self.monitor_flow_lock.release()
+        self.monitor_lock.release()
+        if len(next_polls) == 0:
+            return MONITOR_INTERVAL
+        return min(max(min(next_polls) - time.time(), 0), MONITOR_INTERVAL)
+
+    def _query_stats(self, prefix, dpid):
+        # query Ryu
+        ret = self.net.ryu_REST(prefix, dpid=dpid)
+        if isinstance(ret, dict):
+            return ret
+        elif isinstance(ret, basestring):
+            return ast.literal_eval(ret.rstrip())
+        return None
+
+    def _remove_metric(self, metric_key, vnf_name, vnf_interface, flow_id):
+        # remove only the time series with these labels from the registry
+        try:
+            self.prom_metrics[metric_key].remove(vnf_name, vnf_interface, flow_id)
+        except KeyError:
+            logging.debug('metric {0} of {1}:{2} was never collected'.format(metric_key, vnf_name, vnf_interface))
+
+    def _delete_from_gateway(self):
+        # this removes the complete metric, all labels...
+        # 1 single monitor job for all metrics of the SDN controller
+        # we can only  remove from the pushgateway grouping keys(labels) which we have defined for the add_to_pushgateway
+        # we can not specify labels from the metrics to be removed
+        # the remaining metrics are pushed again with the next collection round
+        if not self.use_pushgateway:
+            return
+        try:
+            delete_from_gateway(self.pushgateway, job='sonemu-SDNcontroller')
+        except Exception, e:
+            logging.warning("Pushgateway not reachable: {0} {1}".format(Exception, e))
 
     # add metric to the list to export to Prometheus, parse the Ryu port-stats reply
     def set_network_metric(self, metric_dict, port_stat_dict):
@@ -405,15 +452,18 @@ class DCNetworkMonitor():
         previous_monitor_time = metric_dict['previous_monitor_time']
         mon_port = metric_dict['mon_port']
 
+        if port_stat_dict is None:
+            return 'no port stats received from {0}'.format(switch_dpid)
+
         for port_stat in port_stat_dict[str(switch_dpid)]:
             if int(port_stat['port_no']) == int(mon_port):
                 port_uptime = port_stat['duration_sec'] + port_stat['duration_nsec'] * 10 ** (-9)
                 this_measurement = int(port_stat[metric_key])
 
                 # set prometheus metric
-                self.prom_metrics[metric_dict['metric_key']].\
-                    labels(vnf_name=vnf_name, vnf_interface=vnf_interface, flow_id=None).\
-                    set(this_measurement)
+                if not self._set_gauge(self.monitor_lock, self.network_metrics, metric_dict, None,
+                                       this_measurement):
+                    return
 
                 # also the rate is calculated here, but not used for now
                 # (rate can be easily queried from prometheus also)
@@ -449,8 +499,13 @@ class DCNetworkMonitor():
         previous_monitor_time = metric_dict['previous_monitor_time']
         cookie = metric_dict['cookie']
 
+        if flow_stat_dict is None:
+            return 'no flow stats received from {0}'.format(switch_dpid)
+
         counter = 0
         for flow_stat in flow_stat_dict[str(switch_dpid)]:
+            if not self._flow_matches(metric_dict, flow_stat):
+                continue
             if 'bytes' in metric_key:
                 counter += flow_stat['byte_count']
             elif 'packet' in metric_key:
@@ -460,9 +515,39 @@ class DCNetworkMonitor():
         #flow_stat = flow_stat_dict[str(switch_dpid)][0]
         #flow_uptime = flow_stat['duration_sec'] + flow_stat['duration_nsec'] * 10 ** (-9)
 
-        self.prom_metrics[metric_dict['metric_key']]. \
-            labels(vnf_name=vnf_name, vnf_interface=vnf_interface, flow_id=cookie). \
-            set(counter)
+        self._set_gauge(self.monitor_flow_lock, self.flow_metrics, metric_dict, cookie, counter)
+
+    def _set_gauge(self, lock, metrics, metric_dict, flow_id, value):
+        # the metric can be stopped while its stats are queried, setting the gauge
+        # afterwards would re-create the removed time series, so check and set under the lock
+        lock.acquire()
+        try:
+            if not any(m is metric_dict for m in metrics):
+                return False
+            self.prom_metrics[metric_dict['metric_key']]. \
+                labels(vnf_name=metric_dict['vnf_name'], vnf_interface=metric_dict['vnf_interface'],
+                       flow_id=flow_id). \
+                set(value)
+            return True
+        finally:
+            lock.release()
+
+    @staticmethod
+    def _flow_matches(metric_dict, flow_stat):
+        """
+        Client side filter of the flows of a switch,
+        same as the cookie/in_port/out_port filter of a Ryu flow stats request.
+        """
+        cookie = int(metric_dict['cookie'])
+        if int(flow_stat.get('cookie', 0)) & COOKIE_MASK != cookie & COOKIE_MASK:
+            return False
+        mon_port = int(metric_dict['mon_port'])
+        if 'tx' in metric_dict['metric_key']:
+            in_port = flow_stat.get('match', {}).get('in_port')
+            return in_port is not None and int(in_port) == mon_port
+        elif 'rx' in metric_dict['metric_key']:
+            return 'OUTPUT:{0}'.format(mon_port) in flow_stat.get('actions', [])
+        return True
 
     def start_Prometheus(self, port=9090):
         # prometheus.yml configuration file is located in the same directory as this file
@@ -510,8 +595,11 @@ class DCNetworkMonitor():
     def stop(self):
         # stop the monitoring thread
         self.start_monitoring = False
+        self.monitor_wakeup.set()
         self.monitor_thread.join()
-        self.monitor_flow_thread.join()
+
+        if self.exporter is not None:
+            self.exporter.stop()
 
         # these containers are used for monitoring but are started now outside of son-emu
 
@@ -557,9 +645,11 @@ class DCNetworkMonitor():
         configfile.close()
 
         docker_name = 'mn.' + vnf_name
-        vnf_container = self.dockercli.containers.get(docker_name)
-        key = resource_name + '_' + vnf_container.short_id
-        vnf_id = vnf_container.id
+        docker_state = get_docker_state()
+        vnf_id = docker_state.container_id(docker_name) if docker_state.synced else None
+        if vnf_id is None:
+            vnf_id = self.dockercli.containers.get(docker_name).id
+        key = resource_name + '_' + vnf_id[:12]
 
         if action == 'start':
             # add a new vnf to monitor
@@ -592,6 +682,9 @@ class DCNetworkMonitor():
             # start container if not running
             ret += 'starting skewness monitor'
             logging.info('starting skewness monitor')
+            # skewmon pushes its metrics, so it needs the Pushgateway even if the emulator's own metrics are scraped
+            if self.pushgateway_process is None:
+                self.pushgateway_process = self.start_PushGateway()
             volumes = {'/sys/fs/cgroup':{'bind':'/sys/fs/cgroup', 'mode':'ro'},
                        '/tmp/skewmon.cfg':{'bind':'/config.txt', 'mode':'ro'}}
             self.dockercli.containers.run('skewmon',
@@ -601,6 +694,10 @@ class DCNetworkMonitor():
                                           name='skewmon'
                                           )
             # Wait a while for containers to be completely started
+            if docker_state.synced:
+                if not docker_state.wait_for_container('skewmon', timeout=5):
+                    return 'skewmon not started'
+                return ret
             started = False
             wait_time = 0
             while not started:
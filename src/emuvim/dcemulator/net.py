@@ -33,6 +33,7 @@ from subprocess import Popen
 import re
 import requests
 import os
+import threading
 
 from mininet.net import Containernet
 from mininet.node import Controller, DefaultController, OVSSwitch, OVSKernelSwitch, Docker, RemoteController
@@ -40,9 +41,13 @@ from mininet.cli import CLI
 from mininet.link import TCLink
 from mininet.clean import cleanup
 import networkx as nx
-from emuvim.dcemulator.monitoring import DCNetworkMonitor
+from emuvim.dcemulator.monitoring import DCNetworkMonitor, EXPORTER_PORT
 from emuvim.dcemulator.node import Datacenter, EmulatorCompute
 from emuvim.dcemulator.resourcemodel import ResourceModelRegistrar
+from emuvim.dcemulator.resourcemodel.logwriter import flush as flush_resource_logs
+from emuvim.dcemulator.flowbatch import FlowBatch
+from emuvim.dcemulator.pathindex import PathIndex
+from emuvim.dcemulator.cookieallocator import CookieAllocator
 
 LOG = logging.getLogger("dcemulator.net")
 LOG.setLevel(logging.DEBUG)
@@ -62,6 +67,8 @@ class DCNetwork(Containernet):
                  enable_learning=False, # learning switch behavior of the default ovs switches icw Ryu controller can be turned off/on, needed for E-LAN functionality
                  dc_emulation_max_cpu=1.0,  # fraction of overall CPU time for emulation
                  dc_emulation_max_mem=512,  # emulation max mem in MB
+                 monitor_pushgateway=False,  # push monitoring metrics to a Pushgateway container instead of only serving them for scraping
+                 monitor_exporter_port=EXPORTER_PORT,  # port on which the monitoring metrics are served for scraping, None to disable
                  **kwargs):
         """
         Create an extended version of a Containernet network
@@ -105,9 +112,20 @@ class DCNetwork(Containernet):
 
         # graph of the complete DC network
         self.DCNetwork_graph = nx.MultiDiGraph()
+        # switch-only view of the graph with cached shortest paths
+        self.path_index = PathIndex()
+        # (node name, interface id or name) -> (connected switch, switch port nr, switch port name)
+        self.intf_index = dict()
+        # node name -> [(interface id, interface name), ...] in the order the links were added
+        self._node_intfs = dict()
+        # interface name -> [link, ...] and node name -> [link, ...] for all links in self.links
+        self._intf_links = dict()
+        self._node_links = dict()
 
         # initialize pool of vlan tags to setup the SDN paths
         self.vlans = range(4096)[::-1]
+        # flow cookies of chains and load balancers, shared by the gatekeeper and the openstack api
+        self.cookie_allocator = CookieAllocator()
 
         # link to Ryu REST_API
         ryu_ip = 'localhost'
@@ -115,9 +133,19 @@ class DCNetwork(Containernet):
         self.ryu_REST_api = 'http://{0}:{1}'.format(ryu_ip, ryu_port)
         self.RyuSession = requests.Session()
 
+        # serializes changes of the Mininet topology (links, resource allocation)
+        # while containers are created concurrently
+        self.topology_lock = threading.RLock()
+
+        # install the flow entries of a chain per switch at once instead of hop by hop
+        self.enable_flow_batching = True
+        # per thread state of open flow batches (see beginFlowBatch)
+        self._flow_batch_state = threading.local()
+
         # monitoring agent
         if monitor:
-            self.monitor_agent = DCNetworkMonitor(self)
+            self.monitor_agent = DCNetworkMonitor(self, use_pushgateway=monitor_pushgateway,
+                                                  exporter_port=monitor_exporter_port)
         else:
             self.monitor_agent = None
 
@@ -224,16 +252,155 @@ class DCNetwork(Containernet):
         attr_dict2.update(attr_dict)
         self.DCNetwork_graph.add_edge(node2.name, node1.name, attr_dict=attr_dict2)
 
+        # remember to which switch port each interface is connected
+        self._index_intf(node1.name, node1_port_id, node1_port_name,
+                         node2.name, node2.ports[link.intf2], node2_port_name)
+        self._index_intf(node2.name, node2_port_id, node2_port_name,
+                         node1.name, node1.ports[link.intf1], node1_port_name)
+
+        self._index_link(link)
+
+        # the cached status of containers contains their interfaces
+        for n in [node1, node2]:
+            if isinstance(n, EmulatorCompute):
+                n.invalidateStatus()
+
+        # only links between switches are relevant for path calculation
+        if isinstance(node1, OVSSwitch) and isinstance(node2, OVSSwitch):
+            self.path_index.add_link(node1.name, node2.name, node1_port_name, attr_dict)
+            self.path_index.add_link(node2.name, node1.name, node2_port_name, attr_dict)
+
         LOG.debug("addLink: n1={0} intf1={1} -- n2={2} intf2={3}".format(
             str(node1),node1_port_name, str(node2), node2_port_name))
 
         return link
 
+    def removeLink(self, link=None, node1=None, node2=None):
+        """
+        Wrapper for removeLink method to update graph and path index.
+        Either the link or its two end points have to be given.
+        """
+        if link is None:
+            if isinstance(node1, basestring):
+                node1 = self.getNodeByName(node1)
+            if isinstance(node2, basestring):
+                node2 = self.getNodeByName(node2)
+            # same search as done by Containernet: first link between both nodes
+            for l in self._node_links.get(getattr(node1, "name", None), list()):
+                if ((l.intf1.node == node1 and l.intf2.node == node2) or
+                        (l.intf1.node == node2 and l.intf2.node == node1)):
+                    link = l
+                    break
+        if link is None:
+            LOG.warning("removeLink: no link found between {0} and {1}".format(node1, node2))
+            return
+
+        n1 = link.intf1.node.name
+        n2 = link.intf2.node.name
+        self._unindex_link(link)
+        for n in [link.intf1.node, link.intf2.node]:
+            if isinstance(n, EmulatorCompute):
+                n.invalidateStatus()
+        self._unindex_intf(n1, self._remove_graph_edge(n1, n2, link.intf1.name))
+        self._unindex_intf(n2, self._remove_graph_edge(n2, n1, link.intf2.name))
+        self.path_index.remove_link(n1, n2, link.intf1.name)
+        self.path_index.remove_link(n2, n1, link.intf2.name)
+
+        LOG.debug("removeLink: n1={0} intf1={1} -- n2={2} intf2={3}".format(
+            n1, link.intf1.name, n2, link.intf2.name))
+        return Containernet.removeLink(self, link=link)
+
+    def _remove_graph_edge(self, src, dst, src_port_name):
+        """
+        Remove the edge from src to dst which starts at the given port.
+        :return: attributes of the removed edge or None
+        """
+        if not self.DCNetwork_graph.has_edge(src, dst):
+            return None
+        link_dict = self.DCNetwork_graph[src][dst]
+        for key in list(link_dict):
+            if link_dict[key].get('src_port_name') == src_port_name:
+                attr = link_dict[key]
+                self.DCNetwork_graph.remove_edge(src, dst, key=key)
+                return attr
+        return None
+
+    def _index_intf(self, node_name, port_id, port_name, sw_name, sw_port_nr, sw_port_name):
+        entry = (sw_name, sw_port_nr, sw_port_name)
+        self.intf_index[(node_name, port_name)] = entry
+        self.intf_index[(node_name, port_id)] = entry
+        self._node_intfs.setdefault(node_name, list()).append((port_id, port_name))
+
+    def _unindex_intf(self, node_name, edge_attr):
+        if edge_attr is None:
+            return
+        port_id = edge_attr['src_port_id']
+        port_name = edge_attr['src_port_name']
+        self.intf_index.pop((node_name, port_id), None)
+        self.intf_index.pop((node_name, port_name), None)
+        intfs = self._node_intfs.get(node_name, list())
+        if (port_id, port_name) in intfs:
+            intfs.remove((port_id, port_name))
+        if len(intfs) == 0:
+            self._node_intfs.pop(node_name, None)
+
+    def _index_link(self, link):
+        for intf in [link.intf1, link.intf2]:
+            self._intf_links.setdefault(intf.name, list()).append(link)
+            self._node_links.setdefault(intf.node.name, list()).append(link)
+
+    def _unindex_link(self, link):
+        for intf in [link.intf1, link.intf2]:
+            for index, key in [(self._intf_links, intf.name), (self._node_links, intf.node.name)]:
+                links = index.get(key)
+                if links is None or link not in links:
+                    continue
+                links.remove(link)
+                if len(links) == 0:
+                    del index[key]
+
+    def getLinksByIntfName(self, intf_name):
+        """
+        Get all links with an interface of the given name at one of their ends.
+        :param intf_name: interface name, e.g. the intf_name of a heat port
+        :return: list of Mininet links in the order they were added
+        """
+        return list(self._intf_links.get(intf_name, list()))
+
+    def getNodeLinks(self, node_name):
+        """
+        Get all links connected to the node with the given name.
+        :param node_name: name of a container or switch
+        :return: list of Mininet links in the order they were added
+        """
+        return list(self._node_links.get(node_name, list()))
+
+    def getConnectedSwitchPort(self, vnf_name, vnf_interface):
+        """
+        Get the switch port a VNF interface is connected to.
+        :param vnf_name: name of the VNF
+        :param vnf_interface: interface id (as given in the descriptor) or interface name
+        :return: tuple (switch name, switch port nr, switch port name) or None
+        """
+        return self.intf_index.get((vnf_name, vnf_interface))
+
+    def getDefaultInterface(self, vnf_name):
+        """
+        Get the interface id of the first link that was added to a VNF.
+        :param vnf_name: name of the VNF
+        :return: interface id or None if the VNF has no links
+        """
+        intfs = self._node_intfs.get(vnf_name)
+        if not intfs:
+            return None
+        return intfs[0][0]
+
     def addDocker( self, label, **params ):
         """
         Wrapper for addDocker method to use custom container class.
         """
-        self.DCNetwork_graph.add_node(label)
+        with self.topology_lock:
+            self.DCNetwork_graph.add_node(label)
         return Containernet.addDocker(self, label, cls=EmulatorCompute, **params)
 
     def removeDocker( self, label, **params ):
@@ -241,6 +408,11 @@ class DCNetwork(Containernet):
         Wrapper for removeDocker method to update graph.
         """
         self.DCNetwork_graph.remove_node(label)
+        for port_id, port_name in self._node_intfs.pop(label, list()):
+            self.intf_index.pop((label, port_id), None)
+            self.intf_index.pop((label, port_name), None)
+        # containers are no transit nodes, this only affects switches with the same name
+        self.path_index.remove_node(label)
         return Containernet.removeDocker(self, label, **params)
 
     def addSwitch( self, name, add_to_graph=True, **params ):
@@ -251,6 +423,7 @@ class DCNetwork(Containernet):
         # add this switch to the global topology overview
         if add_to_graph:
             self.DCNetwork_graph.add_node(name)
+            self.path_index.add_switch(name)
 
         # set the learning switch behavior
         if 'failMode' in params :
@@ -295,6 +468,9 @@ class DCNetwork(Containernet):
         # stop Ryu controller
         self.killRyu()
 
+        # write out pending resource model logs
+        flush_resource_logs()
+
 
     def CLI(self):
         CLI(self)
@@ -320,20 +496,12 @@ class DCNetwork(Containernet):
             # check if port is specified (vnf:port)
             if vnf_src_interface is None:
                 # take first interface by default
-                connected_sw = self.DCNetwork_graph.neighbors(vnf_src_name)[0]
-                link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-                vnf_src_interface = link_dict[0]['src_port_id']
-
-            for connected_sw in self.DCNetwork_graph.neighbors(vnf_src_name):
-                link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-                for link in link_dict:
-                    if (link_dict[link]['src_port_id'] == vnf_src_interface or
-                                link_dict[link]['src_port_name'] == vnf_src_interface):  # Fix: we might also get interface names, e.g, from a son-emu-cli call
-                        # found the right link and connected switch
-                        src_sw = connected_sw
-                        src_sw_inport_nr = link_dict[link]['dst_port_nr']
-                        src_sw_inport_name = link_dict[link]['dst_port_name']
-                        break
+                vnf_src_interface = self.getDefaultInterface(vnf_src_name)
+
+            # we might get interface ids or names, e.g, from a son-emu-cli call
+            connected = self.getConnectedSwitchPort(vnf_src_name, vnf_src_interface)
+            if connected is not None:
+                src_sw, src_sw_inport_nr, src_sw_inport_name = connected
 
             # set the tag on the dc switch interface
             LOG.debug('set E-LAN: vnf name: {0} interface: {1} tag: {2}'.format(vnf_src_name, vnf_src_interface,vlan))
@@ -367,38 +535,21 @@ class DCNetwork(Containernet):
         #check if port is specified (vnf:port)
         if vnf_src_interface is None:
             # take first interface by default
-            connected_sw = self.DCNetwork_graph.neighbors(vnf_src_name)[0]
-            link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-            vnf_src_interface = link_dict[0]['src_port_id']
-
-        for connected_sw in self.DCNetwork_graph.neighbors(vnf_src_name):
-            link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-            for link in link_dict:
-                if (link_dict[link]['src_port_id'] == vnf_src_interface or
-                        link_dict[link]['src_port_name'] == vnf_src_interface):  # Fix: we might also get interface names, e.g, from a son-emu-cli call
-                    # found the right link and connected switch
-                    src_sw = connected_sw
-                    src_sw_inport_nr = link_dict[link]['dst_port_nr']
-                    src_sw_inport_name = link_dict[link]['dst_port_name']
-                    break
+            vnf_src_interface = self.getDefaultInterface(vnf_src_name)
+
+        # we might get interface ids or names, e.g, from a son-emu-cli call
+        connected = self.getConnectedSwitchPort(vnf_src_name, vnf_src_interface)
+        if connected is not None:
+            src_sw, src_sw_inport_nr, src_sw_inport_name = connected
 
         if vnf_dst_interface is None:
             # take first interface by default
-            connected_sw = self.DCNetwork_graph.neighbors(vnf_dst_name)[0]
-            link_dict = self.DCNetwork_graph[connected_sw][vnf_dst_name]
-            vnf_dst_interface = link_dict[0]['dst_port_id']
+            vnf_dst_interface = self.getDefaultInterface(vnf_dst_name)
 
         vnf_dst_name = vnf_dst_name.split(':')[0]
-        for connected_sw in self.DCNetwork_graph.neighbors(vnf_dst_name):
-            link_dict = self.DCNetwork_graph[connected_sw][vnf_dst_name]
-            for link in link_dict:
-                if link_dict[link]['dst_port_id'] == vnf_dst_interface or \
-                        link_dict[link]['dst_port_name'] == vnf_dst_interface:  # Fix: we might also get interface names, e.g, from a son-emu-cli call
-                    # found the right link and connected switch
-                    dst_sw = connected_sw
-                    dst_sw_outport_nr = link_dict[link]['src_port_nr']
-                    dst_sw_outport_name = link_dict[link]['src_port_name']
-                    break
+        connected = self.getConnectedSwitchPort(vnf_dst_name, vnf_dst_interface)
+        if connected is not None:
+            dst_sw, dst_sw_outport_nr, dst_sw_outport_name = connected
 
         if not tag >= 0:
             LOG.exception('tag not valid: {0}'.format(tag))
@@ -406,8 +557,8 @@ class DCNetwork(Containernet):
         # get shortest path
         try:
             # returns the first found shortest path
-            # if all shortest paths are wanted, use: all_shortest_paths
-            path = nx.shortest_path(self.DCNetwork_graph, src_sw, dst_sw, weight=kwargs.get('weight'))
+            # (cached, only switches are considered as hops)
+            path = self.path_index.shortest_path(src_sw, dst_sw, weight=kwargs.get('weight'))
         except:
             LOG.exception("No path could be found between {0} and {1} using src_sw={2} and dst_sw={3}".format(
                 vnf_src_name, vnf_dst_name, src_sw, dst_sw))
@@ -534,17 +685,78 @@ class DCNetwork(Containernet):
 
         cmd = kwargs.get('cmd')
         if cmd == 'add-flow' or cmd == 'del-flows':
-            ret = self._chainAddFlow(vnf_src_name, vnf_dst_name, vnf_src_interface, vnf_dst_interface, **kwargs)
-            if kwargs.get('bidirectional'):
-                if kwargs.get('path') is not None:
-                    kwargs['path'] = list(reversed(kwargs.get('path')))
-                ret = ret +'\n' + self._chainAddFlow(vnf_dst_name, vnf_src_name, vnf_dst_interface, vnf_src_interface, **kwargs)
+            # collect the flow entries of both directions and install them per switch at once
+            self.beginFlowBatch()
+            try:
+                ret = self._chainAddFlow(vnf_src_name, vnf_dst_name, vnf_src_interface, vnf_dst_interface, **kwargs)
+                if kwargs.get('bidirectional'):
+                    if kwargs.get('path') is not None:
+                        kwargs['path'] = list(reversed(kwargs.get('path')))
+                    ret = ret +'\n' + self._chainAddFlow(vnf_dst_name, vnf_src_name, vnf_dst_interface, vnf_src_interface, **kwargs)
+            finally:
+                self.commitFlowBatch()
 
         else:
             ret = "Command unknown"
 
         return ret
 
+    def beginFlowBatch(self):
+        """
+        Start collecting flow entries instead of installing them one by one.
+        All flow entries created by the calling thread are queued per switch until
+        the matching commitFlowBatch call. Batches can be nested, only the outermost
+        commit installs the flow entries. This can be used to install all chains of
+        a service (e.g. a complete NSD) at once.
+        :return:
+        """
+        if not self.enable_flow_batching:
+            return
+        state = self._flow_batch_state
+        if getattr(state, "depth", 0) == 0:
+            state.batch = FlowBatch(self)
+            state.depth = 0
+        state.depth += 1
+
+    def commitFlowBatch(self):
+        """
+        Close the current flow batch. If this is the outermost batch, all
+        collected flow entries are installed with one transaction per switch.
+        :return: number of installed flow entries
+        """
+        state = self._flow_batch_state
+        if getattr(state, "depth", 0) == 0:
+            return 0
+        state.depth -= 1
+        if state.depth > 0:
+            return 0
+        batch = state.batch
+        state.batch = None
+        return batch.commit()
+
+    def _get_flow_batch(self):
+        """
+        Return the flow batch opened by the calling thread or None.
+        """
+        return getattr(self._flow_batch_state, "batch", None)
+
+    def deleteFlowsByCookie(self, cookie):
+        """
+        Remove all flow entries with the given cookie from all switches.
+        :param cookie: cookie of the flow entries, e.g. the cookie of a chain
+        :return:
+        """
+        for switch in self.switches:
+            if self.controller == RemoteController:
+                flow = dict()
+                flow['dpid'] = int(switch.dpid, 16)
+                flow['cookie'] = int(cookie)
+                flow['cookie_mask'] = int('0xffffffffffffffff', 16)  # need full mask to match complete cookie
+                self.ryu_REST('stats/flowentry/delete', data=flow)
+            else:
+                switch.dpctl('del-flows', 'cookie=%s/-1' % cookie)
+        LOG.debug("deleted flow entries with cookie {0} in {1} switches".format(cookie, len(self.switches)))
+
 
     def _chainAddFlow(self, vnf_src_name, vnf_dst_name, vnf_src_interface=None, vnf_dst_interface=None, **kwargs):
 
@@ -561,46 +773,29 @@ class DCNetwork(Containernet):
         #check if port is specified (vnf:port)
         if vnf_src_interface is None:
             # take first interface by default
-            connected_sw = self.DCNetwork_graph.neighbors(vnf_src_name)[0]
-            link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-            vnf_src_interface = link_dict[0]['src_port_id']
-
-        for connected_sw in self.DCNetwork_graph.neighbors(vnf_src_name):
-            link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-            for link in link_dict:
-                if (link_dict[link]['src_port_id'] == vnf_src_interface or
-                        link_dict[link]['src_port_name'] == vnf_src_interface):  # Fix: we might also get interface names, e.g, from a son-emu-cli call
-                    # found the right link and connected switch
-                    src_sw = connected_sw
-                    src_sw_inport_nr = link_dict[link]['dst_port_nr']
-                    src_sw_inport_name = link_dict[link]['dst_port_name']
-                    break
+            vnf_src_interface = self.getDefaultInterface(vnf_src_name)
+
+        # we might get interface ids or names, e.g, from a son-emu-cli call
+        connected = self.getConnectedSwitchPort(vnf_src_name, vnf_src_interface)
+        if connected is not None:
+            src_sw, src_sw_inport_nr, src_sw_inport_name = connected
 
         if vnf_dst_interface is None:
             # take first interface by default
-            connected_sw = self.DCNetwork_graph.neighbors(vnf_dst_name)[0]
-            link_dict = self.DCNetwork_graph[connected_sw][vnf_dst_name]
-            vnf_dst_interface = link_dict[0]['dst_port_id']
+            vnf_dst_interface = self.getDefaultInterface(vnf_dst_name)
 
         vnf_dst_name = vnf_dst_name.split(':')[0]
-        for connected_sw in self.DCNetwork_graph.neighbors(vnf_dst_name):
-            link_dict = self.DCNetwork_graph[connected_sw][vnf_dst_name]
-            for link in link_dict:
-                if link_dict[link]['dst_port_id'] == vnf_dst_interface or \
-                        link_dict[link]['dst_port_name'] == vnf_dst_interface:  # Fix: we might also get interface names, e.g, from a son-emu-cli call
-                    # found the right link and connected switch
-                    dst_sw = connected_sw
-                    dst_sw_outport_nr = link_dict[link]['src_port_nr']
-                    dst_sw_outport_name = link_dict[link]['src_port_name']
-                    break
+        connected = self.getConnectedSwitchPort(vnf_dst_name, vnf_dst_interface)
+        if connected is not None:
+            dst_sw, dst_sw_outport_nr, dst_sw_outport_name = connected
 
         path = kwargs.get('path')
         if path is None:
             # get shortest path
             try:
                 # returns the first found shortest path
-                # if all shortest paths are wanted, use: all_shortest_paths
-                path = nx.shortest_path(self.DCNetwork_graph, src_sw, dst_sw, weight=kwargs.get('weight'))
+                # (cached, only switches are considered as hops)
+                path = self.path_index.shortest_path(src_sw, dst_sw, weight=kwargs.get('weight'))
             except:
                 LOG.exception("No path could be found between {0} and {1} using src_sw={2} and dst_sw={3}".format(
                     vnf_src_name, vnf_dst_name, src_sw, dst_sw))
@@ -773,7 +968,11 @@ class DCNetwork(Containernet):
             flow['actions'].append(action)
 
         flow['match'] = self._parse_match(match)
-        self.ryu_REST(prefix, data=flow)
+        batch = self._get_flow_batch()
+        if batch is not None:
+            batch.add_ryu_flow(flow['dpid'], prefix, flow)
+        else:
+            self.ryu_REST(prefix, data=flow)
 
     def _set_vlan_tag(self, node, switch_port, tag):
         node.vsctl('set', 'port {0} tag={1}'.format(switch_port,tag))
@@ -791,6 +990,8 @@ class DCNetwork(Containernet):
         vlan = kwargs.get('vlan')
 
         s = ','
+        # extra ovs-ofctl options
+        options = ''
         if cookie:
             cookie = 'cookie=%s' % cookie
             match = s.join([cookie, match])
@@ -801,7 +1002,7 @@ class DCNetwork(Containernet):
             if vlan != None:
                 if index == 0: # first node
                     action = ('action=mod_vlan_vid:%s' % vlan) + (',output=%s' % switch_outport_nr)
-                    match = '-O OpenFlow13 ' + match
+                    options = '-O OpenFlow13'
                 elif index == len(path) - 1:  # last node
                     match += ',dl_vlan=%s' % vlan
                     action = 'action=strip_vlan,output=%s' % switch_outport_nr
@@ -813,6 +1014,16 @@ class DCNetwork(Containernet):
         else:
             ofcmd = ''
 
+        batch = self._get_flow_batch()
+        if batch is not None and cmd == 'add-flow':
+            # installed later together with all other flows of this switch
+            batch.add_dpctl_flow(node, ofcmd)
+            LOG.debug("queued {3} in switch: {0} in_port: {1} out_port: {2}".format(node.name, switch_inport_nr,
+                                                                                     switch_outport_nr, cmd))
+            return
+
+        if options:
+            ofcmd = ' '.join([options, ofcmd])
         node.dpctl(cmd, ofcmd)
         LOG.info("{3} in switch: {0} in_port: {1} out_port: {2}".format(node.name, switch_inport_nr,
                                                                                  switch_outport_nr, cmd))
@@ -855,16 +1066,19 @@ class DCNetwork(Containernet):
         # ensure its death ;-)
         Popen(['pkill', '-f', 'ryu-manager'])
 
-    def ryu_REST(self, prefix, dpid=None, data=None):
+    def ryu_REST(self, prefix, dpid=None, data=None, session=None):
+        # the shared session must not be used by several threads at once, workers pass their own
+        if session is None:
+            session = self.RyuSession
 
         if dpid:
             url = self.ryu_REST_api + '/' + str(prefix) + '/' + str(dpid)
         else:
             url = self.ryu_REST_api + '/' + str(prefix)
         if data:
-            req = self.RyuSession.post(url, json=data)
+            req = session.post(url, json=data)
         else:
-            req = self.RyuSession.get(url)
+            req = session.get(url)
 
 
         # do extra logging if status code is not 200 (OK)
@@ -903,13 +1117,7 @@ class DCNetwork(Containernet):
         return dict
 
     def find_connected_dc_interface(self, vnf_src_name, vnf_src_interface):
-        for connected_sw in self.DCNetwork_graph.neighbors(vnf_src_name):
-            link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-            for link in link_dict:
-                if (link_dict[link]['src_port_id'] == vnf_src_interface or
-                        link_dict[link]['src_port_name'] == vnf_src_interface):  # Fix: we might also get interface names, e.g, from a son-emu-cli call
-                    # found the right link and connected switch
-                    src_sw = connected_sw
-                    src_sw_inport_nr = link_dict[link]['dst_port_nr']
-                    src_sw_inport_name = link_dict[link]['dst_port_name']
-                    return src_sw_inport_name
+        connected = self.getConnectedSwitchPort(vnf_src_name, vnf_src_interface)
+        if connected is not None:
+            # name of the connected switch port
+            return connected[2]
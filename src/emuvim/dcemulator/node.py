@@ -28,7 +28,9 @@ partner consortium (www.sonata-nfv.eu).
 from mininet.node import Docker
 from mininet.link import Link
 from emuvim.dcemulator.resourcemodel import NotEnoughResourcesAvailable
+from emuvim.dcemulator.dockerstate import get_docker_state
 import logging
+import threading
 import time
 import json
 
@@ -38,6 +40,9 @@ LOG.setLevel(logging.DEBUG)
 
 DCDPID_BASE = 1000  # start of switch dpid's used for data center switches
 
+# max. age (seconds) of the cached Docker/network state returned by getStatus
+STATUS_CACHE_TTL = 5
+
 class EmulatorCompute(Docker):
     """
     Emulator specific compute node class.
@@ -52,13 +57,19 @@ class EmulatorCompute(Docker):
         self.datacenter = kwargs.get("datacenter")  # pointer to current DC
         self.flavor_name = kwargs.get("flavor_name")
         LOG.debug("Starting compute instance %r in data center %r" % (name, str(self.datacenter)))
+        # cached result of the expensive parts of getStatus (Docker inspect, interface link state)
+        self._status_cache = None
+        self._status_time = 0
+        self._status_lock = threading.Lock()
         # call original Docker.__init__
         Docker.__init__(self, name, dimage, **kwargs)
 
-    def getNetworkStatus(self):
+    def getNetworkStatus(self, link_state=None):
         """
         Helper method to receive information about the virtual networks
         this compute instance is connected to.
+        :param link_state: optional dict interface name -> (isUp, status) with
+            already known link states, the other interfaces are queried
         """
         # get all links and find dc switch interface
         networkStatusList = []
@@ -66,20 +77,32 @@ class EmulatorCompute(Docker):
             vnf_name = self.name
             vnf_interface = str(i)
             dc_port_name = self.datacenter.net.find_connected_dc_interface(vnf_name, vnf_interface)
+            if link_state is not None and vnf_interface in link_state:
+                up, intf_status = link_state[vnf_interface]
+            else:
+                up, intf_status = i.isUp(), i.status()
             # format list of tuples (name, Ip, MAC, isUp, status, dc_portname)
-            intf_dict = {'intf_name': str(i), 'ip': i.IP(), 'mac': i.MAC(), 'up': i.isUp(), 'status': i.status(), 'dc_portname': dc_port_name}
+            intf_dict = {'intf_name': str(i), 'ip': i.IP(), 'mac': i.MAC(), 'up': up, 'status': intf_status, 'dc_portname': dc_port_name}
             networkStatusList.append(intf_dict)
 
         return networkStatusList
 
-    def getStatus(self):
+    def _getLinkState(self):
+        # isUp and status run commands in the container
+        return dict((str(i), (i.isUp(), i.status())) for i in self.intfList())
+
+    def getStatus(self, max_age=STATUS_CACHE_TTL):
         """
         Helper method to receive information about this compute instance.
+        The Docker state and the link state of the interfaces are cached until
+        the Docker event stream reports a state change (or for max_age seconds
+        if the event stream is not available), see invalidateStatus. The
+        resource limits and the addresses of the interfaces (which can be
+        changed without a Docker event, e.g. by setIP) are always up to date.
+        :param max_age: max. age of the cached state in seconds, 0 to force a refresh
         """
         status = {}
         status["name"] = self.name
-        status["network"] = self.getNetworkStatus()
-        status["docker_network"] = self.dcinfo['NetworkSettings']['IPAddress']
         status["image"] = self.dimage
         status["flavor_name"] = self.flavor_name
         status["cpu_quota"] = self.cpu_quota
@@ -88,13 +111,80 @@ class EmulatorCompute(Docker):
         status["cpuset"] = self.cpuset
         status["mem_limit"] = self.mem_limit
         status["memswap_limit"] = self.memswap_limit
-        status["state"] = self.dcli.inspect_container(self.dc)["State"]
-        status["id"] = self.dcli.inspect_container(self.dc)["Id"]
-        status["short_id"] = self.dcli.inspect_container(self.dc)["Id"][:12]
         status["datacenter"] = (None if self.datacenter is None
                                 else self.datacenter.label)
+        cache = self._getCachedStatus(max_age)
+        status["network"] = self.getNetworkStatus(cache.pop("link_state"))
+        status["docker_network"] = self.dcinfo['NetworkSettings']['IPAddress']
+        status.update(cache)
         return status
 
+    def _getCachedStatus(self, max_age):
+        with self._status_lock:
+            if not self._isStatusCacheValid(max_age):
+                # a single inspect call per refresh
+                info = self.dcli.inspect_container(self.dc)
+                cache = dict()
+                cache["link_state"] = self._getLinkState()
+                cache["state"] = info["State"]
+                cache["id"] = info["Id"]
+                cache["short_id"] = info["Id"][:12]
+                self._status_cache = cache
+                self._status_time = time.time()
+            return dict(self._status_cache)
+
+    def _isStatusCacheValid(self, max_age):
+        if self._status_cache is None or max_age <= 0:
+            return False
+        state = get_docker_state()
+        if state.synced:
+            # the event stream tells us if the container state changed
+            c = state.container(self.did)
+            return c is not None and c["status"] == self._status_cache["state"].get("Status")
+        return time.time() - self._status_time <= max_age
+
+    def invalidateStatus(self):
+        """
+        Drop the cached status, e.g., because interfaces were added or removed.
+        """
+        with self._status_lock:
+            self._status_cache = None
+
+    def confirmStatus(self, state):
+        """
+        Keep the cached status if the container is still in the given
+        Docker state (e.g. 'running'), otherwise drop it.
+        :param state: Docker state string as returned by a container listing
+        """
+        with self._status_lock:
+            if self._status_cache is None:
+                return
+            if self._status_cache["state"].get("Status") == state:
+                self._status_time = time.time()
+            else:
+                self._status_cache = None
+
+
+def list_compute_status(containers):
+    """
+    Return [(name, status), ...] for the given containers.
+    The cached state of all containers is validated with the Docker
+    event stream or, if it is not available, with a single Docker
+    container listing instead of one inspect call per container.
+    :param containers: list of EmulatorCompute objects
+    :return: list of (name, status dict) tuples
+    """
+    if len(containers) > 0 and not get_docker_state().synced:
+        try:
+            states = dict()
+            for c in containers[0].dcli.containers(all=True):
+                states[c.get("Id")] = c.get("State")
+            for c in containers:
+                c.confirmStatus(states.get(c.did))
+        except Exception:
+            LOG.exception("Container listing failed, status will be refreshed per container.")
+    return [(c.name, c.getStatus()) for c in containers]
+
 
 class Datacenter(object):
     """
@@ -181,6 +271,7 @@ class Datacenter(object):
             params['cpu_quota'] = self.net.cpu_period * float(cpu_percentage)
 
         # create the container
+        # (not done under the topology lock, so containers can be created concurrently)
         d = self.net.addDocker(
             "%s" % (name),
             dimage=image,
@@ -191,31 +282,31 @@ class Datacenter(object):
             **params
         )
 
-
-
-        # apply resource limits to container if a resource model is defined
-        if self._resource_model is not None:
-            try:
-                self._resource_model.allocate(d)
-                self._resource_model.write_allocation_log(d, self.resource_log_path)
-            except NotEnoughResourcesAvailable as ex:
-                LOG.warning("Allocation of container %r was blocked by resource model." % name)
-                LOG.info(ex.message)
-                # ensure that we remove the container
-                self.net.removeDocker(name)
-                return None
-
-        # connect all given networks
-        # if no --net option is given, network = [{}], so 1 empty dict in the list
-        # this results in 1 default interface with a default ip address
-        for nw in network:
-            # clean up network configuration (e.g. RTNETLINK does not allow ':' in intf names
-            if nw.get("id") is not None:
-                nw["id"] = self._clean_ifname(nw["id"])
-            # TODO we cannot use TCLink here (see: https://github.com/mpeuster/containernet/issues/3)
-            self.net.addLink(d, self.switch, params1=nw, cls=Link, intfName1=nw.get('id'))
-        # do bookkeeping
-        self.containers[name] = d
+        # resource models and Mininet links are not thread-safe
+        with self.net.topology_lock:
+            # apply resource limits to container if a resource model is defined
+            if self._resource_model is not None:
+                try:
+                    self._resource_model.allocate(d)
+                    self._resource_model.write_allocation_log(d, self.resource_log_path)
+                except NotEnoughResourcesAvailable as ex:
+                    LOG.warning("Allocation of container %r was blocked by resource model." % name)
+                    LOG.info(ex.message)
+                    # ensure that we remove the container
+                    self.net.removeDocker(name)
+                    return None
+
+            # connect all given networks
+            # if no --net option is given, network = [{}], so 1 empty dict in the list
+            # this results in 1 default interface with a default ip address
+            for nw in network:
+                # clean up network configuration (e.g. RTNETLINK does not allow ':' in intf names
+                if nw.get("id") is not None:
+                    nw["id"] = self._clean_ifname(nw["id"])
+                # TODO we cannot use TCLink here (see: https://github.com/mpeuster/containernet/issues/3)
+                self.net.addLink(d, self.switch, params1=nw, cls=Link, intfName1=nw.get('id'))
+            # do bookkeeping
+            self.containers[name] = d
         return d  # we might use UUIDs for naming later on
 
     def stopCompute(self, name):
@@ -231,18 +322,19 @@ class Datacenter(object):
         if self.net.monitor_agent is not None:
             self.net.monitor_agent.stop_metric(name)
 
-        # call resource model and free resources
-        if self._resource_model is not None:
-            self._resource_model.free(self.containers[name])
-            self._resource_model.write_free_log(self.containers[name], self.resource_log_path)
+        with self.net.topology_lock:
+            # call resource model and free resources
+            if self._resource_model is not None:
+                self._resource_model.free(self.containers[name])
+                self._resource_model.write_free_log(self.containers[name], self.resource_log_path)
 
-        # remove links
-        self.net.removeLink(
-            link=None, node1=self.containers[name], node2=self.switch)
+            # remove links
+            self.net.removeLink(
+                link=None, node1=self.containers[name], node2=self.switch)
 
-        # remove container
-        self.net.removeDocker("%s" % (name))
-        del self.containers[name]
+            # remove container
+            self.net.removeDocker("%s" % (name))
+            del self.containers[name]
 
         return True
 
@@ -0,0 +1,195 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Path index for the DCNetwork.
+
+Keeps a switch-only view of the DCNetwork graph and caches the shortest
+paths between switches per weight metric, so that chaining does not need
+to run a shortest path search on the complete graph (incl. all VNFs) for
+every request.
+"""
+
+import logging
+import threading
+from collections import defaultdict
+import networkx as nx
+
+LOG = logging.getLogger("dcemulator.pathindex")
+LOG.setLevel(logging.DEBUG)
+
+# possible weight metrics allowed by TClink class
+WEIGHT_METRICS = ['bw', 'delay', 'jitter', 'loss']
+
+
+class PathIndex(object):
+    """
+    Switch-only graph with cached shortest paths.
+
+    Paths are computed once per (weight metric, source switch) for all
+    destinations and kept until a topology change affects them:
+    - adding a link between switches can shorten any path, so the cache is flushed
+    - removing a link only invalidates the cached paths that use this link
+    - containers are not part of the switch graph, adding or removing them
+      does not invalidate anything
+    """
+
+    def __init__(self):
+        # switch-only graph, parallel links are merged into one edge
+        self.graph = nx.DiGraph()
+        # (u, v) -> {link key: attribute dict} all links between two switches
+        self._links = dict()
+        # (weight, src) -> {dst: path}
+        self._paths = dict()
+        # (u, v) -> set of (weight, src) cache entries that use this edge
+        self._edge_users = defaultdict(set)
+        self.lock = threading.RLock()
+        # some statistics
+        self.hits = 0
+        self.misses = 0
+
+    def add_switch(self, name):
+        with self.lock:
+            self.graph.add_node(name)
+
+    def remove_node(self, name):
+        """
+        Remove a switch and all its links from the index.
+        Does nothing for nodes that are no switches.
+        """
+        with self.lock:
+            if name not in self.graph:
+                return
+            edges = list(self.graph.in_edges(name)) + list(self.graph.out_edges(name))
+            for u, v in edges:
+                self._links.pop((u, v), None)
+                self._invalidate_edge(u, v)
+            self.graph.remove_node(name)
+
+    def add_link(self, u, v, key, attr_dict=None):
+        """
+        Add a directed link between two switches.
+        :param u: name of the source switch
+        :param v: name of the destination switch
+        :param key: identifies the link between u and v (e.g. the source port name)
+        :param attr_dict: link attributes (may contain weight metrics)
+        """
+        with self.lock:
+            self._links.setdefault((u, v), dict())[key] = dict(attr_dict or {})
+            self._update_edge(u, v)
+            # a new link can make any path shorter
+            self.invalidate()
+
+    def remove_link(self, u, v, key=None):
+        """
+        Remove a directed link between two switches.
+        :param key: link to remove, if None all links between u and v are removed
+        """
+        with self.lock:
+            links = self._links.get((u, v))
+            if links is None:
+                return
+            if key is None:
+                links.clear()
+            else:
+                links.pop(key, None)
+            if len(links) == 0:
+                del self._links[(u, v)]
+            self._update_edge(u, v)
+            self._invalidate_edge(u, v)
+
+    def shortest_path(self, src, dst, weight=None):
+        """
+        Return the shortest path between two switches (list of switch names).
+        :param weight: one of WEIGHT_METRICS or None (hop count)
+        :raise nx.NetworkXNoPath: if there is no path between src and dst
+        """
+        with self.lock:
+            if src not in self.graph or dst not in self.graph:
+                raise nx.NetworkXNoPath("No path between %s and %s" % (src, dst))
+            paths = self._paths.get((weight, src))
+            if paths is None:
+                self.misses += 1
+                paths = self._compute_paths(src, weight)
+            else:
+                self.hits += 1
+            if dst not in paths:
+                raise nx.NetworkXNoPath("No path between %s and %s" % (src, dst))
+            return list(paths[dst])
+
+    def invalidate(self):
+        """
+        Drop all cached paths.
+        """
+        with self.lock:
+            self._paths = dict()
+            self._edge_users = defaultdict(set)
+
+    def _compute_paths(self, src, weight):
+        if weight is None:
+            paths = nx.single_source_shortest_path(self.graph, src)
+        else:
+            paths = nx.single_source_dijkstra_path(self.graph, src, weight=weight)
+        key = (weight, src)
+        self._paths[key] = paths
+        # remember which edges are used by this path tree
+        for path in paths.itervalues():
+            for i in range(0, len(path) - 1):
+                self._edge_users[(path[i], path[i + 1])].add(key)
+        return paths
+
+    def _invalidate_edge(self, u, v):
+        for key in self._edge_users.pop((u, v), set()):
+            self._paths.pop(key, None)
+
+    def _update_edge(self, u, v):
+        """
+        (Re-)calculate the merged edge between two switches.
+        Parallel links are merged by using the smallest weight of each metric.
+        """
+        links = self._links.get((u, v))
+        if not links:
+            if self.graph.has_edge(u, v):
+                self.graph.remove_edge(u, v)
+            return
+        attr = dict()
+        for metric in WEIGHT_METRICS:
+            attr[metric] = min([self._metric_value(l.get(metric)) for l in links.itervalues()])
+        if self.graph.has_edge(u, v):
+            self.graph[u][v].update(attr)
+        else:
+            self.graph.add_edge(u, v, attr_dict=attr)
+
+    @staticmethod
+    def _metric_value(value):
+        # links without a value for a metric count as 1 (default of networkx)
+        if value is None:
+            return 1
+        try:
+            return float(value)
+        except ValueError:
+            return 1
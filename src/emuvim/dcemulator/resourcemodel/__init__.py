@@ -44,6 +44,9 @@ class ResourceModelRegistrar(object):
         self.e_mem = dc_emulation_max_mem
         # pointer to all resource models assigned to DCs
         self._resource_models = dict()
+        # cached sums of dc_max_cu / dc_max_mu of all registered resource models
+        self.total_max_cu = 0
+        self.total_max_mu = 0
         LOG.info("Resource model registrar created with dc_emulation_max_cpu=%r and dc_emulation_max_mem=%r"
                  % (dc_emulation_max_cpu, dc_emulation_max_mem))
 
@@ -59,8 +62,19 @@ class ResourceModelRegistrar(object):
         self._resource_models[dc] = rm
         rm.registrar = self
         rm.dcs.append(dc)
+        self.update_totals()
         LOG.info("Registrar: Added resource model: %r" % rm)
 
+    def update_totals(self):
+        """
+        Recalculate the cached global resource totals. Has to be called
+        if dc_max_cu or dc_max_mu of a registered resource model is changed.
+        :return: None
+        """
+        models = list(self._resource_models.itervalues())
+        self.total_max_cu = sum([getattr(rm, "dc_max_cu", 0) for rm in models])
+        self.total_max_mu = sum([getattr(rm, "dc_max_mu", 0) for rm in models])
+
     @property
     def resource_models(self):
         """
@@ -0,0 +1,204 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Batched application of container resource limits.
+
+Resource models collect the new CPU/memory limits of all affected
+containers in a LimitBatch and apply them at once. Limits are written
+directly to the container's cgroup files if they are accessible,
+otherwise the containers' updateCpuLimit/updateMemoryLimit methods
+(Docker API) are called. Containers are updated concurrently.
+"""
+import os
+import logging
+import threading
+from multiprocessing.pool import ThreadPool
+
+LOG = logging.getLogger("resourcemodel.limitbatch")
+LOG.setLevel(logging.DEBUG)
+
+# root of the cgroup file system
+CGROUP_ROOT = "/sys/fs/cgroup"
+# max. number of containers updated in parallel
+MAX_PARALLEL_UPDATES = 8
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPool(MAX_PARALLEL_UPDATES)
+        return _pool
+
+
+def _write(path, value):
+    with open(path, "w") as f:
+        f.write(str(value))
+
+
+class LimitBatch(object):
+    """
+    Collects the new limits of a set of containers.
+    """
+
+    def __init__(self, use_cgroups=True, cgroup_root=CGROUP_ROOT):
+        """
+        :param use_cgroups: write limits directly to the cgroup files if possible
+        :param cgroup_root: mount point of the cgroup file system
+        """
+        self.use_cgroups = use_cgroups
+        self.cgroup_root = cgroup_root
+        # container name -> [container, {limit: value}]
+        self._limits = dict()
+
+    def __len__(self):
+        return len(self._limits)
+
+    def _entry(self, d):
+        if d.name not in self._limits:
+            self._limits[d.name] = [d, dict()]
+        return self._limits[d.name][1]
+
+    def add_cpu(self, d, cpu_period, cpu_quota):
+        """
+        Queue a new CFS bandwidth limit for container d.
+        """
+        limits = self._entry(d)
+        limits["cpu_period"] = int(cpu_period)
+        limits["cpu_quota"] = int(cpu_quota)
+
+    def add_mem(self, d, mem_limit):
+        """
+        Queue a new memory limit (bytes) for container d.
+        """
+        self._entry(d)["mem_limit"] = int(mem_limit)
+
+    def commit(self):
+        """
+        Apply all queued limits and empty the batch.
+        :return: dict with the number of updated containers, the number
+        of containers updated via cgroup files and the names of the
+        containers that could not be updated
+        """
+        entries = list(self._limits.itervalues())
+        self._limits = dict()
+        result = {"updated": 0, "cgroup": 0, "failed": list()}
+        if len(entries) < 1:
+            return result
+        if len(entries) == 1:
+            outcomes = [self._apply(entries[0])]
+        else:
+            outcomes = _get_pool().map(self._apply, entries)
+        for (d, limits), outcome in zip(entries, outcomes):
+            if outcome is None:
+                result["failed"].append(d.name)
+                continue
+            result["updated"] += 1
+            if outcome == "cgroup":
+                result["cgroup"] += 1
+        LOG.debug("Applied limits of %d containers (%d via cgroup files, %d failed)"
+                  % (result["updated"], result["cgroup"], len(result["failed"])))
+        return result
+
+    def _apply(self, entry):
+        """
+        Apply the limits of a single container.
+        :return: "cgroup", "api" or None if the update failed
+        """
+        d, limits = entry
+        try:
+            if self.use_cgroups and self._apply_cgroup(d, limits):
+                return "cgroup"
+            if "cpu_quota" in limits:
+                d.updateCpuLimit(cpu_period=limits["cpu_period"], cpu_quota=limits["cpu_quota"])
+            if "mem_limit" in limits:
+                d.updateMemoryLimit(mem_limit=limits["mem_limit"])
+            return "api"
+        except BaseException:
+            LOG.exception("Could not apply limits %r to container %r" % (limits, d.name))
+            return None
+
+    def _cgroup_dirs(self, d):
+        """
+        Locate the cgroup directories of a Docker container.
+        :return: (cpu directory, memory directory, cgroup v2) or None
+        """
+        did = getattr(d, "did", None)
+        if not did:
+            return None
+        # cgroup v1 (cgroupfs or systemd driver)
+        for parent in [os.path.join("docker", did), os.path.join("system.slice", "docker-%s.scope" % did)]:
+            cpu = os.path.join(self.cgroup_root, "cpu", parent)
+            mem = os.path.join(self.cgroup_root, "memory", parent)
+            if os.path.isdir(cpu) and os.path.isdir(mem):
+                return cpu, mem, False
+        # cgroup v2 (unified hierarchy)
+        for parent in [os.path.join("system.slice", "docker-%s.scope" % did), os.path.join("docker", did)]:
+            unified = os.path.join(self.cgroup_root, parent)
+            if os.path.isfile(os.path.join(unified, "cpu.max")):
+                return unified, unified, True
+        return None
+
+    def _apply_cgroup(self, d, limits):
+        """
+        Write the limits to the cgroup files of the container.
+        Falls back to the Docker API (returns False) if the files are
+        not accessible.
+        """
+        dirs = self._cgroup_dirs(d)
+        if dirs is None:
+            return False
+        cpu_dir, mem_dir, v2 = dirs
+        try:
+            if "cpu_quota" in limits:
+                if v2:
+                    _write(os.path.join(cpu_dir, "cpu.max"),
+                           "%d %d" % (limits["cpu_quota"], limits["cpu_period"]))
+                else:
+                    # reset the quota first, a period smaller than the current quota would be rejected
+                    _write(os.path.join(cpu_dir, "cpu.cfs_quota_us"), -1)
+                    _write(os.path.join(cpu_dir, "cpu.cfs_period_us"), limits["cpu_period"])
+                    _write(os.path.join(cpu_dir, "cpu.cfs_quota_us"), limits["cpu_quota"])
+            if "mem_limit" in limits:
+                if v2:
+                    _write(os.path.join(mem_dir, "memory.max"), limits["mem_limit"])
+                else:
+                    _write(os.path.join(mem_dir, "memory.limit_in_bytes"), limits["mem_limit"])
+        except (IOError, OSError) as ex:
+            LOG.debug("Writing cgroup limits of %r failed (%s), using Docker API" % (d.name, ex))
+            return False
+        # keep the container's view of its limits up to date
+        if "cpu_quota" in limits:
+            d.cpu_period = limits["cpu_period"]
+            d.cpu_quota = limits["cpu_quota"]
+        if "mem_limit" in limits:
+            d.mem_limit = limits["mem_limit"]
+        return True
@@ -0,0 +1,126 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Background writer for the experiment logs of the resource models.
+
+Log entries are handed over to a bounded queue and written by a single
+worker thread that appends all pending entries of a log file at once.
+Callers only pay for building the entry, file I/O and JSON encoding are
+done off the deployment path.
+"""
+import json
+import logging
+import threading
+import Queue
+
+LOG = logging.getLogger("resourcemodel.logwriter")
+LOG.setLevel(logging.DEBUG)
+
+# max. number of pending log entries, writers block if the queue is full
+LOG_QUEUE_SIZE = 10000
+# max. number of entries written with one batch
+LOG_BATCH_SIZE = 1000
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+class ResourceLogWriter(object):
+    """
+    Appends JSON lines to log files in a background thread.
+    """
+
+    def __init__(self, queue_size=LOG_QUEUE_SIZE, batch_size=LOG_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._queue = Queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="ResourceLogWriter")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def write(self, path, entry):
+        """
+        Queue a log entry. Blocks if the queue is full.
+        :param path: log file
+        :param entry: JSON serializable object, written as one line
+        """
+        self._queue.put((path, entry))
+
+    def flush(self):
+        """
+        Block until all queued entries are written.
+        """
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except Queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch):
+        lines = dict()
+        for path, entry in batch:
+            try:
+                lines.setdefault(path, list()).append(json.dumps(entry))
+            except (TypeError, ValueError):
+                LOG.exception("Could not serialize resource log entry for %r" % path)
+        for path, l in lines.iteritems():
+            try:
+                with open(path, "a") as f:
+                    f.write("\n".join(l))
+                    f.write("\n")
+            except IOError:
+                LOG.exception("Could not write resource log %r" % path)
+
+
+def get_log_writer():
+    """
+    Return the shared log writer, created on first use.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ResourceLogWriter()
+        return _writer
+
+
+def flush():
+    """
+    Wait until all pending resource log entries are written.
+    Does nothing if no entry was ever logged.
+    """
+    if _writer is not None:
+        _writer.flush()
@@ -29,9 +29,10 @@ partner consortium (www.sonata-nfv.eu).
 Playground for resource models created by University of Paderborn.
 """
 import time
-import json
 import logging
 from emuvim.dcemulator.resourcemodel import BaseResourceModel, NotEnoughResourcesAvailable
+from emuvim.dcemulator.resourcemodel.limitbatch import LimitBatch
+from emuvim.dcemulator.resourcemodel.logwriter import get_log_writer
 
 LOG = logging.getLogger("rm.upb.simple")
 LOG.setLevel(logging.DEBUG)
@@ -49,11 +50,14 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
 
     def __init__(self, max_cu=32, max_mu=1024,
                  deactivate_cpu_limit=False,
-                 deactivate_mem_limit=False):
+                 deactivate_mem_limit=False,
+                 log_format="full"):
         """
         Initialize model.
         :param max_cu: Maximum number of compute units available in this DC.
         :param max_mu: Maximum memory of entire dc.
+        :param log_format: "full" logs the complete allocation state with each entry,
+        "compact" only the allocations that changed since the last entry.
         :return:
         """
         self.dc_max_cu = max_cu
@@ -64,6 +68,17 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
         self.deactivate_mem_limit = deactivate_mem_limit
         self.single_cu = 0
         self.single_mu = 0
+        # single_cu / single_mu values the current container limits are based on
+        self._applied_single_cu = None
+        self._applied_single_mu = None
+        # write limits directly to the containers' cgroup files if possible
+        self.use_cgroups = True
+        # result of the last limit update (see LimitBatch.commit)
+        self.last_limit_update = None
+        self.log_format = log_format
+        # containers changed/removed since the last compact log entry
+        self._log_changed = set()
+        self._log_removed = set()
         self.cpu_op_factor = 1.0  # over provisioning factor
         self.mem_op_factor = 1.0
         self.raise_no_cpu_resources_left = True
@@ -78,11 +93,14 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
         :return:
         """
         self._allocated_compute_instances[d.name] = d
+        if self.log_format == "compact":
+            self._log_changed.add(d.name)
+            self._log_removed.discard(d.name)
         if not self.deactivate_cpu_limit:
             self._allocate_cpu(d)
         if not self.deactivate_mem_limit:
             self._allocate_mem(d)
-        self._apply_limits()
+        self._apply_limits(d)
 
     def _allocate_cpu(self, d):
         """
@@ -115,6 +133,9 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
         :return:
         """
         del self._allocated_compute_instances[d.name]
+        if self.log_format == "compact":
+            self._log_changed.discard(d.name)
+            self._log_removed.add(d.name)
         if not self.deactivate_cpu_limit:
             self._free_cpu(d)
         if not self.deactivate_mem_limit:
@@ -137,29 +158,53 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
         """
         self.dc_alloc_mu -= self._get_flavor(d).get("memory")
 
-    def _apply_limits(self):
+    def _apply_limits(self, new=None):
         """
-        Recalculate real resource limits for all allocated containers and apply them
-        to their cgroups.
-        We have to recalculate for all containers to allow e.g. over provisioning models.
-        :return:
+        Recalculate real resource limits and apply them to the cgroups of the
+        containers whose limits changed. All changed limits are applied as one batch.
+        The limits of all allocated containers are only recalculated if the size
+        of a single CU/MU changed (e.g. over provisioning or new resource models),
+        otherwise only the newly allocated container is updated.
+        :param new: newly allocated container (or None)
+        :return: result of the limit update (see LimitBatch.commit)
         """
-        for d in self._allocated_compute_instances.itervalues():
+        if not self.deactivate_cpu_limit:
+            self.single_cu = self._compute_single_cu()
+        if not self.deactivate_mem_limit:
+            self.single_mu = self._compute_single_mu()
+        if (self.single_cu != self._applied_single_cu
+                or self.single_mu != self._applied_single_mu):
+            LOG.debug("Resource unit size changed, updating limits of %d containers."
+                      % len(self._allocated_compute_instances))
+            containers = list(self._allocated_compute_instances.itervalues())
+            self._applied_single_cu = self.single_cu
+            self._applied_single_mu = self.single_mu
+        elif new is not None:
+            containers = [new]
+        else:
+            containers = list()
+        if self.log_format == "compact":
+            self._log_changed.update([d.name for d in containers])
+        # collect the changed limits and apply them at once
+        batch = LimitBatch(use_cgroups=self.use_cgroups)
+        for d in containers:
             if not self.deactivate_cpu_limit:
-                self._apply_cpu_limits(d)
+                self._apply_cpu_limits(d, batch)
             if not self.deactivate_mem_limit:
-                self._apply_mem_limits(d)
+                self._apply_mem_limits(d, batch)
+        self.last_limit_update = batch.commit()
+        return self.last_limit_update
 
-    def _apply_cpu_limits(self, d):
+    def _apply_cpu_limits(self, d, batch=None):
         """
         Calculate real CPU limit (CFS bandwidth) and apply.
         :param d: container
+        :param batch: LimitBatch to which the limit is added (applied immediately if None)
         :return:
         """
         number_cu = self._get_flavor(d).get("compute")
-        # calculate cpu time fraction of a single compute unit
-        self.single_cu = self._compute_single_cu()
         # calculate cpu time fraction for container with given flavor
+        # (cpu time fraction of a single compute unit is calculated by _apply_limits)
         cpu_time_percentage = self.single_cu * number_cu
         # calculate input values for CFS scheduler bandwidth limitation
         cpu_period, cpu_quota = self._calculate_cpu_cfs_values(cpu_time_percentage)
@@ -167,7 +212,10 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
         if d.cpu_period != cpu_period or d.cpu_quota != cpu_quota:
             LOG.debug("Setting CPU limit for %r: cpu_quota = cpu_period * limit = %f * %f = %f (op_factor=%f)" % (
                       d.name, cpu_period, cpu_time_percentage, cpu_quota, self.cpu_op_factor))
-            d.updateCpuLimit(cpu_period=int(cpu_period), cpu_quota=int(cpu_quota))
+            if batch is not None:
+                batch.add_cpu(d, cpu_period, cpu_quota)
+            else:
+                d.updateCpuLimit(cpu_period=int(cpu_period), cpu_quota=int(cpu_quota))
 
     def _compute_single_cu(self):
         """
@@ -177,7 +225,17 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
         # get cpu time fraction for entire emulation
         e_cpu = self.registrar.e_cpu
         # calculate
-        return float(e_cpu) / sum([rm.dc_max_cu for rm in list(self.registrar.resource_models)])
+        return float(e_cpu) / self.registrar.total_max_cu
+
+    def _compute_single_mu(self):
+        """
+        Calculate amount of memory (MB) of a single MU unit.
+        :return:
+        """
+        # get memory amount for entire emulation
+        e_mem = self.registrar.e_mem
+        # calculate
+        return float(e_mem) / self.registrar.total_max_mu
 
     def _calculate_cpu_cfs_values(self, cpu_time_percentage):
         """
@@ -195,25 +253,26 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
             LOG.warning("Increased CPU quota to avoid system error.")
         return cpu_period, cpu_quota
 
-    def _apply_mem_limits(self, d):
+    def _apply_mem_limits(self, d, batch=None):
         """
         Calculate real mem limit and apply.
         :param d: container
+        :param batch: LimitBatch to which the limit is added (applied immediately if None)
         :return:
         """
         number_mu = self._get_flavor(d).get("memory")
-        # get memory amount for entire emulation
-        e_mem = self.registrar.e_mem
-        # calculate amount of memory for a single mu
-        self.single_mu = float(e_mem) / sum([rm.dc_max_mu for rm in list(self.registrar.resource_models)])
         # calculate mem for given flavor
+        # (amount of memory of a single mu is calculated by _apply_limits)
         mem_limit = self.single_mu * number_mu
         mem_limit = self._calculate_mem_limit_value(mem_limit)
         # apply to container if changed
         if d.mem_limit != mem_limit:
             LOG.debug("Setting MEM limit for %r: mem_limit = %f MB (op_factor=%f)" %
                       (d.name, mem_limit/1024/1024, self.mem_op_factor))
-            d.updateMemoryLimit(mem_limit=mem_limit)
+            if batch is not None:
+                batch.add_mem(d, mem_limit)
+            else:
+                d.updateMemoryLimit(mem_limit=mem_limit)
 
     def _calculate_mem_limit_value(self, mem_limit):
         """
@@ -228,15 +287,21 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
         # to byte!
         return int(mem_limit*1024*1024)
 
-    def get_state_dict(self):
+    def get_state_dict(self, names=None):
         """
         Return the state of the resource model as simple dict.
         Helper method for logging functionality.
+        :param names: only include these containers in the allocation state (default: all)
         :return:
         """
         # collect info about all allocated instances
         allocation_state = dict()
-        for k, d in self._allocated_compute_instances.iteritems():
+        if names is None:
+            names = self._allocated_compute_instances.iterkeys()
+        for k in names:
+            d = self._allocated_compute_instances.get(k)
+            if d is None:
+                continue
             s = dict()
             s["cpu_period"] = d.cpu_period
             s["cpu_quota"] = d.cpu_quota
@@ -273,6 +338,7 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
     def _write_log(self, d, path, action):
         """
         Helper to log RM info for experiments.
+        The entry is written to the log file in the background.
         :param d: container
         :param path: log path
         :param action: allocate or free
@@ -283,12 +349,39 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
         # we have a path: write out RM info
         l = dict()
         l["t"] = time.time()
-        l["container_state"] = d.getStatus()
         l["action"] = action
-        l["rm_state"] = self.get_state_dict()
-        # append to logfile
-        with open(path, "a") as f:
-            f.write("%s\n" % json.dumps(l))
+        if self.log_format == "compact":
+            # only the allocations that changed since the last entry
+            l["container"] = d.name
+            l["rm_state"] = self.get_state_dict(names=self._log_changed)
+            l["rm_state"]["removed"] = list(self._log_removed)
+            self._log_changed = set()
+            self._log_removed = set()
+        else:
+            l["container_state"] = self._get_container_log_state(d)
+            l["rm_state"] = self.get_state_dict()
+        get_log_writer().write(path, l)
+
+    def _get_container_log_state(self, d):
+        """
+        Resource related state of a container. Only uses the values
+        known by the emulator, no Docker API calls.
+        :param d: container
+        :return: dict
+        """
+        s = dict()
+        s["name"] = d.name
+        s["image"] = getattr(d, "dimage", None)
+        s["flavor_name"] = d.flavor_name
+        s["cpu_quota"] = d.cpu_quota
+        s["cpu_period"] = d.cpu_period
+        s["cpu_shares"] = getattr(d, "cpu_shares", None)
+        s["cpuset"] = getattr(d, "cpuset", None)
+        s["mem_limit"] = d.mem_limit
+        s["memswap_limit"] = getattr(d, "memswap_limit", None)
+        dc = getattr(d, "datacenter", None)
+        s["datacenter"] = None if dc is None else dc.label
+        return s
 
 
 class UpbOverprovisioningCloudDcRM(UpbSimpleCloudDcRM):
@@ -314,7 +407,7 @@ class UpbOverprovisioningCloudDcRM(UpbSimpleCloudDcRM):
         # calculate over provisioning scale factor
         self.cpu_op_factor = float(self.dc_max_cu) / (max(self.dc_max_cu, self.dc_alloc_cu))
         # calculate
-        return float(e_cpu) / sum([rm.dc_max_cu for rm in list(self.registrar.resource_models)]) * self.cpu_op_factor
+        return float(e_cpu) / self.registrar.total_max_cu * self.cpu_op_factor
 
 
 class UpbDummyRM(UpbSimpleCloudDcRM):
@@ -325,7 +418,7 @@ class UpbDummyRM(UpbSimpleCloudDcRM):
         super(UpbDummyRM, self).__init__(*args, **kvargs)
         self.raise_no_cpu_resources_left = False
 
-    def _apply_limits(self):
+    def _apply_limits(self, new=None):
         # do nothing here
         pass
 
@@ -105,6 +105,13 @@ class ApiBaseHeat(unittest.TestCase):
         for i in self.api:
             i.stop()
 
+    def waitForStacks(self, timeout=120):
+        """
+        Wait until the stack operations that the Heat APIs run in the background are done.
+        """
+        for i in self.api:
+            i.compute.wait_for_stack_operations(timeout)
+
     def startNet(self):
         self.net.start()
 
@@ -133,6 +140,7 @@ class ApiBaseHeat(unittest.TestCase):
 
     def tearDown(self):
         print('->>>>>>> tear everything down ->>>>>>>>>>>>>>>')
+        self.waitForStacks() # stack operations still running in the background need the network
         self.stopApi() # stop all flask threads
         self.stopNet() # stop some mininet and containernet stuff
         cleanup()
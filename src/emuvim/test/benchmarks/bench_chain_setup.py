@@ -0,0 +1,117 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Benchmark: chain setup latency of DCNetwork.setChain.
+
+Compares the hop-by-hop flow installation with the batched flow
+installation (one transaction per switch).
+
+Needs a working Containernet installation and root privileges:
+
+    sudo python bench_chain_setup.py --switches 10 --rounds 20
+    sudo python bench_chain_setup.py --switches 10 --ryu
+"""
+import argparse
+import json
+import logging
+import time
+from mininet.node import Controller, RemoteController
+from mininet.clean import cleanup
+from emuvim.dcemulator.net import DCNetwork
+
+logging.basicConfig(level=logging.WARNING)
+
+
+def create_topology(n_switches, controller):
+    """
+    dc1 -- s1 -- s2 -- ... -- sN -- dc2
+    with one VNF in each data center.
+    """
+    net = DCNetwork(controller=controller, monitor=False, enable_learning=False)
+    dc1 = net.addDatacenter("dc1")
+    dc2 = net.addDatacenter("dc2")
+    switches = [net.addSwitch("s%d" % i) for i in range(1, n_switches + 1)]
+    net.addLink(dc1, switches[0])
+    for i in range(0, len(switches) - 1):
+        net.addLink(switches[i], switches[i + 1])
+    net.addLink(switches[-1], dc2)
+    net.start()
+    dc1.startCompute("vnf1", network=[{"id": "intf1", "ip": "10.0.0.1/24"}])
+    dc2.startCompute("vnf2", network=[{"id": "intf1", "ip": "10.0.0.2/24"}])
+    return net
+
+
+def measure(net, rounds, batching):
+    """
+    Setup and remove a bidirectional chain between vnf1 and vnf2.
+    :return: list of setup latencies in seconds
+    """
+    net.enable_flow_batching = batching
+    latencies = list()
+    for r in range(0, rounds):
+        t_start = time.time()
+        net.setChain("vnf1", "vnf2", vnf_src_interface="intf1", vnf_dst_interface="intf1",
+                     bidirectional=True, cmd="add-flow", cookie=r + 1)
+        latencies.append(time.time() - t_start)
+        net.setChain("vnf1", "vnf2", vnf_src_interface="intf1", vnf_dst_interface="intf1",
+                     bidirectional=True, cmd="del-flows", cookie=r + 1)
+    return latencies
+
+
+def summarize(latencies):
+    s = sorted(latencies)
+    return {"rounds": len(s),
+            "mean_ms": 1000.0 * sum(s) / len(s),
+            "median_ms": 1000.0 * s[len(s) / 2],
+            "max_ms": 1000.0 * s[-1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="son-emu chain setup benchmark")
+    parser.add_argument("--switches", type=int, default=10, help="number of switches between the two DCs")
+    parser.add_argument("--rounds", type=int, default=10, help="number of chain setups per mode")
+    parser.add_argument("--ryu", action="store_true", default=False,
+                        help="use the Ryu REST API instead of ovs-ofctl")
+    args = parser.parse_args()
+
+    cleanup()
+    controller = RemoteController if args.ryu else Controller
+    net = create_topology(args.switches, controller)
+    try:
+        result = {"switches": args.switches,
+                  "controller": "ryu" if args.ryu else "dpctl",
+                  "per_hop": summarize(measure(net, args.rounds, False)),
+                  "batched": summarize(measure(net, args.rounds, True))}
+    finally:
+        net.stop()
+        cleanup()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Benchmark: scaling of the emulator's control plane.
+
+Builds N data centers connected by a ring of M backbone switches and
+starts K VNFs in each data center. Mininet, Open vSwitch and Docker are
+replaced by the in-memory stand-ins of fakemininet, so only the emulator's
+own code is measured:
+
+    * addLink (graph, interface index and path index updates)
+    * Datacenter.startCompute / stopCompute incl. resource model allocation
+    * setChain (path calculation and flow generation), per hop and batched
+    * OpenstackManage.add_loadbalancer
+    * listing the status of all containers (compute list API)
+
+No root privileges are needed:
+
+    python bench_control_plane.py --dcs 4 --switches 8 --vnfs 20 --output result.json
+
+The result is written as JSON, one entry per measured operation.
+"""
+import argparse
+import json
+import logging
+import platform
+import time
+
+from emuvim.test.benchmarks import fakemininet
+fakemininet.install()
+
+from mininet.node import Controller
+from emuvim.dcemulator.net import DCNetwork
+from emuvim.dcemulator.node import list_compute_status
+from emuvim.dcemulator.resourcemodel.upb.simple import UpbSimpleCloudDcRM
+
+
+class BenchNetwork(DCNetwork):
+    """
+    DCNetwork that does not touch a Ryu controller process.
+    """
+
+    def killRyu(self):
+        pass
+
+    def startRyu(self, learning_switch=True):
+        pass
+
+
+class Recorder(object):
+    """
+    Collects the latencies and switch commands of one operation.
+    """
+
+    def __init__(self):
+        self.results = dict()
+
+    def measure(self, op, f, *args, **kwargs):
+        counter = fakemininet.COUNTER
+        # operations can be nested, so do not reset the counter
+        dpctl_calls, flows = counter.calls["dpctl"], counter.flows
+        docker_calls = counter.calls["inspect"] + counter.calls["containers"]
+        t_start = time.time()
+        ret = f(*args, **kwargs)
+        duration = time.time() - t_start
+        r = self.results.setdefault(op, {"latencies": list(), "dpctl_calls": 0, "flows": 0, "docker_calls": 0})
+        r["latencies"].append(duration)
+        r["dpctl_calls"] += counter.calls["dpctl"] - dpctl_calls
+        r["flows"] += counter.flows - flows
+        r["docker_calls"] += counter.calls["inspect"] + counter.calls["containers"] - docker_calls
+        return ret
+
+    def summary(self):
+        out = dict()
+        for op, r in self.results.iteritems():
+            s = sorted(r["latencies"])
+            out[op] = {"count": len(s),
+                       "total_s": sum(s),
+                       "mean_ms": 1000.0 * sum(s) / len(s),
+                       "median_ms": 1000.0 * s[len(s) / 2],
+                       "p95_ms": 1000.0 * s[min(len(s) - 1, int(len(s) * 0.95))],
+                       "max_ms": 1000.0 * s[-1],
+                       "dpctl_calls": r["dpctl_calls"],
+                       "docker_calls": r["docker_calls"],
+                       "flows": r["flows"]}
+        return out
+
+
+def vnf_name(dc_idx, vnf_idx):
+    return "vnf%d_%d" % (dc_idx, vnf_idx)
+
+
+def build_topology(rec, n_dcs, n_switches, n_vnfs):
+    """
+    dc_i is connected to backbone switch s_(i mod M), the backbone
+    switches form a ring.
+    """
+    net = BenchNetwork(controller=Controller, monitor=False, enable_learning=False,
+                       dc_emulation_max_cpu=1.0, dc_emulation_max_mem=512 * n_dcs)
+    dcs = list()
+    for i in range(0, n_dcs):
+        dc = net.addDatacenter("dc%d" % i)
+        dc.assignResourceModel(UpbSimpleCloudDcRM(max_cu=n_vnfs, max_mu=64 * n_vnfs))
+        dcs.append(dc)
+    switches = [net.addSwitch("s%d" % i) for i in range(1, n_switches + 1)]
+    for i in range(0, n_switches):
+        if n_switches > 1 and (n_switches > 2 or i == 0):
+            rec.measure("add_link", net.addLink, switches[i], switches[(i + 1) % n_switches])
+    for i, dc in enumerate(dcs):
+        rec.measure("add_link", net.addLink, dc, switches[i % n_switches])
+    net.start()
+
+    # measure the resource model allocation as part of the container start
+    for dc in dcs:
+        rm = dc._resource_model
+        allocate = rm.allocate
+        rm.allocate = lambda d, allocate=allocate: rec.measure("rm_allocate", allocate, d)
+
+    for v in range(0, n_vnfs):
+        for i, dc in enumerate(dcs):
+            rec.measure("start_compute", dc.startCompute, vnf_name(i, v), flavor_name="tiny",
+                        network=[{"id": "intf1", "ip": "10.%d.%d.%d/24" % (i, v / 250, v % 250 + 1)}])
+    return net, dcs
+
+
+def bench_chains(rec, net, n_dcs, n_vnfs, batching):
+    """
+    Chain vnf_i_j with vnf_(i+1)_j in both directions.
+    """
+    mode = "batched" if batching else "per_hop"
+    net.enable_flow_batching = batching
+    for cmd in ["add-flow", "del-flows"]:
+        for v in range(0, n_vnfs):
+            for i in range(0, n_dcs):
+                rec.measure("set_chain_%s_%s" % (mode, cmd.replace("-", "_")), net.setChain,
+                            vnf_name(i, v), vnf_name((i + 1) % n_dcs, v),
+                            vnf_src_interface="intf1", vnf_dst_interface="intf1",
+                            bidirectional=True, cmd=cmd, cookie=v * n_dcs + i + 1)
+
+
+def bench_loadbalancers(rec, net, n_dcs, n_vnfs, n_targets):
+    """
+    One load balancer per VNF of dc0 that balances over the VNFs
+    with the same index in the other data centers.
+    """
+    from emuvim.api.heat.manage import OpenstackManage
+    manage = OpenstackManage()
+    manage.net = net
+    for v in range(0, n_vnfs):
+        targets = dict()
+        for i in range(1, min(n_dcs, n_targets + 1)):
+            targets[vnf_name(i, v)] = "intf1"
+        rec.measure("add_loadbalancer", manage.add_loadbalancer, vnf_name(0, v), "intf1",
+                    {"dst_vnf_interfaces": targets})
+
+
+def bench_compute_list(rec, dcs, rounds):
+    """
+    List the status of all containers like the compute list APIs do.
+    """
+    containers = list()
+    for dc in dcs:
+        containers += dc.listCompute()
+    for r in range(0, rounds):
+        rec.measure("compute_list", list_compute_status, containers)
+
+
+def teardown(rec, dcs, n_vnfs):
+    for v in range(0, n_vnfs):
+        for i, dc in enumerate(dcs):
+            rec.measure("stop_compute", dc.stopCompute, vnf_name(i, v))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="son-emu control plane scale benchmark")
+    parser.add_argument("--dcs", type=int, default=4, help="number of data centers (N)")
+    parser.add_argument("--switches", type=int, default=4, help="number of backbone switches (M)")
+    parser.add_argument("--vnfs", type=int, default=10, help="number of VNFs per data center (K)")
+    parser.add_argument("--lb-targets", type=int, default=3,
+                        help="number of destination VNFs per load balancer")
+    parser.add_argument("--no-lb", action="store_true", default=False,
+                        help="skip the load balancer benchmark (it starts the Openstack chain API)")
+    parser.add_argument("--list-rounds", type=int, default=10,
+                        help="number of status listings of all containers")
+    parser.add_argument("--log", action="store_true", default=False,
+                        help="keep the emulator's debug logging enabled")
+    parser.add_argument("--output", default=None, help="write the JSON result to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if not args.log:
+        logging.disable(logging.INFO)
+
+    rec = Recorder()
+    t_start = time.time()
+    net, dcs = build_topology(rec, args.dcs, args.switches, args.vnfs)
+    if args.dcs > 1:
+        bench_chains(rec, net, args.dcs, args.vnfs, False)
+        bench_chains(rec, net, args.dcs, args.vnfs, True)
+        if not args.no_lb:
+            bench_loadbalancers(rec, net, args.dcs, args.vnfs, args.lb_targets)
+    bench_compute_list(rec, dcs, args.list_rounds)
+    teardown(rec, dcs, args.vnfs)
+    net.stop()
+
+    result = {"parameters": {"dcs": args.dcs,
+                             "switches": args.switches,
+                             "vnfs_per_dc": args.vnfs,
+                             "lb_targets": args.lb_targets,
+                             "logging": args.log},
+              "python": platform.python_version(),
+              "timestamp": t_start,
+              "duration_s": time.time() - t_start,
+              "path_index": {"hits": net.path_index.hits, "misses": net.path_index.misses},
+              "results": rec.summary()}
+    out = json.dumps(result, indent=2, sort_keys=True)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            f.write(out)
+    print(out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,478 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+In-memory stand-ins for the Mininet/Containernet classes used by the
+emulator. They only do the bookkeeping (nodes, ports, interfaces, links)
+and count the switch commands instead of executing them. This allows to
+benchmark the control plane code of son-emu (graph updates, path
+calculation, flow generation, resource models) without root privileges,
+Open vSwitch or Docker.
+
+install() has to be called before any emuvim.dcemulator module is imported:
+
+    from emuvim.test.benchmarks import fakemininet
+    fakemininet.install()
+    from emuvim.dcemulator.net import DCNetwork
+"""
+import os
+import sys
+import types
+from collections import defaultdict
+
+
+class CommandCounter(object):
+    """
+    Counts the commands that would have been executed on the switches.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # number of ovs-ofctl / ovs-vsctl calls
+        self.calls = defaultdict(int)
+        # number of flow entries that would have been installed
+        self.flows = 0
+
+    def snapshot(self):
+        return {"calls": dict(self.calls), "flows": self.flows}
+
+
+COUNTER = CommandCounter()
+
+
+def _ip_to_int(ip):
+    a, b, c, d = [int(o) for o in ip.split(".")]
+    return (a << 24) | (b << 16) | (c << 8) | d
+
+
+def _int_to_ip(n):
+    return "%d.%d.%d.%d" % ((n >> 24) & 0xff, (n >> 16) & 0xff, (n >> 8) & 0xff, n & 0xff)
+
+
+class Intf(object):
+
+    def __init__(self, name, node=None, port=None, link=None, mac=None, ip=None, **params):
+        self.name = name
+        self.node = node
+        self.link = link
+        self.mac = mac or "02:00:00:%02x:%02x:%02x" % ((id(self) >> 16) & 0xff, (id(self) >> 8) & 0xff,
+                                                       id(self) & 0xff)
+        self.ip = None
+        self.prefixLen = None
+        if node is not None:
+            node.addIntf(self, port=port)
+        if ip is not None:
+            self.setIP(ip)
+
+    def setIP(self, ipstr, prefixLen=None):
+        if "/" in ipstr:
+            self.ip, prefixLen = ipstr.split("/")
+        else:
+            self.ip = ipstr
+        self.prefixLen = int(prefixLen) if prefixLen is not None else 8
+
+    def IP(self):
+        return self.ip
+
+    def MAC(self):
+        return self.mac
+
+    def isUp(self, *args):
+        return True
+
+    def status(self):
+        return "ok"
+
+    def delete(self):
+        if self.node is not None:
+            self.node.delIntf(self)
+
+    def __repr__(self):
+        return "<%s %s>" % (self.__class__.__name__, self.name)
+
+    def __str__(self):
+        return self.name
+
+
+class Link(object):
+
+    def __init__(self, node1, node2, port1=None, port2=None, intfName1=None, intfName2=None,
+                 addr1=None, addr2=None, intf=Intf, cls1=None, cls2=None, params1=None, params2=None,
+                 fast=True, **params):
+        params1 = dict(params1 or {})
+        params2 = dict(params2 or {})
+        if port1 is None:
+            port1 = node1.newPort()
+        if port2 is None:
+            port2 = node2.newPort()
+        if intfName1 is None:
+            intfName1 = "%s-eth%d" % (node1.name, port1)
+        if intfName2 is None:
+            intfName2 = "%s-eth%d" % (node2.name, port2)
+        self.intf1 = intf(intfName1, node=node1, port=port1, link=self, mac=addr1, ip=params1.get("ip"))
+        self.intf2 = intf(intfName2, node=node2, port=port2, link=self, mac=addr2, ip=params2.get("ip"))
+
+    def delete(self):
+        self.intf1.delete()
+        self.intf2.delete()
+
+    def __str__(self):
+        return "%s<->%s" % (self.intf1, self.intf2)
+
+
+class TCLink(Link):
+    pass
+
+
+class Node(object):
+
+    portBase = 0
+
+    def __init__(self, name, inNamespace=True, **params):
+        self.name = name
+        self.inNamespace = inNamespace
+        self.params = params
+        # port nr -> Intf
+        self.intfs = dict()
+        # Intf -> port nr
+        self.ports = dict()
+        self.nameToIntf = dict()
+
+    def newPort(self):
+        if len(self.ports) > 0:
+            return max(self.ports.values()) + 1
+        return self.portBase
+
+    def addIntf(self, intf, port=None):
+        if port is None:
+            port = self.newPort()
+        self.intfs[port] = intf
+        self.ports[intf] = port
+        self.nameToIntf[intf.name] = intf
+
+    def delIntf(self, intf):
+        port = self.ports.pop(intf, None)
+        self.intfs.pop(port, None)
+        self.nameToIntf.pop(intf.name, None)
+
+    def intfList(self):
+        return [self.intfs[p] for p in sorted(self.intfs.keys())]
+
+    def intf(self, intf=None):
+        if intf is None:
+            return self.intfList()[0] if len(self.intfs) > 0 else None
+        if isinstance(intf, basestring):
+            return self.nameToIntf.get(intf)
+        return intf
+
+    def setIP(self, ip, prefixLen=8, intf=None, **kwargs):
+        intf = self.intf(intf)
+        if intf is not None:
+            intf.setIP(ip, prefixLen)
+
+    def IP(self, intf=None):
+        intf = self.intf(intf)
+        return intf.IP() if intf is not None else None
+
+    def MAC(self, intf=None):
+        intf = self.intf(intf)
+        return intf.MAC() if intf is not None else None
+
+    def setHostRoute(self, ip, intf):
+        return self.cmd("route add -host", ip, "dev", intf)
+
+    def cmd(self, *args, **kwargs):
+        COUNTER.calls["cmd"] += 1
+        return ""
+
+    def terminate(self):
+        for intf in list(self.ports.keys()):
+            intf.delete()
+
+    def stop(self, deleteIntfs=False):
+        pass
+
+    def __repr__(self):
+        return "<%s %s>" % (self.__class__.__name__, self.name)
+
+    def __str__(self):
+        return self.name
+
+
+class Host(Node):
+    pass
+
+
+class Docker(Host):
+
+    def __init__(self, name, dimage=None, dcmd=None, **kwargs):
+        Host.__init__(self, name, **kwargs)
+        self.dimage = dimage
+        self.dcmd = dcmd
+        self.cpu_quota = kwargs.get("cpu_quota", -1)
+        self.cpu_period = kwargs.get("cpu_period", None)
+        self.cpu_shares = kwargs.get("cpu_shares", None)
+        self.cpuset = kwargs.get("cpuset_cpus", None)
+        self.mem_limit = kwargs.get("mem_limit", None)
+        self.memswap_limit = kwargs.get("memswap_limit", None)
+        self.environment = kwargs.get("environment", {})
+        self.dc = "%032x" % abs(hash(name))
+        self.did = self.dc
+        self.dcinfo = {"Id": self.dc, "NetworkSettings": {"IPAddress": "172.17.0.2"}}
+        self.dcli = DOCKER_CLIENT
+        DOCKER_CLIENT.running[self.dc] = self
+
+    def terminate(self):
+        DOCKER_CLIENT.running.pop(self.dc, None)
+        Host.terminate(self)
+
+    def updateCpuLimit(self, cpu_quota=-1, cpu_period=-1, cpu_shares=-1, cores=None):
+        COUNTER.calls["update_cpu"] += 1
+        if cpu_quota >= 0:
+            self.cpu_quota = cpu_quota
+        if cpu_period >= 0:
+            self.cpu_period = cpu_period
+        if cpu_shares >= 0:
+            self.cpu_shares = cpu_shares
+        if cores is not None:
+            self.cpuset = cores
+
+    def updateMemoryLimit(self, mem_limit=-1, memswap_limit=-1):
+        COUNTER.calls["update_mem"] += 1
+        if mem_limit >= 0:
+            self.mem_limit = mem_limit
+        if memswap_limit >= 0:
+            self.memswap_limit = memswap_limit
+
+
+class FakeDockerClient(object):
+    """
+    Answers the few docker API calls the emulator does for containers.
+    """
+
+    def __init__(self):
+        # container id -> Docker
+        self.running = dict()
+
+    def inspect_container(self, dc):
+        COUNTER.calls["inspect"] += 1
+        return {"Id": dc,
+                "State": {"Status": "running", "Running": True, "Pid": 0}}
+
+    def containers(self, all=False, **kwargs):
+        COUNTER.calls["containers"] += 1
+        return [{"Id": dc, "State": "running"} for dc in self.running]
+
+
+DOCKER_CLIENT = FakeDockerClient()
+
+
+class OVSSwitch(Node):
+
+    portBase = 1
+    dpidCounter = 1
+
+    def __init__(self, name, dpid=None, failMode="secure", protocols=None, **params):
+        Node.__init__(self, name, **params)
+        if dpid is None:
+            dpid = "%x" % OVSSwitch.dpidCounter
+            OVSSwitch.dpidCounter += 1
+        self.dpid = dpid.zfill(16)
+        self.failMode = failMode
+        self.protocols = protocols
+
+    def dpctl(self, *args):
+        COUNTER.calls["dpctl"] += 1
+        if args and args[0] == "add-flows" and os.path.exists(args[-1]):
+            with open(args[-1]) as f:
+                COUNTER.flows += len([l for l in f if l.strip()])
+        elif args and args[0].startswith("add-flow"):
+            COUNTER.flows += 1
+        return ""
+
+    def vsctl(self, *args):
+        COUNTER.calls["vsctl"] += 1
+        return ""
+
+    def detach(self, intf):
+        self.vsctl("del-port", self.name, intf.name)
+
+    def start(self, controllers):
+        pass
+
+
+class OVSKernelSwitch(OVSSwitch):
+    pass
+
+
+class Controller(Node):
+
+    def __init__(self, name, **params):
+        Node.__init__(self, name, inNamespace=False, **params)
+
+    def start(self):
+        pass
+
+
+class DefaultController(Controller):
+    pass
+
+
+class RemoteController(Controller):
+    pass
+
+
+class Containernet(object):
+
+    def __init__(self, switch=OVSKernelSwitch, controller=DefaultController, link=Link,
+                 ipBase="10.0.0.0/8", **kwargs):
+        self.switch = switch
+        self.controller = controller
+        self.link = link
+        self.ipBase = ipBase
+        base, prefix = ipBase.split("/")
+        self.ipBaseNum = _ip_to_int(base)
+        self.prefixLen = int(prefix)
+        self.nextIP = 1
+        self.hosts = list()
+        self.switches = list()
+        self.controllers = list()
+        self.links = list()
+        self.nameToNode = dict()
+
+    def getNextIp(self):
+        ip = "%s/%d" % (_int_to_ip(self.ipBaseNum + self.nextIP), self.prefixLen)
+        self.nextIP += 1
+        return ip
+
+    def addHost(self, name, cls=Host, **params):
+        if "ip" not in params:
+            params["ip"] = self.getNextIp()
+        h = cls(name, **params)
+        self.hosts.append(h)
+        self.nameToNode[name] = h
+        return h
+
+    def addDocker(self, name, cls=Docker, **params):
+        return self.addHost(name, cls=cls, **params)
+
+    def removeDocker(self, name, **params):
+        node = self.nameToNode.pop(name, None)
+        if node is None:
+            return
+        for l in [l for l in self.links if node in (l.intf1.node, l.intf2.node)]:
+            self.removeLink(link=l)
+        self.hosts.remove(node)
+        node.terminate()
+
+    def addSwitch(self, name, cls=None, **params):
+        sw = (cls or self.switch)(name, **params)
+        self.switches.append(sw)
+        self.nameToNode[name] = sw
+        return sw
+
+    def addController(self, name="c0", controller=None, **params):
+        c = (controller or self.controller)(name, **params)
+        self.controllers.append(c)
+        self.nameToNode[name] = c
+        return c
+
+    def addLink(self, node1, node2, port1=None, port2=None, cls=None, **params):
+        node1 = node1 if not isinstance(node1, basestring) else self[node1]
+        node2 = node2 if not isinstance(node2, basestring) else self[node2]
+        link = (cls or self.link)(node1, node2, port1=port1, port2=port2, **params)
+        self.links.append(link)
+        return link
+
+    def removeLink(self, link=None, node1=None, node2=None):
+        if link is None:
+            for l in self.links:
+                if (l.intf1.node, l.intf2.node) in [(node1, node2), (node2, node1)]:
+                    link = l
+                    break
+        if link is not None and link in self.links:
+            link.delete()
+            self.links.remove(link)
+
+    def getNodeByName(self, *args):
+        if len(args) == 1:
+            return self.nameToNode[args[0]]
+        return [self.nameToNode[n] for n in args]
+
+    def __getitem__(self, key):
+        return self.nameToNode[key]
+
+    def __contains__(self, item):
+        return item in self.nameToNode
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class CLI(object):
+
+    def __init__(self, net, **kwargs):
+        pass
+
+
+def cleanup():
+    pass
+
+
+def setLogLevel(level):
+    pass
+
+
+def _module(name, **members):
+    m = types.ModuleType(name)
+    m.__dict__.update(members)
+    return m
+
+
+def install():
+    """
+    Register the fake mininet modules. Has to be called before the
+    emulator modules are imported.
+    """
+    if "emuvim.dcemulator.net" in sys.modules and "mininet" not in sys.modules:
+        raise RuntimeError("fakemininet.install() has to be called before emuvim.dcemulator is imported")
+    node = _module("mininet.node", Node=Node, Host=Host, Docker=Docker, OVSSwitch=OVSSwitch,
+                   OVSKernelSwitch=OVSKernelSwitch, Controller=Controller,
+                   DefaultController=DefaultController, RemoteController=RemoteController)
+    link = _module("mininet.link", Intf=Intf, Link=Link, TCLink=TCLink)
+    net = _module("mininet.net", Containernet=Containernet, Mininet=Containernet)
+    cli = _module("mininet.cli", CLI=CLI)
+    clean = _module("mininet.clean", cleanup=cleanup)
+    log = _module("mininet.log", setLogLevel=setLogLevel)
+    root = _module("mininet", node=node, link=link, net=net, cli=cli, clean=clean, log=log)
+    sys.modules.update({"mininet": root, "mininet.node": node, "mininet.link": link, "mininet.net": net,
+                        "mininet.cli": cli, "mininet.clean": clean, "mininet.log": log})
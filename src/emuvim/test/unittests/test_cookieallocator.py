@@ -0,0 +1,80 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+Test the cookie allocator of the DCNetwork.
+"""
+
+import unittest
+from emuvim.dcemulator.cookieallocator import CookieAllocator, COOKIE_NAMESPACE_CHAIN, COOKIE_NAMESPACE_LB
+
+
+class testCookieAllocator(unittest.TestCase):
+
+    def testAllocateAndReuse(self):
+        ca = CookieAllocator()
+        self.assertEqual([ca.allocate() for i in range(3)], [1, 2, 3])
+        self.assertTrue(ca.release(2))
+        self.assertFalse(ca.release(2))
+        # released cookies are reused before new ones are handed out
+        self.assertEqual(ca.allocate(), 2)
+        self.assertEqual(ca.allocate(), 4)
+        self.assertEqual(len(ca), 4)
+
+    def testReserve(self):
+        ca = CookieAllocator()
+        self.assertTrue(ca.reserve(2))
+        self.assertFalse(ca.reserve(2))
+        self.assertFalse(ca.reserve(0))
+        self.assertEqual([ca.allocate() for i in range(2)], [1, 3])
+        ca.release(1)
+        self.assertTrue(ca.reserve(1))
+        # the reserved cookie is skipped in the free list
+        self.assertEqual(ca.allocate(), 4)
+
+    def testNamespaces(self):
+        ca = CookieAllocator()
+        chains = [ca.allocate(COOKIE_NAMESPACE_CHAIN) for i in range(3)]
+        lb = ca.allocate(COOKIE_NAMESPACE_LB)
+        self.assertEqual(ca.namespace(lb), COOKIE_NAMESPACE_LB)
+        self.assertEqual(sorted(ca.cookies(COOKIE_NAMESPACE_CHAIN)), chains)
+        self.assertEqual(sorted(ca.release_namespace(COOKIE_NAMESPACE_CHAIN)), chains)
+        self.assertEqual(len(ca), 1)
+        self.assertTrue(lb in ca)
+
+    def testExhausted(self):
+        ca = CookieAllocator(first=1, last=2)
+        ca.allocate()
+        ca.allocate()
+        self.assertRaises(Exception, ca.allocate)
+        ca.release(1)
+        self.assertEqual(ca.allocate(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import Queue
+import unittest
+from emuvim.dcemulator.dockerstate import DockerState, normalize_image_name
+from emuvim.api.heat.image_catalog import ImageCatalog
+
+
+class FakeEventClient(object):
+    """
+    Stand-in for docker.APIClient with a controllable event stream.
+    """
+
+    def __init__(self):
+        self.listed = [{"Id": "c1", "Names": ["/mn.vnf1"], "State": "running", "Image": "ubuntu:trusty"}]
+        self.image_list = [{"Id": "sha256:1", "RepoTags": ["ubuntu:trusty"]}]
+        self.stream = Queue.Queue()
+        self.container_calls = 0
+        self.image_calls = 0
+
+    def containers(self, all=False):
+        self.container_calls += 1
+        return list(self.listed)
+
+    def images(self):
+        self.image_calls += 1
+        return list(self.image_list)
+
+    def events(self, decode=False, since=None):
+        return iter(self.stream.get, None)
+
+
+def container_event(action, cid, name):
+    return {"Type": "container", "Action": action, "status": action, "id": cid,
+            "Actor": {"ID": cid, "Attributes": {"name": name, "image": "ubuntu:trusty"}}}
+
+
+class testDockerState(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeEventClient()
+        self.state = DockerState(client=self.client)
+        self.state.start()
+
+    def tearDown(self):
+        # end the fake event stream
+        self.client.stream.put(None)
+
+    def testInitialSync(self):
+        self.assertTrue(self.state.synced)
+        self.assertEqual(self.state.container_id("mn.vnf1"), "c1")
+        self.assertTrue(self.state.is_running("mn.vnf1"))
+        self.assertTrue(self.state.is_running("c1"))
+        self.assertIsNone(self.state.container("mn.unknown"))
+
+    def testContainerEvents(self):
+        self.client.stream.put(container_event("create", "c2", "mn.vnf2"))
+        self.client.stream.put(container_event("start", "c2", "mn.vnf2"))
+        self.assertTrue(self.state.wait_for_container("mn.vnf2", timeout=2))
+        self.assertEqual(self.state.container_id("mn.vnf2"), "c2")
+        self.client.stream.put(container_event("kill", "c1", "mn.vnf1"))
+        self.client.stream.put(container_event("die", "c1", "mn.vnf1"))
+        self.assertTrue(self.state.wait_for_container("mn.vnf1", status="exited", timeout=2))
+        self.client.stream.put(container_event("destroy", "c1", "mn.vnf1"))
+        self.client.stream.put(container_event("rename", "c2", "mn.vnf3"))
+        self.assertTrue(self.state.wait_for_container("mn.vnf3", timeout=2))
+        self.assertIsNone(self.state.container("mn.vnf1"))
+        self.assertIsNone(self.state.container_id("mn.vnf2"))
+        # no polling of the daemon after the initial sync
+        self.assertEqual(self.client.container_calls, 1)
+
+    def testWaitTimeout(self):
+        self.assertFalse(self.state.wait_for_container("mn.vnf2", timeout=0.1))
+
+    def testImages(self):
+        self.assertEqual(self.state.image_id("ubuntu:trusty"), "sha256:1")
+        self.assertIsNone(self.state.image_id("alpine"))
+        self.assertEqual(self.client.image_calls, 1)
+        # cached until an image event arrives
+        self.state.image_id("ubuntu:trusty")
+        self.assertEqual(self.client.image_calls, 1)
+        self.client.image_list.append({"Id": "sha256:2", "RepoTags": ["alpine:latest"]})
+        self.state.handle_event({"Type": "image", "Action": "pull", "Actor": {"ID": "alpine:latest"}})
+        self.assertEqual(self.state.image_id("alpine"), "sha256:2")
+        self.assertEqual(self.client.image_calls, 2)
+
+    def testImageCatalog(self):
+        catalog = ImageCatalog(state=self.state)
+        images = catalog.images
+        self.assertEqual(images.keys(), ["ubuntu:trusty"])
+        image_id = images["ubuntu:trusty"].id
+        # served from the catalog until an image event arrives
+        catalog.images
+        self.assertEqual(self.client.image_calls, 1)
+        self.client.image_list.append({"Id": "sha256:2", "RepoTags": ["alpine:latest"]})
+        self.state.handle_event({"Type": "image", "Action": "pull", "Actor": {"ID": "alpine:latest"}})
+        images = catalog.images
+        self.assertEqual(sorted(images.keys()), ["alpine", "ubuntu:trusty"])
+        # known images keep their ID
+        self.assertEqual(images["ubuntu:trusty"].id, image_id)
+        self.assertEqual(self.client.image_calls, 2)
+
+    def testNormalizeImageName(self):
+        self.assertEqual(normalize_image_name("ubuntu"), "ubuntu:latest")
+        self.assertEqual(normalize_image_name("ubuntu:trusty"), "ubuntu:trusty")
+        self.assertEqual(normalize_image_name("localhost:5000/ubuntu"), "localhost:5000/ubuntu:latest")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -35,7 +35,7 @@ Does not test API endpoints. This is done in separated test suites.
 
 import time
 import unittest
-from emuvim.dcemulator.node import EmulatorCompute
+from emuvim.dcemulator.node import EmulatorCompute, list_compute_status
 from emuvim.test.base import SimpleTestTopology
 from mininet.node import RemoteController
 
@@ -150,6 +150,11 @@ class testEmulatorNetworking( SimpleTestTopology ):
         self.assertTrue(s1["state"]["Running"])
         self.assertTrue(s1["network"][0]['intf_name'] == 'intf1')
         self.assertTrue(s1["network"][0]['ip'] == '10.0.10.1')
+        # address changes are visible although the Docker state is cached
+        vnf1.intf('intf1').setIP('10.0.10.11/24')
+        s1 = self.dc[0].containers.get("vnf1").getStatus()
+        self.assertTrue(s1["network"][0]['ip'] == '10.0.10.11')
+        vnf1.intf('intf1').setIP('10.0.10.1/24')
 
         s2 = self.dc[1].containers.get("vnf2").getStatus()
         self.assertTrue(s2["name"] == "vnf2")
@@ -224,6 +229,44 @@ class testEmulatorNetworking( SimpleTestTopology ):
         # stop Mininet network
         self.stopNet()
 
+    def testSDNChainingFlowBatch(self):
+        """
+        Setup two chains inside a single flow batch.
+        Uses Ryu SDN controller.
+        The flows must only be installed once the batch is committed.
+        """
+        # create network
+        self.createNet(
+            nswitches=3, ndatacenter=2, nhosts=0, ndockers=0,
+            autolinkswitches=True,
+            controller=RemoteController,
+            enable_learning=False)
+        # setup links
+        self.net.addLink(self.dc[0], self.s[0])
+        self.net.addLink(self.s[2], self.dc[1])
+        # start Mininet network
+        self.startNet()
+
+        # add compute resources
+        vnf1 = self.dc[0].startCompute("vnf1", network=[{'id': 'intf1', 'ip': '10.0.10.1/24'}])
+        vnf2 = self.dc[1].startCompute("vnf2", network=[{'id': 'intf2', 'ip': '10.0.10.2/24'}])
+        vnf11 = self.dc[0].startCompute("vnf11", network=[{'id': 'intf1', 'ip': '10.0.20.1/24'}])
+        vnf22 = self.dc[1].startCompute("vnf22", network=[{'id': 'intf2', 'ip': '10.0.20.2/24'}])
+
+        # setup links in one batch
+        self.net.beginFlowBatch()
+        self.net.setChain('vnf1', 'vnf2', 'intf1', 'intf2', bidirectional=True, cmd='add-flow', cookie=1)
+        self.net.setChain('vnf11', 'vnf22', 'intf1', 'intf2', bidirectional=True, cmd='add-flow', cookie=2)
+        # nothing is installed yet
+        self.assertTrue(self.net.ping([vnf1, vnf2]) > 0.0)
+        # 2 chains * 2 directions * 5 switches
+        self.assertEqual(self.net.commitFlowBatch(), 20)
+        # check connectivity by using ping
+        self.assertTrue(self.net.ping([vnf1, vnf2]) <= 0.0)
+        self.assertTrue(self.net.ping([vnf11, vnf22]) <= 0.0)
+        # stop Mininet network
+        self.stopNet()
+
 #@unittest.skip("disabled compute tests for development")
 class testEmulatorCompute( SimpleTestTopology ):
     """
@@ -290,6 +333,39 @@ class testEmulatorCompute( SimpleTestTopology ):
         # stop Mininet network
         self.stopNet()
 
+    def testInterfaceIndexSingleComputeSingleDC(self):
+        """
+        Check that the interface to switch port index follows
+        the start and stop of compute instances.
+        """
+        # create network
+        self.createNet(nswitches=0, ndatacenter=1, nhosts=0, ndockers=0)
+        # start Mininet network
+        self.startNet()
+        # add compute resources
+        vnf1 = self.dc[0].startCompute("vnf1", network=[{'id': 'intf1', 'ip': '10.0.10.1/24'}])
+        sw_name = self.dc[0].switch.name
+        # lookup by interface id and by interface name
+        connected = self.net.getConnectedSwitchPort("vnf1", "intf1")
+        self.assertTrue(connected is not None)
+        self.assertTrue(connected[0] == sw_name)
+        self.assertTrue(self.net.getConnectedSwitchPort("vnf1", vnf1.intfList()[0].name) == connected)
+        self.assertTrue(self.net.getDefaultInterface("vnf1") == "intf1")
+        self.assertTrue(self.net.find_connected_dc_interface("vnf1", "intf1") == connected[2])
+        # lookup of the links by interface name and by node name
+        links = self.net.getLinksByIntfName("intf1")
+        self.assertTrue(len(links) == 1)
+        self.assertTrue(links[0].intf1.IP() == "10.0.10.1")
+        self.assertTrue(self.net.getNodeLinks("vnf1") == links)
+        # remove compute resources
+        self.dc[0].stopCompute("vnf1")
+        self.assertTrue(self.net.getConnectedSwitchPort("vnf1", "intf1") is None)
+        self.assertTrue(self.net.getDefaultInterface("vnf1") is None)
+        self.assertTrue(len(self.net.getLinksByIntfName("intf1")) == 0)
+        self.assertTrue(len(self.net.getNodeLinks("vnf1")) == 0)
+        # stop Mininet network
+        self.stopNet()
+
     def testGetStatusSingleComputeSingleDC(self):
         """
         Check if the getStatus functionality of EmulatorCompute
@@ -317,6 +393,11 @@ class testEmulatorCompute( SimpleTestTopology ):
         s = self.dc[0].containers.get("vnf1").getStatus()
         self.assertTrue(s["name"] == "vnf1")
         self.assertTrue(s["state"]["Running"])
+        # check cached status listing
+        l = list_compute_status(self.dc[0].listCompute())
+        self.assertEqual(l[0][0], "vnf1")
+        self.assertEqual(l[0][1]["id"], s["id"])
+        self.assertTrue(l[0][1]["state"]["Running"])
         # stop Mininet network
         self.stopNet()
 
@@ -0,0 +1,97 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Test the batched installation of dpctl flow entries.
+"""
+
+import threading
+import unittest
+from emuvim.dcemulator.flowbatch import FlowBatch, DPCTL_OPTIONS
+
+
+class FakeSwitch(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = list()
+
+    def dpctl(self, *args):
+        with open(args[-1]) as f:
+            self.calls.append((args[:-1], f.read().split()))
+
+
+class FakeRyuNet(object):
+
+    def __init__(self, failing_dpid):
+        self.failing_dpid = failing_dpid
+        self.flows = dict()
+        self.sessions = list()
+        self.lock = threading.Lock()
+
+    def ryu_REST(self, prefix, dpid=None, data=None, session=None):
+        with self.lock:
+            if session not in self.sessions:
+                self.sessions.append(session)
+            if data["dpid"] == self.failing_dpid:
+                raise IOError("connection refused")
+            self.flows.setdefault(data["dpid"], list()).append(data)
+
+
+class testFlowBatch(unittest.TestCase):
+
+    def testOneAddFlowsCallPerSwitch(self):
+        s1 = FakeSwitch("s1")
+        s2 = FakeSwitch("s2")
+        batch = FlowBatch(None)
+        # the first hop of a chain pushes a VLAN tag, the other hops match on it
+        batch.add_dpctl_flow(s1, "in_port=1,action=mod_vlan_vid:1,output=2")
+        batch.add_dpctl_flow(s1, "in_port=2,dl_vlan=2,action=strip_vlan,output=1")
+        batch.add_dpctl_flow(s2, "in_port=1,dl_vlan=1,action=2")
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(batch.commit(), 3)
+        self.assertEqual(s1.calls, [(("add-flows", DPCTL_OPTIONS),
+                                     ["in_port=1,action=mod_vlan_vid:1,output=2",
+                                      "in_port=2,dl_vlan=2,action=strip_vlan,output=1"])])
+        self.assertEqual(s2.calls, [(("add-flows", DPCTL_OPTIONS), ["in_port=1,dl_vlan=1,action=2"])])
+        # the batch is empty after the commit
+        self.assertEqual(batch.commit(), 0)
+
+    def testRyuErrorIsRaised(self):
+        net = FakeRyuNet(failing_dpid=2)
+        batch = FlowBatch(net)
+        batch.add_ryu_flow(1, "stats/flowentry/add", {"dpid": 1, "priority": 1})
+        batch.add_ryu_flow(1, "stats/flowentry/add", {"dpid": 1, "priority": 2})
+        batch.add_ryu_flow(2, "stats/flowentry/add", {"dpid": 2, "priority": 1})
+        self.assertRaises(IOError, batch.commit)
+        self.assertEqual([flow["priority"] for flow in net.flows[1]], [1, 2])
+        # each switch is served by a worker with its own session
+        self.assertEqual(len(net.sessions), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
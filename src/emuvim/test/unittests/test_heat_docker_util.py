@@ -0,0 +1,148 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+Test the container stats sampler of the heat monitoring API against a fake sysfs tree.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from emuvim.api.heat.docker_util import CgroupStats, ContainerStatsSampler
+
+CONTAINER_ID = "c0ffee"
+PID = 4242
+
+NET_DEV = """Inter-|   Receive                                                |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed
+    lo: %d 1 0 0 0 0 0 0 %d 1 0 0 0 0 0 0
+  eth0: %d 1 0 0 0 0 0 0 %d 1 0 0 0 0 0 0
+"""
+
+
+class testContainerStats(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cgroup_root = os.path.join(self.root, "cgroup")
+        self.proc_root = os.path.join(self.root, "proc")
+        self._write(os.path.join(self.proc_root, "meminfo"), "MemTotal: 1024 kB\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _write(self, path, content):
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write(content)
+
+    def _write_net(self, rx, tx):
+        self._write(os.path.join(self.proc_root, str(PID), "net", "dev"), NET_DEV % (0, 0, rx, tx))
+
+    def _setup_v1(self, cpu, rx, tx):
+        def cg(controller, name, content):
+            self._write(os.path.join(self.cgroup_root, controller, "docker", CONTAINER_ID, name), content)
+        cg("cpuacct", "cpuacct.usage_percpu", "%d %d\n" % (cpu, cpu))
+        cg("cpuacct", "tasks", "1\n2\n")
+        cg("memory", "memory.usage_in_bytes", "512\n")
+        cg("memory", "memory.limit_in_bytes", "9223372036854771712\n")
+        cg("blkio", "blkio.throttle.io_service_bytes", "8:0 Read 100\n8:0 Write 200\n8:0 Sync 300\nTotal 300\n")
+        self._write_net(rx, tx)
+
+    def _setup_v2(self, cpu, rx, tx):
+        self._write(os.path.join(self.cgroup_root, "cgroup.controllers"), "cpu io memory pids\n")
+
+        def cg(name, content):
+            self._write(os.path.join(self.cgroup_root, "system.slice", "docker-%s.scope" % CONTAINER_ID, name),
+                        content)
+        cg("cpu.stat", "usage_usec %d\nuser_usec 0\nsystem_usec 0\n" % (cpu / 1000))
+        cg("cpuset.cpus.effective", "0-2\n")
+        cg("pids.current", "3\n")
+        cg("memory.current", "256\n")
+        cg("memory.max", "max\n")
+        cg("io.stat", "8:0 rbytes=100 wbytes=200 rios=1 wios=2\n8:16 rbytes=1 wbytes=2 rios=1 wios=1\n")
+        self._write_net(rx, tx)
+
+    def _stats(self):
+        return CgroupStats(CONTAINER_ID, pid=PID, cgroup_root=self.cgroup_root, proc_root=self.proc_root)
+
+    def testCgroupV1(self):
+        self._setup_v1(1000, 10, 20)
+        s = self._stats().sample()
+        self.assertEqual(s["CPU_used"], 2000)
+        self.assertEqual(s["CPU_cores"], 2)
+        self.assertEqual(s["MEM_used"], 512)
+        self.assertEqual(s["MEM_limit"], 1024 * 1024)
+        self.assertEqual(s["BLOCK_read"], 100)
+        self.assertEqual(s["BLOCK_write"], 200)
+        self.assertEqual(s["PIDS"], 2)
+        self.assertEqual(s["NET_in"], 10)
+        self.assertEqual(s["NET_out"], 20)
+
+    def testCgroupV2(self):
+        self._setup_v2(5000, 10, 20)
+        s = self._stats().sample()
+        self.assertEqual(s["CPU_used"], 5000)
+        self.assertEqual(s["CPU_cores"], 3)
+        self.assertEqual(s["MEM_used"], 256)
+        self.assertEqual(s["MEM_limit"], 1024 * 1024)
+        self.assertEqual(s["BLOCK_read"], 101)
+        self.assertEqual(s["BLOCK_write"], 202)
+        self.assertEqual(s["PIDS"], 3)
+
+    def testSampler(self):
+        self._setup_v1(1000, 10, 20)
+        containers = [("mn.vnf1", CONTAINER_ID, PID)]
+        sampler = ContainerStatsSampler(window=3, list_containers=lambda: containers,
+                                        cgroup_root=self.cgroup_root, proc_root=self.proc_root)
+        sampler.sample_all()
+        self.assertTrue(sampler.rates("mn.vnf1") is None)
+        self.assertEqual(sampler.latest("mn.vnf1")["NET_in"], 10)
+        self._setup_v1(2000, 1010, 2020)
+        sampler.sample_all()
+        rates = sampler.rates("mn.vnf1")
+        self.assertTrue(rates["NET_in/s"] > 0)
+        self.assertTrue(rates["NET_out/s"] > rates["NET_in/s"])
+        self.assertTrue(rates["CPU_%"] > 0)
+        # ring buffer keeps only the last samples
+        for i in range(5):
+            sampler.sample_all()
+        self.assertEqual(len(sampler._samples["mn.vnf1"]), 3)
+        # workload between the samples, optionally downsampled
+        self.assertEqual(len(sampler.history("mn.vnf1")), 2)
+        self.assertEqual(len(sampler.history("mn.vnf1", step=2)), 1)
+        # stopped containers are forgotten
+        del containers[:]
+        sampler.sample_all()
+        self.assertTrue(sampler.latest("mn.vnf1") is None)
+
+
+if __name__ == '__main__':
+    unittest.main()
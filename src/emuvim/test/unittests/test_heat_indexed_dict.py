@@ -0,0 +1,99 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+Test the name indexes that the heat compute object uses to look up servers, networks and ports.
+"""
+
+import unittest
+from emuvim.api.heat.indexed_dict import IndexedDict
+from emuvim.api.heat.resources.server import Server
+
+
+def server(id, name, template_name=None):
+    s = Server(name, id=id)
+    s.template_name = template_name
+    s.full_name = "dc1_stack_" + name
+    return s
+
+
+class testIndexedDict(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = IndexedDict(("name", "template_name", "full_name"))
+
+    def testFind(self):
+        s = server("id1", "vnf1", "tmpl1")
+        self.servers[s.id] = s
+        self.assertIs(self.servers.find("id1"), s)
+        self.assertIs(self.servers.find("vnf1"), s)
+        self.assertIs(self.servers.find("tmpl1"), s)
+        self.assertIs(self.servers.find("dc1_stack_vnf1"), s)
+        self.assertIsNone(self.servers.find("vnf2"))
+
+    def testRemove(self):
+        s1 = server("id1", "vnf1")
+        s2 = server("id2", "vnf2")
+        self.servers[s1.id] = s1
+        self.servers[s2.id] = s2
+        self.servers.pop("id1")
+        self.assertIsNone(self.servers.find("vnf1"))
+        del self.servers["id2"]
+        self.assertIsNone(self.servers.find("vnf2"))
+        self.assertEqual(len(self.servers), 0)
+
+    def testReplace(self):
+        # update_stack replaces the resources of the old stack by the new ones with the same IDs
+        old = server("id1", "vnf1", "old")
+        new = server("id1", "vnf1", "new")
+        self.servers[old.id] = old
+        self.servers[new.id] = new
+        self.assertIs(self.servers.find("vnf1"), new)
+        self.assertIs(self.servers.find("new"), new)
+        self.assertIsNone(self.servers.find("old"))
+
+    def testDuplicateNames(self):
+        s1 = server("id1", "vnf")
+        s2 = server("id2", "vnf")
+        self.servers[s1.id] = s1
+        self.servers[s2.id] = s2
+        self.servers.pop("id1")
+        self.assertIs(self.servers.find("vnf"), s2)
+
+    def testReindex(self):
+        s = server("id1", "vnf1")
+        self.servers[s.id] = s
+        s.full_name = "dc1_man_vnf1"
+        # stale names are never returned
+        self.assertIsNone(self.servers.find("dc1_stack_vnf1"))
+        self.servers.reindex(s)
+        self.assertIs(self.servers.find("dc1_man_vnf1"), s)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+Test the IP address allocation of heat networks.
+"""
+
+import unittest
+from emuvim.api.heat.resources import Net
+from emuvim.api.heat.resources.ip_allocator import IPAllocator
+
+
+class testIPAllocator(unittest.TestCase):
+
+    def testNextFit(self):
+        allocator = IPAllocator(1, 10, dynamic_first=2)
+        self.assertEqual([allocator.allocate("p%d" % i) for i in range(3)], [2, 3, 4])
+        self.assertEqual(allocator.release(3), "p1")
+        # the cursor continues behind the last allocated address
+        self.assertEqual(allocator.allocate("p3"), 5)
+        self.assertTrue(allocator.reserve(1, "gateway"))
+        self.assertFalse(allocator.reserve(1, "other"))
+        self.assertFalse(allocator.reserve(11, "other"))
+        self.assertEqual(allocator.reserve_many([(6, "a"), (7, "b"), (2, "c")]), [2])
+        self.assertEqual([allocator.allocate("p") for i in range(4)], [8, 9, 10, 3])
+        self.assertIsNone(allocator.allocate("p"))
+        allocator.release_many([4, 9])
+        self.assertEqual(allocator.allocate("p"), 4)
+        self.assertEqual(allocator.allocate("p"), 9)
+        allocator.reset()
+        self.assertEqual(len(allocator), 0)
+        self.assertEqual(allocator.allocate("p"), 2)
+
+    def testLargeSubnet(self):
+        allocator = IPAllocator(1, 2 ** 16 - 2, dynamic_first=2)
+        for i in range(1000):
+            allocator.allocate("p%d" % i)
+        self.assertEqual(len(allocator), 1000)
+        # only words with allocated addresses are stored
+        self.assertEqual(len(allocator._words), 16)
+        allocator.release_many(range(2, 1002))
+        self.assertEqual(len(allocator._words), 0)
+
+    def testNet(self):
+        net = Net("net1")
+        self.assertTrue(net.set_cidr("10.0.0.0/24"))
+        self.assertEqual(net.get_new_ip_address("p1"), "10.0.0.2/24")
+        self.assertTrue(net.assign_ip_address("10.0.0.1/24", "router"))
+        self.assertFalse(net.assign_ip_address("10.0.0.255/24", "p2"))
+        self.assertTrue(net.is_my_ip("10.0.0.2/24", "p1"))
+        net.update_port_name_for_ip_address("10.0.0.2/24", "p2")
+        self.assertFalse(net.is_my_ip("10.0.0.2/24", "p1"))
+        self.assertTrue(net.is_my_ip("10.0.0.2/24", "p2"))
+        self.assertEqual(net.reserve_ip_addresses({"10.0.0.2/24": "p3", "10.0.0.3/24": "p3"}), ["10.0.0.2/24"])
+        net.withdraw_ip_address("10.0.0.2/24")
+        self.assertFalse(net.ip_used("10.0.0.2/24"))
+        net.withdraw_ip_addresses(["10.0.0.1/24", "10.0.0.3/24"])
+        self.assertFalse(net.ip_used("10.0.0.3/24"))
+
+        net.set_cidr("10.0.0.0/16")
+        self.assertFalse(net.ip_used("10.0.0.2/16"))
+        for i in range(300):
+            net.get_new_ip_address("p%d" % i)
+        self.assertEqual(net.get_new_ip_address("p"), "10.0.1.46/16")
+
+
+if __name__ == '__main__':
+    unittest.main()
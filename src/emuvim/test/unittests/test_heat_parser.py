@@ -0,0 +1,81 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+Test the resolution of the resource dependencies of the heat parser.
+"""
+
+import json
+import os
+import unittest
+from emuvim.api.heat.heat_parser import HeatParser
+
+
+def resource(type, **properties):
+    return {"type": type, "properties": properties}
+
+
+class testHeatParserOrder(unittest.TestCase):
+
+    def testTemplateOrder(self):
+        path = os.path.join(os.path.dirname(__file__), "test_heatapi_template_create_stack.json")
+        resources = json.load(open(path))["template"]["resources"]
+        order, error = HeatParser.resolve_order(resources)
+        self.assertIsNone(error)
+        self.assertEqual(sorted(order), sorted(resources.keys()))
+        position = dict((name, i) for i, name in enumerate(order))
+        for name, deps in HeatParser.find_dependencies(resources).items():
+            for dep in deps:
+                self.assertLess(position[dep], position[name])
+
+    def testPortDependsOnSubnet(self):
+        resources = {
+            "port1": resource("OS::Neutron::Port", name="port1", network={"get_resource": "net1"}),
+            "sub1": resource("OS::Neutron::Subnet", name="sub1", network={"get_resource": "net1"}),
+            "net1": resource("OS::Neutron::Net", name="net1"),
+            "vnf1": resource("OS::Nova::Server", name="vnf1", networks=[{"port": {"get_resource": "port1"}}]),
+        }
+        order, error = HeatParser.resolve_order(resources)
+        self.assertIsNone(error)
+        self.assertEqual(order.index("net1"), 0)
+        self.assertLess(order.index("sub1"), order.index("port1"))
+        self.assertEqual(order.index("vnf1"), 3)
+
+    def testCycle(self):
+        resources = {
+            "a": {"type": "OS::Neutron::Router", "properties": {"name": "a"}, "depends_on": "b"},
+            "b": {"type": "OS::Neutron::Router", "properties": {"name": "b"}, "depends_on": ["a"]},
+            "c": resource("OS::Neutron::Net", name="c"),
+        }
+        order, error = HeatParser.resolve_order(resources)
+        self.assertIsNone(order)
+        self.assertIn("a -> b -> a", error.replace("b -> a -> b", "a -> b -> a"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+Test the change set that the heat compute object applies when a stack is updated.
+"""
+
+import unittest
+from emuvim.api.heat.compute import OpenstackCompute
+from emuvim.api.heat.resources import Net, Port, Server, Stack
+from emuvim.api.heat.stack_diff import StackDiff
+from emuvim.api.heat.subnet_pool import get_subnet_pool
+
+
+def create_stack(servers, image="ubuntu:trusty"):
+    """
+    Creates a stack with one network and the given servers.
+    :param servers: dict server name -> list of (port name, ip address)
+    """
+    stack = Stack()
+    net = Net("net1")
+    net.id = "net-%s" % stack.id
+    stack.nets[net.name] = net
+    for name, ports in servers.items():
+        server = Server(name, id="%s-%s" % (name, stack.id), image=image)
+        for port_name, ip in ports:
+            port = Port(port_name, ip_address=ip)
+            port.id = "%s-%s" % (port_name, stack.id)
+            port.net_name = net.name
+            stack.ports[port_name] = port
+            server.port_names.append(port_name)
+        stack.servers[name] = server
+    return stack
+
+
+def operations(plan, op):
+    return [o[1:] for o in plan if o[0] == op]
+
+
+class testStackDiff(unittest.TestCase):
+
+    def testScaleOut(self):
+        old = create_stack({"vnf1": [("vnf1:p1", "10.0.0.2/24")]})
+        new = create_stack({"vnf1": [("vnf1:p1", "10.0.0.2/24")],
+                            "vnf2": [("vnf2:p1", "10.0.0.3/24")]})
+        diff = StackDiff(old, new)
+        diff.transfer_ids()
+        self.assertEqual(new.servers["vnf1"].id, old.servers["vnf1"].id)
+        self.assertEqual(new.ports["vnf1:p1"].id, old.ports["vnf1:p1"].id)
+        self.assertEqual(new.nets["net1"].id, old.nets["net1"].id)
+        plan = diff.plan()
+        # only the new server is touched
+        self.assertEqual(plan, [(StackDiff.START_SERVERS, [new.servers["vnf2"]])])
+        # the unchanged port keeps the interface of the running server
+        self.assertEqual(new.ports["vnf1:p1"].intf_name, old.ports["vnf1:p1"].intf_name)
+
+    def testChanges(self):
+        old = create_stack({"vnf1": [("vnf1:p1", "10.0.0.2/24"), ("vnf1:p2", "10.0.0.3/24")],
+                            "vnf2": [], "vnf3": []})
+        new = create_stack({"vnf1": [("vnf1:p1", "10.0.0.4/24"), ("vnf1:p3", "10.0.0.5/24")],
+                            "vnf2": []})
+        new.servers["vnf2"].image = "ubuntu:xenial"
+        plan = StackDiff(old, new).plan()
+        stopped = [o[0].name for o in operations(plan, StackDiff.STOP_SERVER)]
+        self.assertEqual(sorted(stopped), ["vnf2", "vnf3"])
+        self.assertEqual(operations(plan, StackDiff.REMOVE_LINK), [("vnf1", old.ports["vnf1:p2"])])
+        self.assertEqual(operations(plan, StackDiff.REPLACE_LINK),
+                         [("vnf1", old.ports["vnf1:p1"], new.ports["vnf1:p1"])])
+        self.assertEqual(operations(plan, StackDiff.ADD_LINK), [("vnf1", new.ports["vnf1:p3"])])
+        self.assertEqual(operations(plan, StackDiff.START_SERVERS), [([new.servers["vnf2"]],)])
+        self.assertEqual(plan[-1][0], StackDiff.START_SERVERS)
+
+    def testSubnetCidr(self):
+        pool = get_subnet_pool()
+        compute = OpenstackCompute()
+        old = create_stack({})
+        new = create_stack({})
+        for stack, cidr in ((old, "10.250.1.0/24"), (new, "10.250.2.0/24")):
+            net = stack.nets["net1"]
+            net.subnet_name = "subnet1"
+            compute.set_subnet_cidr(net, cidr)
+        StackDiff(old, new).transfer_ids()
+        # the network keeps its CIDR and the one of the new stack is returned to the pool
+        compute.update_subnet_cidr(old, new)
+        self.assertEqual(new.nets["net1"].get_cidr(), "10.250.1.0/24")
+        self.assertTrue(pool.reserve("10.250.2.0/24", owner="other"))
+        # a CIDR that belongs to another network meanwhile is not taken over
+        newer = create_stack({})
+        newer.nets["net1"].subnet_name = "subnet1"
+        compute.set_subnet_cidr(newer.nets["net1"], "10.250.3.0/24")
+        self.assertTrue(pool.release("10.250.1.0/24", owner=new.nets["net1"].id))
+        self.assertTrue(pool.reserve("10.250.1.0/24", owner="other"))
+        StackDiff(new, newer).transfer_ids()
+        compute.update_subnet_cidr(new, newer)
+        self.assertEqual(newer.nets["net1"].get_cidr(), "10.250.3.0/24")
+        self.assertFalse(pool.release("10.250.1.0/24", owner=newer.nets["net1"].id))
+        # the kept CIDR is released when the network is deleted
+        self.assertTrue(pool.release("10.250.3.0/24", owner=newer.nets["net1"].id))
+        for cidr in ("10.250.1.0/24", "10.250.2.0/24", "10.250.3.0/24"):
+            pool.release(cidr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+Test the status of the stack operations that the heat compute object runs in the background.
+"""
+
+import threading
+import unittest
+from emuvim.api.heat.compute import OpenstackCompute, HeatApiStackBusyException
+from emuvim.api.heat.resources import Stack
+
+
+def create_compute():
+    compute = OpenstackCompute()
+    stack = Stack()
+    compute.stacks[stack.id] = stack
+    return compute, stack
+
+
+class testStackOperations(unittest.TestCase):
+
+    def testInProgressAndComplete(self):
+        compute, stack = create_compute()
+        started = threading.Event()
+        done = threading.Event()
+
+        def start_servers(stack, servers):
+            started.set()
+            if not done.wait(10):
+                raise Exception("not done")
+
+        compute.dc = object()
+        compute._start_servers = start_servers
+        compute.deploy_stack_async(stack.id)
+        self.assertTrue(started.wait(10))
+        self.assertEqual(stack.status, "CREATE_IN_PROGRESS")
+        self.assertTrue(compute.is_stack_busy(stack.id))
+        # requests only wait for the changes of the compute dictionaries, not for the containers
+        self.assertTrue(compute.stack_lock.acquire(False))
+        compute.stack_lock.release()
+        # a delete must not overwrite the status of the running create
+        self.assertRaises(HeatApiStackBusyException, compute.delete_stack_async, stack.id)
+        self.assertEqual(stack.status, "CREATE_IN_PROGRESS")
+        done.set()
+        self.assertTrue(compute.wait_for_stack_operations(10))
+        self.assertEqual(stack.status, "CREATE_COMPLETE")
+        self.assertIsNone(stack.status_reason)
+        self.assertFalse(compute.is_stack_busy(stack.id))
+
+    def testFailed(self):
+        compute, stack = create_compute()
+
+        def deploy(stack_id):
+            raise Exception("no such image")
+
+        compute.deploy_stack = deploy
+        compute.deploy_stack_async(stack.id)
+        self.assertTrue(compute.wait_for_stack_operations(10))
+        self.assertEqual(stack.status, "CREATE_FAILED")
+        self.assertIn("no such image", stack.status_reason)
+
+        compute.delete_stack = lambda stack_id: False
+        compute.delete_stack_async(stack.id)
+        self.assertTrue(compute.wait_for_stack_operations(10))
+        self.assertEqual(stack.status, "DELETE_FAILED")
+        self.assertEqual(stack.status_reason, "Stack delete failed.")
+
+    def testDatacentersDoNotBlockEachOther(self):
+        blocked_compute, blocked_stack = create_compute()
+        done = threading.Event()
+        blocked_compute.deploy_stack = lambda stack_id: done.wait(10)
+        for i in range(4):
+            stack = Stack()
+            blocked_compute.stacks[stack.id] = stack
+            blocked_compute.deploy_stack_async(stack.id)
+
+        compute, stack = create_compute()
+        compute.deploy_stack = lambda stack_id: True
+        compute.deploy_stack_async(stack.id)
+        self.assertTrue(compute.wait_for_stack_operations(10))
+        self.assertEqual(stack.status, "CREATE_COMPLETE")
+        done.set()
+        self.assertTrue(blocked_compute.wait_for_stack_operations(10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+Test the subnet pool that is shared by all OpenStack API endpoints.
+"""
+
+import unittest
+from emuvim.api.heat.subnet_pool import SubnetPool
+
+
+class testSubnetPool(unittest.TestCase):
+
+    def testAllocate(self):
+        pool = SubnetPool("10.0.0.0/16")
+        self.assertEqual(pool.allocate(24), "10.0.0.0/24")
+        self.assertEqual(pool.allocate(24), "10.0.1.0/24")
+        self.assertEqual(pool.allocate(23), "10.0.2.0/23")
+        self.assertEqual(pool.allocate(30), "10.0.4.0/30")
+        self.assertEqual(pool.allocate(24), "10.0.5.0/24")
+        self.assertIsNone(pool.allocate(8))
+        self.assertTrue(pool.release("10.0.1.0/24"))
+        self.assertFalse(pool.release("10.0.1.0/24"))
+        self.assertEqual(pool.allocate(24), "10.0.1.0/24")
+        self.assertEqual(len(pool), 5)
+
+    def testReserve(self):
+        pool = SubnetPool("10.0.0.0/16")
+        self.assertTrue(pool.reserve("10.0.3.0/24", owner="net1"))
+        self.assertFalse(pool.reserve("10.0.3.128/25"))
+        self.assertFalse(pool.reserve("10.0.0.0/22"))
+        self.assertFalse(pool.reserve("192.168.0.0/24"))
+        # the free /24 next to the reserved subnet is used before larger blocks are split
+        self.assertEqual([pool.allocate(24) for i in range(4)],
+                         ["10.0.2.0/24", "10.0.0.0/24", "10.0.1.0/24", "10.0.4.0/24"])
+        # only the owner can release the subnet
+        self.assertFalse(pool.release("10.0.3.0/24", owner="net2"))
+        self.assertTrue(pool.release("10.0.3.0/24", owner="net1"))
+        self.assertEqual(pool.allocate(24), "10.0.3.0/24")
+        # a new owner takes over the subnet
+        self.assertTrue(pool.set_owner("10.0.3.0/24", "net2"))
+        self.assertFalse(pool.set_owner("10.0.5.0/24", "net2"))
+        self.assertTrue(pool.release("10.0.3.0/24", owner="net2"))
+
+    def testMerge(self):
+        pool = SubnetPool("10.0.0.0/16")
+        cidrs = [pool.allocate(24) for i in range(256)]
+        self.assertIsNone(pool.allocate(24))
+        for cidr in cidrs:
+            self.assertTrue(pool.release(cidr))
+        # all blocks were merged again
+        self.assertEqual(pool.allocate(16), "10.0.0.0/16")
+
+
+if __name__ == '__main__':
+    unittest.main()
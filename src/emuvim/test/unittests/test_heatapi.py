@@ -63,6 +63,7 @@ class testRestApi(ApiBaseHeat):
         test_heatapi_template_create_stack = open(os.path.join(os.path.dirname(__file__), "test_heatapi_template_create_stack.json")).read()
         url = "http://0.0.0.0:8004/v1/tenantabc123/stacks"
         requests.post(url, data=json.dumps(json.loads(test_heatapi_template_create_stack)),headers=headers)
+        self.waitForStacks()
         print(" ")
 
         print('->>>>>>> testMonitoringListVersions ->>>>>>>>>>>>>>>')
@@ -155,6 +156,7 @@ class testRestApi(ApiBaseHeat):
         url = "http://0.0.0.0:8004/v1/tenantabc123/stacks"
         requests.post(url, data=json.dumps(json.loads(test_heatapi_template_create_stack)),
                       headers=headers)
+        self.waitForStacks()
 
         print('->>>>>>> testNovaListVersions ->>>>>>>>>>>>>>>')
         print('->>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>')
@@ -311,6 +313,7 @@ class testRestApi(ApiBaseHeat):
         test_heatapi_template_create_stack = open(os.path.join(os.path.dirname(__file__), "test_heatapi_template_create_stack.json")).read()
         url = "http://0.0.0.0:8004/v1/tenantabc123/stacks"
         requests.post(url, data=json.dumps(json.loads(test_heatapi_template_create_stack)), headers=headers)
+        self.waitForStacks()
         # test_heatapi_keystone_get_token = open("test_heatapi_keystone_get_token.json").read()
         print(" ")
 
@@ -734,6 +737,7 @@ class testRestApi(ApiBaseHeat):
         print('->>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>')
         url = "http://0.0.0.0:8004/v1/tenantabc123/stacks"
         createstackresponse = requests.post(url, data=json.dumps(json.loads(test_heatapi_template_create_stack)), headers=headers)
+        self.waitForStacks()
         self.assertEqual(createstackresponse.status_code, 200)
         self.assertNotEqual(json.loads(createstackresponse.content)["stack"]["id"], "")
         print(" ")
@@ -782,6 +786,7 @@ class testRestApi(ApiBaseHeat):
         url = "http://0.0.0.0:8004/v1/tenantabc123updateStack/stacks/%s"% json.loads(createstackresponse.content)['stack']['id']
         updatestackresponse = requests.put(url, data=json.dumps(json.loads(test_heatapi_template_update_stack)),
                                             headers=headers)
+        self.waitForStacks()
         self.assertEqual(updatestackresponse.status_code, 202)
         liststackdetailsresponse = requests.get(url, headers=headers)
         self.assertEqual(json.loads(liststackdetailsresponse.content)["stack"]["stack_status"], "UPDATE_COMPLETE")
@@ -823,6 +828,7 @@ class testRestApi(ApiBaseHeat):
         createstackresponse = requests.post(url,
                                             data=json.dumps(json.loads(test_heatapi_template_create_stack)),
                                             headers=headers)
+        self.waitForStacks()
         self.assertEqual(createstackresponse.status_code, 200)
         self.assertNotEqual(json.loads(createstackresponse.content)["stack"]["id"], "")
         print(" ")
@@ -854,6 +860,7 @@ class testRestApi(ApiBaseHeat):
         updatestackresponse = requests.put(url,
                                            data=json.dumps(json.loads(test_heatapi_template_update_stack)),
                                            headers=headers)
+        self.waitForStacks()
         self.assertEqual(updatestackresponse.status_code, 202)
         liststackdetailsresponse = requests.get(url, headers=headers)
         self.assertEqual(json.loads(liststackdetailsresponse.content)["stack"]["stack_status"], "UPDATE_COMPLETE")
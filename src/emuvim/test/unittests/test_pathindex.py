@@ -0,0 +1,85 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+import networkx as nx
+from emuvim.dcemulator.pathindex import PathIndex
+
+
+class testPathIndex(unittest.TestCase):
+    """
+    Test the cached shortest path calculation of the path index.
+    """
+
+    def _ring(self):
+        # s1 -- s2 -- s3 -- s4 -- s1
+        pi = PathIndex()
+        for u, v in [("s1", "s2"), ("s2", "s3"), ("s3", "s4"), ("s4", "s1")]:
+            pi.add_link(u, v, "%s-%s" % (u, v), {"delay": "10"})
+            pi.add_link(v, u, "%s-%s" % (v, u), {"delay": "10"})
+        return pi
+
+    def testPathCaching(self):
+        pi = self._ring()
+        self.assertEqual(pi.shortest_path("s1", "s2"), ["s1", "s2"])
+        self.assertEqual(pi.misses, 1)
+        # all paths from s1 are computed at once
+        self.assertEqual(len(pi.shortest_path("s1", "s3")), 3)
+        self.assertEqual(pi.shortest_path("s1", "s4"), ["s1", "s4"])
+        self.assertEqual(pi.misses, 1)
+        self.assertEqual(pi.hits, 2)
+
+    def testWeightedPath(self):
+        pi = self._ring()
+        # make the direct link s1 -> s4 slow
+        pi.add_link("s1", "s4", "slow", {"delay": "100"})
+        pi.remove_link("s1", "s4", "s1-s4")
+        self.assertEqual(pi.shortest_path("s1", "s4"), ["s1", "s4"])
+        self.assertEqual(pi.shortest_path("s1", "s4", weight="delay"), ["s1", "s2", "s3", "s4"])
+
+    def testIncrementalInvalidation(self):
+        pi = self._ring()
+        pi.shortest_path("s1", "s2")
+        pi.shortest_path("s3", "s4")
+        # link s1 -> s2 is not used by any path starting at s3
+        pi.remove_link("s1", "s2", "s1-s2")
+        self.assertEqual(pi.shortest_path("s1", "s2"), ["s1", "s4", "s3", "s2"])
+        self.assertEqual(pi.shortest_path("s3", "s4"), ["s3", "s4"])
+        self.assertEqual(pi.misses, 3)
+
+    def testNoPath(self):
+        pi = self._ring()
+        pi.add_switch("s5")
+        self.assertRaises(nx.NetworkXNoPath, pi.shortest_path, "s1", "s5")
+        pi.remove_node("s2")
+        pi.remove_node("s4")
+        self.assertRaises(nx.NetworkXNoPath, pi.shortest_path, "s1", "s3")
+
+
+if __name__ == '__main__':
+    unittest.main()
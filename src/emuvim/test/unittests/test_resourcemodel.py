@@ -28,10 +28,15 @@ partner consortium (www.sonata-nfv.eu).
 
 import time
 import os
+import json
+import shutil
+import tempfile
 import unittest
 from emuvim.test.base import SimpleTestTopology
 from emuvim.dcemulator.resourcemodel import BaseResourceModel, ResourceFlavor, NotEnoughResourcesAvailable, ResourceModelRegistrar
 from emuvim.dcemulator.resourcemodel.upb.simple import UpbSimpleCloudDcRM, UpbOverprovisioningCloudDcRM, UpbDummyRM
+from emuvim.dcemulator.resourcemodel.limitbatch import LimitBatch
+from emuvim.dcemulator.resourcemodel import logwriter
 
 
 
@@ -98,6 +103,7 @@ def createDummyContainerObject(name, flavor):
         def __init__(self):
             self.cpu_period = -1
             self.cpu_quota = -1
+            self.cpu_shares = -1
             self.mem_limit = -1
             self.memswap_limit = -1
 
@@ -161,6 +167,69 @@ class testUpbSimpleCloudDcRM(SimpleTestTopology):
         self.assertEqual(float(c5.cpu_quota) / c5.cpu_period, E_CPU / MAX_CU * 16)   # validate compute result
         self.assertEqual(float(c5.mem_limit/1024/1024), float(E_MEM) / MAX_MU * 1024)   # validate memory result
 
+    def testIncrementalLimitUpdates(self):
+        """
+        Test that limits are only applied to containers whose limits changed.
+        :return:
+        """
+        reg = ResourceModelRegistrar(dc_emulation_max_cpu=1.0, dc_emulation_max_mem=512)
+        rm = UpbSimpleCloudDcRM(max_cu=500, max_mu=128 * 500)
+        reg.register("test_dc", rm)
+        updates = list()
+
+        def counted(c):
+            update = c.updateCpuLimit
+            c.updateCpuLimit = lambda **kw: (updates.append(c.name), update(**kw))
+            return c
+
+        containers = [counted(createDummyContainerObject("c%d" % i, flavor="small")) for i in range(0, 500)]
+        for c in containers:
+            rm.allocate(c)
+        # every container is updated exactly once
+        self.assertEqual(len(updates), 500)
+        # freeing does not change the limits of the remaining containers
+        rm.free(containers[0])
+        self.assertEqual(len(updates), 500)
+        # a new resource model changes the size of a CU, so all limits are updated on the next allocation
+        reg.register("test_dc2", UpbSimpleCloudDcRM(max_cu=500, max_mu=128 * 500))
+        rm.allocate(counted(createDummyContainerObject("c500", flavor="small")))
+        self.assertEqual(len(updates), 1000)
+        self.assertAlmostEqual(float(containers[1].cpu_quota) / containers[1].cpu_period, 1.0 / 1000 * 1.0)
+
+
+    def testAllocationLog(self):
+        """
+        Test the full and the compact experiment log format.
+        :return:
+        """
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for fmt in ["full", "compact"]:
+                path = os.path.join(tmpdir, "%s.log" % fmt)
+                reg = ResourceModelRegistrar(dc_emulation_max_cpu=1.0, dc_emulation_max_mem=512)
+                rm = UpbSimpleCloudDcRM(max_cu=100, max_mu=2048, log_format=fmt)
+                reg.register("test_dc", rm)
+                c1 = createDummyContainerObject("c1", flavor="small")
+                c2 = createDummyContainerObject("c2", flavor="small")
+                rm.allocate(c1)
+                rm.write_allocation_log(c1, path)
+                rm.allocate(c2)
+                rm.write_allocation_log(c2, path)
+                rm.free(c1)
+                rm.write_free_log(c1, path)
+                logwriter.flush()
+                with open(path) as f:
+                    entries = [json.loads(l) for l in f]
+                self.assertEqual([e["action"] for e in entries], ["allocate", "allocate", "free"])
+                if fmt == "full":
+                    self.assertEqual(entries[0]["container_state"]["name"], "c1")
+                    self.assertEqual(sorted(entries[1]["rm_state"]["allocation_state"].keys()), ["c1", "c2"])
+                else:
+                    self.assertEqual(entries[1]["rm_state"]["allocation_state"].keys(), ["c2"])
+                    self.assertEqual(entries[2]["rm_state"]["removed"], ["c1"])
+                    self.assertEqual(entries[2]["rm_state"]["allocation_state"], {})
+        finally:
+            shutil.rmtree(tmpdir)
 
     def testAllocationCpuLimit(self):
         """
@@ -364,3 +433,60 @@ class testUpbDummyRM(SimpleTestTopology):
         rm.allocate(c2)  # calculate allocation
         self.assertEqual(len(rm._allocated_compute_instances), 2)
 
+
+class testLimitBatch(SimpleTestTopology):
+    """
+    Test the batched application of resource limits.
+    """
+
+    def setUp(self):
+        self.cgroup_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cgroup_root)
+
+    def _read(self, *path):
+        with open(os.path.join(self.cgroup_root, *path)) as f:
+            return f.read()
+
+    def testApiFallback(self):
+        batch = LimitBatch(cgroup_root=self.cgroup_root)
+        containers = [createDummyContainerObject("c%d" % i, flavor="small") for i in range(0, 20)]
+        for c in containers:
+            batch.add_cpu(c, 1000000, 50000)
+            batch.add_mem(c, 64 * 1024 * 1024)
+        result = batch.commit()
+        self.assertEqual(result["updated"], 20)
+        self.assertEqual(result["cgroup"], 0)
+        self.assertEqual(len(batch), 0)
+        for c in containers:
+            self.assertEqual(c.cpu_quota, 50000)
+            self.assertEqual(c.mem_limit, 64 * 1024 * 1024)
+
+    def testCgroupV1(self):
+        c = createDummyContainerObject("c1", flavor="small")
+        c.did = "abc"
+        os.makedirs(os.path.join(self.cgroup_root, "cpu", "docker", "abc"))
+        os.makedirs(os.path.join(self.cgroup_root, "memory", "docker", "abc"))
+        batch = LimitBatch(cgroup_root=self.cgroup_root)
+        batch.add_cpu(c, 1000000, 50000)
+        batch.add_mem(c, 4194304)
+        result = batch.commit()
+        self.assertEqual(result["cgroup"], 1)
+        self.assertEqual(self._read("cpu", "docker", "abc", "cpu.cfs_period_us"), "1000000")
+        self.assertEqual(self._read("cpu", "docker", "abc", "cpu.cfs_quota_us"), "50000")
+        self.assertEqual(self._read("memory", "docker", "abc", "memory.limit_in_bytes"), "4194304")
+        self.assertEqual(c.cpu_quota, 50000)
+
+    def testCgroupV2(self):
+        c = createDummyContainerObject("c1", flavor="small")
+        c.did = "abc"
+        scope = os.path.join(self.cgroup_root, "system.slice", "docker-abc.scope")
+        os.makedirs(scope)
+        open(os.path.join(scope, "cpu.max"), "w").close()
+        batch = LimitBatch(cgroup_root=self.cgroup_root)
+        batch.add_cpu(c, 1000000, 50000)
+        batch.add_mem(c, 4194304)
+        self.assertEqual(batch.commit()["cgroup"], 1)
+        self.assertEqual(self._read("system.slice", "docker-abc.scope", "cpu.max"), "50000 1000000")
+        self.assertEqual(self._read("system.slice", "docker-abc.scope", "memory.max"), "4194304")
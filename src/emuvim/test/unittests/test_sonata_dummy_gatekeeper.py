@@ -70,6 +70,10 @@ class testSonataDummyGatekeeper(SimpleTestTopology):
         self.service_uuid = json.loads(r.text).get("service_uuid")
         r2 = requests.post("http://127.0.0.1:5000/instantiations", data=json.dumps({"service_uuid": self.service_uuid}))
         self.assertEqual(r2.status_code, 201)
+        # the duration of the instantiation steps is reported
+        timing = json.loads(r2.text).get("timing")
+        self.assertTrue("vnf_start" in timing)
+        self.assertTrue(timing.get("total") >= timing.get("vnf_start"))
 
         # give the emulator some time to instantiate everything
         time.sleep(2)
@@ -0,0 +1,119 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from docker.errors import NotFound
+from emuvim.api.sonata.imagecache import ImageCache
+
+
+class FakeImage(object):
+
+    def __init__(self, image_id):
+        self.id = image_id
+
+
+class FakeImages(object):
+    """
+    Stand-in for the image API of a Docker daemon (like a local registry).
+    """
+
+    def __init__(self):
+        self.local = dict()
+        self.registry = {"ubuntu:trusty": "sha256:1", "alpine:latest": "sha256:2"}
+        self.gets = 0
+        self.builds = 0
+
+    def get(self, name):
+        self.gets += 1
+        if name not in self.local:
+            raise NotFound("image %r not found" % name)
+        return FakeImage(self.local[name])
+
+    def build(self, path=None, tag=None, **kwargs):
+        self.builds += 1
+        self.local[tag] = "sha256:build%d" % self.builds
+        return FakeImage(self.local[tag])
+
+
+class FakeClient(object):
+
+    def __init__(self):
+        self.images = FakeImages()
+
+
+class FakeImageCache(ImageCache):
+
+    def _pull(self, name):
+        images = self.client.images
+        if name in images.registry:
+            images.local[name] = images.registry[name]
+            return 0
+        return 1
+
+
+class testImageCache(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeClient()
+        self.cache = FakeImageCache(client=self.client)
+
+    def testPullAll(self):
+        ids = self.cache.pull_all(["ubuntu:trusty", "alpine:latest", "unknown:latest"])
+        self.assertEqual(ids["ubuntu:trusty"], "sha256:1")
+        self.assertEqual(ids["alpine:latest"], "sha256:2")
+        self.assertTrue(ids["unknown:latest"] is None)
+        # known images are served from the cache
+        gets = self.client.images.gets
+        self.assertTrue(self.cache.exists("ubuntu:trusty"))
+        self.cache.pull_all(["ubuntu:trusty", "alpine:latest"])
+        self.assertEqual(self.client.images.gets, gets)
+
+    def testBuildAll(self):
+        context = tempfile.mkdtemp()
+        try:
+            dockerfile = os.path.join(context, "Dockerfile")
+            with open(dockerfile, "w") as f:
+                f.write("FROM ubuntu:trusty\n")
+            self.cache.build_all({"vnf1": dockerfile})
+            self.cache.build_all({"vnf1": dockerfile})
+            self.assertEqual(self.client.images.builds, 1)
+            self.assertTrue(self.cache.exists("vnf1"))
+            # changed build context results in a new build
+            with open(dockerfile, "a") as f:
+                f.write("RUN true\n")
+            self.cache.build_all({"vnf1": dockerfile})
+            self.assertEqual(self.client.images.builds, 2)
+        finally:
+            shutil.rmtree(context)
+
+
+if __name__ == '__main__':
+    unittest.main()